@@ -4,39 +4,253 @@ Enhanced REST API for CourseSpider
 Provides advanced filtering and search capabilities
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, send_file
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from database import DatabaseManager
 from collector import EnhancedCourseCollector
+from suggest import MAX_LIMIT as MAX_SUGGESTIONS, Suggester
+from youtube_client import QuotaExhausted, load_api_keys
+import metrics
+import profiling
+import functools
+import json
 import os
 import threading
+import time
+import urllib.error
+import urllib.request
 import uuid
 from datetime import datetime
 
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON provider that records serialization time as a metrics phase"""
+    
+    def dumps(self, obj, **kwargs):
+        with metrics.registry.timed('serialize_json'):
+            return super().dumps(obj, **kwargs)
+
+
 app = Flask(__name__)
+app.json = TimedJSONProvider(app)
 CORS(app)
 
-# Initialize database
-db = DatabaseManager()
-db.initialize()
+# Database handle; each process opens its own connection on first use (see init_db)
+db = DatabaseManager(os.environ.get('COURSESPIDER_DB', 'data/courses.db'))
+
+# Set in read-only worker processes; write endpoints are forwarded there
+WRITER_URL = os.environ.get('COURSESPIDER_WRITER_URL')
+WRITER_ENDPOINTS = {'start_collection', 'get_collection_status', 'delete_course'}
 
 # Collection jobs tracking
 collection_jobs = {}
 
+# One related-courses update at a time; later jobs wait and catch up
+related_lock = threading.Lock()
+
+# Rows buffered per chunk when streaming exports
+EXPORT_CHUNK_ROWS = 100
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one in-flight computation"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.leaders = 0
+        self.followers = 0
+    
+    def do(self, key, fn):
+        """Run fn, or wait for an identical call already in flight and share its result"""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+                self.leaders += 1
+            else:
+                self.followers += 1
+        
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
+        
+        try:
+            call['result'] = fn()
+            return call['result']
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call['done'].set()
+    
+    def gauges(self):
+        """Coalescing stats for /api/metrics"""
+        with self.lock:
+            in_flight = len(self.calls)
+        yield 'courtspider_coalesce_leaders', {}, self.leaders
+        yield 'courtspider_coalesce_followers', {}, self.followers
+        yield 'courtspider_coalesce_in_flight', {}, in_flight
+
+
+single_flight = SingleFlight()
+metrics.registry.register_gauges(single_flight.gauges)
+
+# Typeahead index, built from the catalog on first use
+suggester = Suggester(db)
+metrics.registry.register_gauges(suggester.gauges)
+
+
+def coalesced(view):
+    """Share one serialized response among concurrent identical GET requests"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        # Every argument exactly as sent: an empty value can change the response
+        key = (request.path, request.query_string)
+        
+        def render():
+            response = app.make_response(view(*args, **kwargs))
+            return response.get_data(), response.status_code, response.mimetype
+        
+        body, status, mimetype = single_flight.do(key, render)
+        return Response(body, status=status, mimetype=mimetype)
+    return wrapper
+
+
+def init_db(read_only=None):
+    """Open this process's database connection (call after forking)"""
+    if read_only is None:
+        read_only = os.environ.get('COURSESPIDER_READ_ONLY') == '1'
+    db.close()
+    db.initialize(read_only=read_only)
+    suggester.reset()
+    
+    # Build the typeahead index before the first keystroke needs it
+    threading.Thread(target=suggester.refresh, daemon=True).start()
+
+
+def forward_to_writer():
+    """Forward the current request to the designated writer process"""
+    forwarded = urllib.request.Request(
+        WRITER_URL.rstrip('/') + request.full_path.rstrip('?'),
+        data=request.get_data() or None,
+        method=request.method,
+        headers={'Content-Type': request.content_type or 'application/json'}
+    )
+    try:
+        with urllib.request.urlopen(forwarded, timeout=30) as response:
+            return Response(response.read(), status=response.status,
+                            mimetype=response.headers.get_content_type())
+    except urllib.error.HTTPError as e:
+        return Response(e.read(), status=e.code, mimetype='application/json')
+
+
+@app.before_request
+def start_request_timer():
+    """Mark the request start for latency metrics"""
+    g.request_started = time.perf_counter()
+    
+    # Opt-in profiling: sampled requests and requests carrying the profile token
+    # (reading profiles is not profiled itself)
+    if profiling.ENABLED and not request.path.startswith('/api/admin/'):
+        reason = profiling.wanted(request.headers.get(profiling.PROFILE_HEADER))
+        if reason:
+            g.profile = profiling.start(reason)
+
+
+def finish_profile(status):
+    """Write the current request's profile, if it is being profiled; return its id"""
+    profile = g.pop('profile', None)
+    if profile is None:
+        return None
+    return profiling.finish(profile, {
+        'method': request.method,
+        'path': request.path,
+        'query': request.query_string.decode('utf-8', 'replace'),
+        'status': status
+    })
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Record request count and latency per route template"""
+    started = g.get('request_started')
+    if started is not None:
+        # Streaming responses are measured up to the first byte only
+        route = request.url_rule.rule if request.url_rule else '<unmatched>'
+        metrics.registry.observe_request(request.method, route, response.status_code,
+                                         time.perf_counter() - started)
+    
+    profile_id = finish_profile(response.status_code)
+    if profile_id:
+        response.headers['X-CourseSpider-Profile-Id'] = profile_id
+    return response
+
+
+@app.teardown_request
+def release_profile(error):
+    """Finish a profile left open by a request that raised"""
+    finish_profile(500)
+
+
+def process_gauges():
+    """Per-process connection and collection job gauges for /api/metrics"""
+    yield 'courtspider_process_info', {'pid': str(os.getpid())}, 1
+    yield ('courtspider_db_connection_open', {'mode': 'read-only' if db.read_only else 'read-write'},
+           1 if db.conn else 0)
+    by_status = {}
+    for job in list(collection_jobs.values()):
+        by_status[job['status']] = by_status.get(job['status'], 0) + 1
+    for status, count in by_status.items():
+        yield 'courtspider_collection_jobs', {'status': status}, count
+
+
+metrics.registry.register_gauges(process_gauges)
+
+
+@app.before_request
+def route_request():
+    """Connect lazily and send writes from read-only workers to the writer"""
+    if db.conn is None:
+        init_db()
+    
+    if db.read_only and request.endpoint in WRITER_ENDPOINTS:
+        if not WRITER_URL:
+            return jsonify({'success': False, 'error': 'Server is read-only'}), 503
+        try:
+            return forward_to_writer()
+        except urllib.error.URLError as e:
+            return jsonify({'success': False, 'error': f'Writer unavailable: {e.reason}'}), 503
+
+
+def course_filters_from_args(args):
+    """Read the course filter query parameters shared by list and export endpoints"""
+    filters = {
+        'category': args.get('category'),
+        'subcategory': args.get('subcategory'),
+        'language': args.get('language'),
+        'language_name': args.get('language_name'),
+        'author': args.get('author'),
+        'search': args.get('search') or args.get('q'),
+        'min_lessons': args.get('min_lessons'),
+        'max_duration': args.get('max_duration'),
+        'min_duration': args.get('min_duration')
+    }
+    return {k: v for k, v in filters.items() if v is not None}
+
+
 @app.route('/api/courses', methods=['GET'])
+@coalesced
 def get_courses():
     """Search and filter courses"""
     try:
         filters = {
-            'category': request.args.get('category'),
-            'subcategory': request.args.get('subcategory'),
-            'language': request.args.get('language'),
-            'language_name': request.args.get('language_name'),
-            'author': request.args.get('author'),
-            'search': request.args.get('search') or request.args.get('q'),
-            'min_lessons': request.args.get('min_lessons'),
-            'max_duration': request.args.get('max_duration'),
-            'min_duration': request.args.get('min_duration'),
+            **course_filters_from_args(request.args),
             'sort': request.args.get('sort', 'created_at'),
             'order': request.args.get('order', 'DESC'),
             'limit': min(int(request.args.get('limit', 20)), 100),
@@ -67,11 +281,59 @@ def get_courses():
             },
             'filters': filters
         })
+    except ValueError as e:
+        # Unsupported sort or a malformed number
+        return jsonify({'success': False, 'error': f'Invalid parameter: {e}'}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/api/export.ndjson', methods=['GET'])
+def export_ndjson():
+    """Stream the full catalog as newline-delimited JSON.
+    
+    Incremental sync: keep the X-CourseSpider-Change-Seq header of one export
+    and pass it as changed_since_seq next time to get only the courses added
+    or changed since. created_since only filters on when a course was added.
+    """
+    try:
+        filters = course_filters_from_args(request.args)
+        if request.args.get('created_since'):
+            filters['created_since'] = request.args['created_since']
+            db._normalize_timestamp(filters['created_since'])  # Reject bad timestamps up front
+        if request.args.get('changed_since_seq'):
+            filters['changed_since_seq'] = int(request.args['changed_since_seq'])
+        include_lessons = request.args.get('lessons', '').lower() in ('1', 'true', 'yes')
+        
+        # Dedicated read-only connection so the stream never holds the shared one
+        conn = db.open_read_connection()
+        # Read before the courses, so a change racing the export is sent again next time
+        seq = db.get_change_seq(conn)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': f'Invalid created_since or changed_since_seq: {e}'}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
+    
+    def generate():
+        try:
+            chunk = []
+            for course in db.iter_courses(filters, include_lessons, conn=conn):
+                chunk.append(json.dumps(course, ensure_ascii=False))
+                if len(chunk) >= EXPORT_CHUNK_ROWS:
+                    yield '\n'.join(chunk) + '\n'
+                    chunk = []
+            if chunk:
+                yield '\n'.join(chunk) + '\n'
+        finally:
+            conn.close()
+    
+    response = Response(generate(), mimetype='application/x-ndjson')
+    response.headers['X-CourseSpider-Change-Seq'] = str(seq)
+    return response
 
 
 @app.route('/api/courses/<int:course_id>', methods=['GET'])
+@coalesced
 def get_course_by_id(course_id):
     """Get specific course by database ID"""
     try:
@@ -85,7 +347,25 @@ def get_course_by_id(course_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/api/courses/<int:course_id>/related', methods=['GET'])
+@coalesced
+def get_related_courses(course_id):
+    """Get courses similar to a course (precomputed by build_related.py)"""
+    try:
+        limit = min(int(request.args.get('limit', 10)), 50)
+        courses = db.get_related_courses(course_id, limit)
+        
+        # An empty list is fine for a course that is not indexed yet
+        if not courses and not db.get_course_by_id(course_id):
+            return jsonify({'success': False, 'error': 'Course not found'}), 404
+        
+        return jsonify({'success': True, 'data': courses})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @app.route('/api/courses/youtube/<youtube_id>', methods=['GET'])
+@coalesced
 def get_course_by_youtube_id(youtube_id):
     """Get course by YouTube playlist ID"""
     try:
@@ -100,6 +380,7 @@ def get_course_by_youtube_id(youtube_id):
 
 
 @app.route('/api/categories', methods=['GET'])
+@coalesced
 def get_categories():
     """Get all categories with counts"""
     try:
@@ -112,6 +393,7 @@ def get_categories():
 
 
 @app.route('/api/languages', methods=['GET'])
+@coalesced
 def get_languages():
     """Get all languages with counts"""
     try:
@@ -123,7 +405,30 @@ def get_languages():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/api/facets', methods=['GET'])
+@coalesced
+def get_facets():
+    """Get category/subcategory/language counts for the current filters"""
+    try:
+        facets = db.get_facet_counts(course_filters_from_args(request.args))
+        return jsonify({'success': True, 'data': facets})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/api/suggest', methods=['GET'])
+def get_suggestions():
+    """Typeahead completions for titles, authors, subcategories and tags"""
+    try:
+        query = request.args.get('q', '')
+        limit = min(int(request.args.get('limit', 10)), MAX_SUGGESTIONS)
+        return jsonify({'success': True, 'data': suggester.suggest(query, limit)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @app.route('/api/stats', methods=['GET'])
+@coalesced
 def get_stats():
     """Get database statistics"""
     try:
@@ -133,6 +438,17 @@ def get_stats():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/api/duplicates', methods=['GET'])
+def get_duplicates():
+    """List playlists detected as near-duplicates of stored courses"""
+    try:
+        limit = min(int(request.args.get('limit', 100)), 1000)
+        offset = int(request.args.get('offset', 0))
+        return jsonify({'success': True, 'data': db.get_duplicates(limit, offset)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @app.route('/api/search', methods=['POST'])
 def advanced_search():
     """Advanced search with multiple filters"""
@@ -196,6 +512,8 @@ def advanced_search():
             'total': total,
             'query': data
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': f'Invalid parameter: {e}'}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -211,7 +529,56 @@ def health_check():
     })
 
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics for this process"""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+def profile_token_required():
+    """403 for profile reads without the token"""
+    if not profiling.PROFILE_TOKEN:
+        return jsonify({'success': False, 'error': 'Set COURSESPIDER_PROFILE_TOKEN to read profiles'}), 403
+    return jsonify({'success': False, 'error': 'Profile token required'}), 403
+
+
+@app.route('/api/admin/profiles', methods=['GET'])
+def get_profiles():
+    """List stored request profiles, newest first"""
+    if not profiling.authorized(request.headers.get(profiling.PROFILE_HEADER)):
+        return profile_token_required()
+    
+    try:
+        return jsonify({'success': True, 'data': profiling.list_profiles()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """Get a stored request profile (JSON, or the raw cProfile stats with ?format=pstats)"""
+    if not profiling.authorized(request.headers.get(profiling.PROFILE_HEADER)):
+        return profile_token_required()
+    
+    try:
+        if request.args.get('format') == 'pstats':
+            path = profiling.profile_path(profile_id, '.prof')
+            if not path:
+                return jsonify({'success': False, 'error': 'Profile not found'}), 404
+            return send_file(os.path.abspath(path), mimetype='application/octet-stream',
+                             as_attachment=True, download_name=f'{profile_id}.prof')
+        
+        path = profiling.profile_path(profile_id)
+        if not path:
+            return jsonify({'success': False, 'error': 'Profile not found'}), 404
+        with open(path, encoding='utf-8') as f:
+            return jsonify({'success': True, 'data': json.load(f)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @app.route('/api/filters', methods=['GET'])
+@coalesced
 def get_filters():
     """Get all available filter options"""
     try:
@@ -304,74 +671,79 @@ def get_collection_status(job_id):
     })
 
 
+def update_related_courses(job_id):
+    """Add a job's courses to the related-courses index, after the job finishes"""
+    logs = collection_jobs[job_id]['logs']
+    with related_lock:
+        try:
+            from build_related import update_related
+            update_related(db)
+            logs.append('✓ Updated related courses')
+        except ImportError:
+            logs.append('⚠ numpy not installed, related courses not updated')
+        except Exception as e:
+            logs.append(f'⚠ Could not update related courses: {str(e)}')
+
+
 def run_collection(job_id, courses_per_category, categories):
     """Run collection process in background"""
     try:
         from dotenv import load_dotenv
         load_dotenv()
         
-        api_key = os.getenv('YOUTUBE_API_KEY')
-        if not api_key:
+        api_keys = load_api_keys()
+        if not api_keys:
             collection_jobs[job_id]['status'] = 'failed'
             collection_jobs[job_id]['error'] = 'YouTube API key not found'
             return
         
-        collector = EnhancedCourseCollector(api_key)
+        collector = EnhancedCourseCollector(api_keys, db)
         collected_courses = []
         
+        def collected(course):
+            collected_courses.append(course)
+            collection_jobs[job_id]['collected'] = len(collected_courses)
+            collection_jobs[job_id]['logs'].append(f'✓ {course["title"][:50]}...')
+        
+        def failed(e):
+            collection_jobs[job_id]['logs'].append(f'✗ Error: {str(e)}')
+        
         # Get language and custom keywords from request (if provided)
         language_filter = collection_jobs[job_id].get('language')
         custom_keywords = collection_jobs[job_id].get('custom_keywords', [])
         
-        # Process custom keywords first
-        if custom_keywords:
-            collection_jobs[job_id]['logs'].append(f'Processing {len(custom_keywords)} custom keywords...')
-            for keyword in custom_keywords:
-                collection_jobs[job_id]['logs'].append(f'Searching: "{keyword}"')
-                playlists = collector.search_playlists(keyword, 10, language_filter)
-                
-                for playlist in playlists[:courses_per_category]:
-                    try:
-                        course = collector.process_playlist(playlist, 'Custom')
-                        if course:
-                            collected_courses.append(course)
-                            collection_jobs[job_id]['collected'] = len(collected_courses)
-                            collection_jobs[job_id]['logs'].append(
-                                f'✓ {course["title"][:50]}...'
-                            )
-                    except Exception as e:
-                        collection_jobs[job_id]['logs'].append(f'✗ Error: {str(e)}')
-        
-        # Process standard categories
-        for category in categories:
-            if category not in collector.search_keywords:
-                continue
+        try:
+            # Process custom keywords first
+            if custom_keywords:
+                collection_jobs[job_id]['logs'].append(f'Processing {len(custom_keywords)} custom keywords...')
+                for keyword in custom_keywords:
+                    collection_jobs[job_id]['logs'].append(f'Searching: "{keyword}"')
+                    playlists = collector.search_playlists(keyword, 10, language_filter)
+                    collector.process_playlists(playlists[:courses_per_category], 'Custom', courses_per_category,
+                                                collected, failed)
             
-            collection_jobs[job_id]['logs'].append(f'Collecting {category}...')
-            keywords = collector.search_keywords[category]
-            category_courses = []
-            
-            for keyword in keywords:
-                if len(category_courses) >= courses_per_category:
-                    break
+            # Process standard categories
+            for category in categories:
+                if category not in collector.search_keywords:
+                    continue
                 
-                playlists = collector.search_playlists(keyword, 10, language_filter)
+                collection_jobs[job_id]['logs'].append(f'Collecting {category}...')
+                keywords = collector.search_keywords[category]
+                category_courses = []
                 
-                for playlist in playlists:
+                for keyword in keywords:
                     if len(category_courses) >= courses_per_category:
                         break
                     
-                    try:
-                        course = collector.process_playlist(playlist, category)
-                        if course:
-                            category_courses.append(course)
-                            collected_courses.append(course)
-                            collection_jobs[job_id]['collected'] = len(collected_courses)
-                            collection_jobs[job_id]['logs'].append(
-                                f'✓ {course["title"][:50]}...'
-                            )
-                    except Exception as e:
-                        collection_jobs[job_id]['logs'].append(f'✗ Error: {str(e)}')
+                    playlists = collector.search_playlists(keyword, 10, language_filter)
+                    category_courses.extend(collector.process_playlists(
+                        playlists, category, courses_per_category - len(category_courses), collected, failed))
+        except QuotaExhausted as e:
+            # Import what was collected before the keys ran out
+            collection_jobs[job_id]['logs'].append(f'⚠ {str(e)}')
+        finally:
+            collector.api.pool.save()
+            collection_jobs[job_id]['api'] = collector.api.stats()
         
         # Save to database
         if collected_courses:
@@ -389,6 +761,10 @@ def run_collection(job_id, courses_per_category, categories):
                 f'✅ Imported {imported} new courses, skipped {skipped} duplicates'
             )
             
+            # Add the new courses to the related-courses index without holding up the job
+            threading.Thread(target=update_related_courses, args=(job_id,), daemon=True).start()
+            collection_jobs[job_id]['logs'].append('⚙ Updating related courses in the background')
+            
             # Delete JSONL file after successful import
             try:
                 os.remove(filepath)
@@ -419,12 +795,20 @@ def not_found(e):
         'available_endpoints': [
             'GET /api/courses',
             'GET /api/courses/<id>',
+            'GET /api/courses/<id>/related',
             'GET /api/courses/youtube/<youtube_id>',
+            'GET /api/export.ndjson',
             'GET /api/categories',
             'GET /api/languages',
+            'GET /api/facets',
+            'GET /api/suggest',
             'GET /api/stats',
+            'GET /api/duplicates',
             'POST /api/search',
             'GET /api/health',
+            'GET /api/metrics',
+            'GET /api/admin/profiles',
+            'GET /api/admin/profiles/<id>',
             'GET /api/filters'
         ]
     }), 404
@@ -451,16 +835,26 @@ if __name__ == '__main__':
     print('Available endpoints:')
     print(f'  GET  /api/courses - Search and filter courses')
     print(f'  GET  /api/courses/<id> - Get specific course')
+    print(f'  GET  /api/courses/<id>/related - Similar courses')
     print(f'  DELETE /api/courses/<id> - Delete course')
     print(f'  GET  /api/courses/youtube/<id> - Get course by YouTube ID')
+    print(f'  GET  /api/export.ndjson - Stream full catalog (NDJSON)')
     print(f'  GET  /api/categories - List all categories')
     print(f'  GET  /api/languages - List all languages')
+    print(f'  GET  /api/facets - Filter counts for the current query')
+    print(f'  GET  /api/suggest?q= - Typeahead completions')
     print(f'  GET  /api/stats - Database statistics')
+    print(f'  GET  /api/duplicates - Near-duplicate playlists')
     print(f'  POST /api/search - Advanced search')
     print(f'  POST /api/collect - Start collection job')
     print(f'  GET  /api/collect/status/<job_id> - Get collection status')
     print(f'  GET  /api/health - Health check')
+    print(f'  GET  /api/metrics - Prometheus metrics')
+    print(f'  GET  /api/admin/profiles - Stored request profiles')
     print(f'  GET  /api/filters - Available filters')
+    print('')
+    print('For production use: python wsgi.py --workers 4')
     print('=' * 60)
     
+    init_db()
     app.run(host='0.0.0.0', port=PORT, debug=False)
@@ -5,6 +5,13 @@ let currentPage = 1;
 let coursesPerPage = 12;
 let currentCourse = null;
 let currentLesson = null;
+let catalogManifest = null;
+const catalogShards = new Map();
+let sqlDb = null;
+let hasFullTextSearch = false;
+let searchIndex = null;
+let searchIndexUrl = null;
+let searchIndexLoading = null;
 
 // Initialize
 document.addEventListener('DOMContentLoaded', () => {
@@ -22,6 +29,27 @@ async function loadData() {
             </div>
         `;
 
+        // Prefer the sharded catalog export when it is deployed
+        const manifestResponse = await fetch('catalog/manifest.json', { cache: 'no-cache' });
+        if (manifestResponse.ok) {
+            loadManifest(await manifestResponse.json());
+            return;
+        }
+
+        // Then the delta export (base snapshot plus incremental deltas)
+        const deltasResponse = await fetch('deltas/deltas.json', { cache: 'no-cache' });
+        if (deltasResponse.ok) {
+            await loadDeltaCatalog(await deltasResponse.json());
+            return;
+        }
+
+        // Then the single-file columnar export (decoded by columnar.js)
+        const columnarResponse = await fetch('courses.columnar.json', { cache: 'no-cache' });
+        if (columnarResponse.ok) {
+            loadColumnarCatalog(decodeColumnarCatalog(await columnarResponse.json()));
+            return;
+        }
+
         // Initialize SQL.js
         const SQL = await initSqlJs({
             locateFile: file => `https://cdnjs.cloudflare.com/ajax/libs/sql.js/1.8.0/${file}`
@@ -34,12 +62,12 @@ async function loadData() {
         }
 
         const buffer = await response.arrayBuffer();
-        const db = new SQL.Database(new Uint8Array(buffer));
+        sqlDb = new SQL.Database(new Uint8Array(buffer));
 
-        // Query all courses
-        const coursesResult = db.exec(`
+        // Query all courses; lessons are loaded when a course is opened
+        const coursesResult = sqlDb.exec(`
             SELECT * FROM courses 
-            ORDER BY created_at DESC
+            ORDER BY id DESC
         `);
 
         if (!coursesResult.length) {
@@ -47,40 +75,12 @@ async function loadData() {
         }
 
         // Parse courses
-        const coursesColumns = coursesResult[0].columns;
-        const coursesValues = coursesResult[0].values;
-        
-        allCourses = coursesValues.map(row => {
-            const course = {};
-            coursesColumns.forEach((col, idx) => {
-                course[col] = row[idx];
-            });
-
-            // Get lessons for this course
-            const lessonsResult = db.exec(`
-                SELECT * FROM lessons 
-                WHERE course_id = ${course.id}
-                ORDER BY idx
-            `);
-
-            // Parse lessons
-            if (lessonsResult.length > 0) {
-                const lessonsColumns = lessonsResult[0].columns;
-                const lessonsValues = lessonsResult[0].values;
-                
-                course.lessons = lessonsValues.map(lessonRow => {
-                    const lesson = {};
-                    lessonsColumns.forEach((col, idx) => {
-                        lesson[col] = lessonRow[idx];
-                    });
-                    return lesson;
-                });
-            } else {
-                course.lessons = [];
-            }
+        allCourses = rowsToObjects(coursesResult[0]);
 
-            return course;
-        });
+        // Databases built with build_standalone_db.py carry a full-text index
+        hasFullTextSearch = sqlDb.exec(
+            "SELECT 1 FROM sqlite_master WHERE name = 'courses_fts'"
+        ).length > 0;
 
         // Set filtered courses to all courses initially
         filteredCourses = allCourses;
@@ -109,9 +109,6 @@ async function loadData() {
         // Display courses
         displayCourses();
 
-        // Close database
-        db.close();
-
     } catch (error) {
         console.error('Error loading database:', error);
         document.getElementById('coursesContainer').innerHTML = 
@@ -128,6 +125,137 @@ async function loadData() {
     }
 }
 
+// Convert an sql.js result set into row objects
+function rowsToObjects(result) {
+    return result.values.map(row => {
+        const obj = {};
+        result.columns.forEach((col, idx) => {
+            obj[col] = row[idx];
+        });
+        return obj;
+    });
+}
+
+// Show the grid from the card-level manifest; lessons load per course on open
+function loadManifest(manifest) {
+    catalogManifest = manifest;
+    searchIndexUrl = manifest.search_index ? 'catalog/' + manifest.search_index : null;
+    allCourses = manifest.courses;
+    filteredCourses = allCourses;
+
+    const stats = manifest.stats;
+    document.getElementById('totalCourses').textContent = stats.total_courses.toLocaleString();
+    document.getElementById('totalLessons').textContent = stats.total_lessons.toLocaleString();
+    document.getElementById('totalHours').textContent = stats.total_hours.toLocaleString();
+    document.getElementById('totalCategories').textContent = stats.categories.length;
+
+    window.COURSES_STATS = stats;
+    populateFilters();
+    displayCourses();
+}
+
+// Show the full catalog decoded from the columnar export
+function loadColumnarCatalog(catalog) {
+    allCourses = catalog.courses;
+    filteredCourses = allCourses;
+
+    const stats = catalog.stats;
+    document.getElementById('totalCourses').textContent = stats.total_courses.toLocaleString();
+    document.getElementById('totalLessons').textContent = stats.total_lessons.toLocaleString();
+    document.getElementById('totalHours').textContent = stats.total_hours.toLocaleString();
+    document.getElementById('totalCategories').textContent = stats.categories.length;
+
+    window.COURSES_STATS = stats;
+    populateFilters();
+    displayCourses();
+}
+
+// Rebuild the catalog from a base snapshot and its delta chain.
+// Base and delta files are content-hashed and immutable, so after the first
+// visit only deltas published since then are downloaded; the rest comes
+// from the browser cache.
+async function loadDeltaCatalog(chain) {
+    searchIndexUrl = chain.search_index ? 'deltas/' + chain.search_index : null;
+    const files = [chain.base.file, ...chain.deltas.map(delta => delta.file)];
+    const parts = await Promise.all(files.map(async file => {
+        const response = await fetch('deltas/' + file);
+        if (!response.ok) {
+            throw new Error('Could not load ' + file);
+        }
+        return response.json();
+    }));
+
+    const courses = new Map();
+    parts[0].courses.forEach(course => courses.set(course.id, course));
+    parts.slice(1).forEach(delta => {
+        delta.added.forEach(course => courses.set(course.id, course));
+        delta.changed.forEach(course => courses.set(course.id, course));
+        delta.deleted.forEach(id => courses.delete(id));
+    });
+
+    allCourses = [...courses.values()].sort((a, b) => b.id - a.id);
+    filteredCourses = allCourses;
+
+    const stats = {
+        total_courses: allCourses.length,
+        total_lessons: allCourses.reduce((sum, c) => sum + (c.lesson_count || 0), 0),
+        total_hours: Math.round(allCourses.reduce((sum, c) => sum + (c.duration_min || 0), 0) / 60),
+        categories: [...new Set(allCourses.map(c => c.category))],
+        languages: [...new Set(allCourses.map(c => c.language_name))]
+    };
+
+    document.getElementById('totalCourses').textContent = stats.total_courses.toLocaleString();
+    document.getElementById('totalLessons').textContent = stats.total_lessons.toLocaleString();
+    document.getElementById('totalHours').textContent = stats.total_hours.toLocaleString();
+    document.getElementById('totalCategories').textContent = stats.categories.length;
+
+    window.COURSES_STATS = stats;
+    populateFilters();
+    displayCourses();
+}
+
+// Load a course's lessons from the open database or its catalog shard
+async function loadCourseDetails(course) {
+    if (course.lessons) {
+        return;
+    }
+
+    if (sqlDb) {
+        const stmt = sqlDb.prepare('SELECT * FROM lessons WHERE course_id = ? ORDER BY idx');
+        stmt.bind([course.id]);
+        course.lessons = [];
+        while (stmt.step()) {
+            course.lessons.push(stmt.getAsObject());
+        }
+        stmt.free();
+        return;
+    }
+
+    if (!catalogManifest) {
+        return;
+    }
+
+    const shardFile = catalogManifest.shards[course.shard];
+    if (!catalogShards.has(shardFile)) {
+        catalogShards.set(shardFile, fetch('catalog/' + shardFile).then(response => {
+            if (!response.ok) {
+                throw new Error('Could not load course details');
+            }
+            return response.json();
+        }));
+    }
+
+    try {
+        const shard = await catalogShards.get(shardFile);
+        const details = shard.courses[course.id];
+        course.description = details.description;
+        course.lessons = details.lessons;
+    } catch (error) {
+        catalogShards.delete(shardFile);
+        throw error;
+    }
+}
+
 // Populate filter dropdowns
 function populateFilters() {
     const categoryFilter = document.getElementById('categoryFilter');
@@ -163,12 +291,13 @@ function applyFilters() {
     const searchTerm = document.getElementById('searchInput').value.toLowerCase();
     const category = document.getElementById('categoryFilter').value;
     const language = document.getElementById('languageFilter').value;
+    const matchingIds = searchTerm ? (fullTextSearch(searchTerm) || indexSearch(searchTerm)) : null;
 
     filteredCourses = allCourses.filter(course => {
-        const matchesSearch = !searchTerm || 
+        const matchesSearch = !searchTerm || (matchingIds ? matchingIds.has(course.id) :
             course.title.toLowerCase().includes(searchTerm) ||
-            course.description.toLowerCase().includes(searchTerm) ||
-            course.author_name.toLowerCase().includes(searchTerm);
+            (course.description || '').toLowerCase().includes(searchTerm) ||
+            course.author_name.toLowerCase().includes(searchTerm));
         
         const matchesCategory = !category || course.category === category;
         const matchesLanguage = !language || course.language_name === language;
@@ -180,6 +309,108 @@ function applyFilters() {
     displayCourses();
 }
 
+// Course ids matching every search word as a prefix, via the FTS index.
+// Returns null when the index is unavailable so callers fall back to a scan.
+function fullTextSearch(searchTerm) {
+    if (!sqlDb || !hasFullTextSearch) {
+        return null;
+    }
+
+    const words = searchTerm.match(/[\p{L}\p{N}]+/gu);
+    if (!words) {
+        return null;
+    }
+
+    try {
+        const query = words.map(word => `"${word}"*`).join(' ');
+        const result = sqlDb.exec('SELECT rowid FROM courses_fts WHERE courses_fts MATCH ?', [query]);
+        return new Set(result.length ? result[0].values.map(row => row[0]) : []);
+    } catch (error) {
+        console.warn('Full-text search unavailable, using substring search:', error);
+        hasFullTextSearch = false;
+        return null;
+    }
+}
+
+// Course ids matching every search word as a prefix, via the exported
+// search index. Returns null until the index has loaded: the first search
+// starts the download and filters again once it arrives.
+function indexSearch(searchTerm) {
+    if (!searchIndexUrl) {
+        return null;
+    }
+    if (!searchIndex) {
+        loadSearchIndex();
+        return null;
+    }
+
+    const words = searchTerm.match(/[\p{L}\p{N}]+/gu);
+    if (!words) {
+        return null;
+    }
+
+    let matches = null;
+    for (const word of words) {
+        const ids = prefixLookup(word);
+        matches = matches ? new Set([...matches].filter(id => ids.has(id))) : ids;
+        if (!matches.size) {
+            break;
+        }
+    }
+    return matches;
+}
+
+// Ids of courses with any term starting with prefix. Terms are sorted, so
+// a binary search finds the first one and the rest follow it.
+function prefixLookup(prefix) {
+    const terms = searchIndex.terms;
+    let low = 0;
+    let high = terms.length;
+    while (low < high) {
+        const mid = (low + high) >> 1;
+        if (terms[mid] < prefix) {
+            low = mid + 1;
+        } else {
+            high = mid;
+        }
+    }
+
+    const ids = new Set();
+    for (let t = low; t < terms.length && terms[t].startsWith(prefix); t++) {
+        // Postings are gaps between positions in the ids list
+        let position = 0;
+        for (const gap of searchIndex.postings[t]) {
+            position += gap;
+            ids.add(searchIndex.ids[position]);
+        }
+    }
+    return ids;
+}
+
+function loadSearchIndex() {
+    if (searchIndexLoading) {
+        return;
+    }
+
+    searchIndexLoading = fetch(searchIndexUrl)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('Could not load search index');
+            }
+            return response.json();
+        })
+        .then(index => {
+            searchIndex = index;
+            if (document.getElementById('searchInput').value) {
+                applyFilters();
+            }
+        })
+        .catch(error => {
+            console.warn('Search index unavailable, using substring search:', error);
+            searchIndexUrl = null;
+        });
+}
+
 // Display courses
 function displayCourses() {
     const container = document.getElementById('coursesContainer');
@@ -262,8 +493,15 @@ function nextPage() {
 }
 
 // Open course modal
-function openCourse(course) {
+async function openCourse(course) {
     currentCourse = course;
+
+    try {
+        await loadCourseDetails(course);
+    } catch (error) {
+        console.error('Error loading course details:', error);
+        course.lessons = null;
+    }
     
     document.getElementById('modalTitle').textContent = course.title;
     document.getElementById('modalAuthor').textContent = 'by ' + course.author_name + ' - ' + course.lesson_count + ' lessons - ' + Math.round(course.duration_min / 60) + ' hours';
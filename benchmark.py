@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Benchmark CourseSpider's database and API hot paths
+Imports a synthetic catalog (see generate_benchmark_data.py), then times
+DatabaseManager's hot paths and the API endpoints the browse pages use
+(through Flask's test client, so no server is needed). Reports p50/p95/p99
+latency and peak memory per case, saves the results as JSON and compares
+them against a saved baseline.
+
+    python benchmark.py --courses 100000 --save bench/100k.json
+    python benchmark.py --db bench.db --baseline bench/100k.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from database import DatabaseManager
+
+# Slower than the baseline by more than this share counts as a regression
+DEFAULT_TOLERANCE = 0.2
+
+# Whole-catalog cases run fewer times than point queries
+HEAVY_RUNS = 3
+
+
+def percentile(samples: List[float], p: float) -> float:
+    """Nearest-rank percentile of samples"""
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+def measure(fn: Callable, runs: int, memory: bool = True) -> Dict:
+    """Time fn over runs calls after one warm-up call (traced for memory if asked)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        if memory:
+            tracemalloc.start()
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            fn()
+            peak = None
+
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - started)
+
+    return {
+        'runs': runs,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+        'mean_ms': sum(samples) / len(samples) * 1000,
+        'peak_kb': peak / 1024 if peak is not None else None
+    }
+
+
+def import_catalog(db_path: str, data_path: str) -> Dict:
+    """Import data_path into a fresh database at db_path, timed once"""
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    db = DatabaseManager(db_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.initialize()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        imported, skipped = db.import_from_jsonl(data_path)
+    elapsed = time.perf_counter() - started
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.close()
+
+    return {
+        'runs': 1,
+        'p50_ms': elapsed * 1000, 'p95_ms': elapsed * 1000, 'p99_ms': elapsed * 1000, 'mean_ms': elapsed * 1000,
+        # Peak RSS growth; tracing allocations would slow the import several times over
+        'peak_kb': max(0, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before),
+        'courses_per_second': imported / elapsed if elapsed else 0.0,
+        'imported': imported,
+        'skipped': skipped
+    }
+
+
+def database_cases(db: DatabaseManager, db_path: str, workdir: str, rng: random.Random) -> Dict[str, Callable]:
+    """DatabaseManager hot paths, keyed by case name"""
+    ids = [row[0] for row in db.conn.execute('SELECT id FROM courses')]
+    category = db.conn.execute('SELECT category FROM courses GROUP BY category ORDER BY COUNT(*) DESC').fetchone()
+    category = category[0] if category else ''
+
+    from export_to_js import export_database_to_js
+
+    return {
+        'db.search_courses.default': lambda: db.search_courses({}),
+        'db.search_courses.category': lambda: db.search_courses({'category': category, 'min_lessons': 10}),
+        'db.search_courses.text': lambda: db.search_courses({'search': 'react'}),
+        'db.search_courses.popular': lambda: db.search_courses({'sort': 'popularity'}),
+        'db.search_courses.deep_page': lambda: db.search_courses({'offset': len(ids) // 2}),
+        'db.search_courses.count': lambda: db.search_courses({'limit': 999999}),
+        'db.get_statistics': db.get_statistics,
+        'db.get_course_by_id': lambda: db.get_course_by_id(rng.choice(ids)),
+        'db.export_database_to_js': lambda: export_database_to_js(db_path, os.path.join(workdir, 'courses-data.js')),
+    }
+
+
+def api_cases(client, db: DatabaseManager, rng: random.Random) -> Dict[str, Callable]:
+    """API endpoints the browse pages call, keyed by case name"""
+    ids = [row[0] for row in db.conn.execute('SELECT id FROM courses')]
+    category = db.conn.execute('SELECT category FROM courses GROUP BY category ORDER BY COUNT(*) DESC').fetchone()
+    category = category[0] if category else ''
+
+    def get(path: Callable[[], str]):
+        def call():
+            response = client.get(path())
+            if response.status_code != 200:
+                raise RuntimeError(f'{response.status_code} from {response.request.path}')
+        return call
+
+    return {
+        'api.courses': get(lambda: '/api/courses?limit=20'),
+        'api.courses.filtered': get(lambda: f'/api/courses?category={category}&min_lessons=10&sort=popularity'),
+        'api.courses.search': get(lambda: '/api/courses?search=python'),
+        'api.courses.page': get(lambda: f'/api/courses?offset={rng.randrange(0, max(len(ids), 1), 20)}'),
+        'api.course_detail': get(lambda: f'/api/courses/{rng.choice(ids)}'),
+        'api.stats': get(lambda: '/api/stats'),
+        'api.categories': get(lambda: '/api/categories'),
+        'api.languages': get(lambda: '/api/languages'),
+        'api.facets': get(lambda: f'/api/facets?category={category}'),
+        'api.suggest': get(lambda: f"/api/suggest?q={rng.choice(['py', 'rea', 'dock', 'learn', 'java'])}"),
+    }
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Print each case against the baseline; return the names of regressed cases"""
+    regressions = []
+    print(f"\n{'Case':<32} {'p50 ms':>10} {'baseline':>10} {'change':>8}")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            print(f"{name:<32} {result['p50_ms']:>10.2f} {'-':>10} {'new':>8}")
+            continue
+        change = result['p50_ms'] / before['p50_ms'] - 1 if before['p50_ms'] else 0.0
+        marker = ''
+        if change > tolerance:
+            marker = ' ⚠'
+            regressions.append(name)
+        print(f"{name:<32} {result['p50_ms']:>10.2f} {before['p50_ms']:>10.2f} {change:>+7.0%}{marker}")
+    return regressions
+
+
+def run(data_path: Optional[str], db_path: Optional[str], runs: int, memory: bool, seed: int) -> Dict:
+    """Run every case; return the results document"""
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory(prefix='coursespider-bench-') as workdir:
+        results = {}
+
+        if data_path:
+            db_path = os.path.join(workdir, 'courses.db')
+            print(f"⚙ Importing {data_path}...")
+            results['db.import_from_jsonl'] = import_catalog(db_path, data_path)
+            print(f"✓ Imported {results['db.import_from_jsonl']['imported']:,} courses "
+                  f"({results['db.import_from_jsonl']['courses_per_second']:.0f}/s)")
+        else:
+            # Opening a database migrates it; time a copy and leave the user's file as it is
+            copy = os.path.join(workdir, 'courses.db')
+            source = sqlite3.connect(Path(os.path.abspath(db_path)).as_uri() + '?mode=ro', uri=True)
+            target = sqlite3.connect(copy)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+            db_path = copy
+
+        db_path = os.path.abspath(db_path)
+        db = DatabaseManager(db_path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            db.initialize()
+        courses = db.conn.execute('SELECT COUNT(*) FROM courses').fetchone()[0]
+        lessons = db.conn.execute('SELECT COUNT(*) FROM course_videos').fetchone()[0]
+
+        # The API module opens its database on import
+        os.environ['COURSESPIDER_DB'] = db_path
+        with contextlib.redirect_stdout(io.StringIO()):
+            import api_server
+            api_server.init_db()
+        client = api_server.app.test_client()
+
+        cases = {**database_cases(db, db_path, workdir, rng), **api_cases(client, db, rng)}
+        print(f"\n  {'Case':<32} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak KB':>10}")
+        for name, fn in cases.items():
+            heavy = name in ('db.export_database_to_js', 'db.search_courses.count', 'db.get_statistics')
+            results[name] = measure(fn, min(runs, HEAVY_RUNS) if heavy else runs, memory)
+            result = results[name]
+            peak = f"{result['peak_kb']:>10,.0f}" if result['peak_kb'] is not None else f"{'-':>10}"
+            print(f"  {name:<32} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} {peak}")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            db.close()
+            api_server.db.close()
+        return {
+            'meta': {
+                'courses': courses,
+                'lessons': lessons,
+                'runs': runs,
+                'python': platform.python_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'platform': platform.platform(),
+                'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            },
+            'results': results
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time database and API hot paths on a synthetic catalog')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--data', help='JSONL to import into a fresh database before timing')
+    source.add_argument('--courses', default='small',
+                        help='generate this many courses first (small, medium, large or a number)')
+    parser.add_argument('--db', help='existing database to time instead of importing one')
+    parser.add_argument('--runs', type=int, default=50, help='timed calls per case')
+    parser.add_argument('--seed', type=int, default=42, help='random seed for data and request parameters')
+    parser.add_argument('--no-memory', action='store_true', help='skip the traced warm-up run per case')
+    parser.add_argument('--save', help='write the results as JSON to this path')
+    parser.add_argument('--baseline', help='compare against results saved with --save')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='p50 slowdown over the baseline reported as a regression')
+    args = parser.parse_args()
+
+    if args.data and args.db:
+        parser.error('--data imports into a fresh database and would overwrite --db; pass one or the other')
+
+    with tempfile.TemporaryDirectory(prefix='coursespider-data-') as datadir:
+        data_path = args.data
+        if not data_path and not args.db:
+            from generate_benchmark_data import SIZES, generate
+            n = SIZES.get(args.courses) or int(args.courses)
+            data_path = os.path.join(datadir, f'bench_{n}.jsonl')
+            print(f"⚙ Generating {n:,} synthetic courses...")
+            generate(n, data_path, seed=args.seed)
+
+        print(f"\n{'='*60}")
+        print("CourseSpider Benchmark")
+        print(f"{'='*60}\n")
+
+        document = run(data_path, args.db, args.runs, not args.no_memory, args.seed)
+    meta = document['meta']
+    print(f"\n✓ {meta['courses']:,} courses, {meta['lessons']:,} lessons; "
+          f"Python {meta['python']}, SQLite {meta['sqlite']}; peak RSS {meta['max_rss_kb'] / 1024:.0f} MB")
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or '.', exist_ok=True)
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2)
+        print(f"✓ Saved results to {args.save}")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline['meta'].get('courses') != meta['courses']:
+            print(f"⚠ Baseline has {baseline['meta'].get('courses'):,} courses, this run {meta['courses']:,}")
+        regressions = compare(document['results'], baseline['results'], args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} case(s) slower than the baseline by more than {args.tolerance:.0%}")
+        else:
+            print(f"\n✓ No case slower than the baseline by more than {args.tolerance:.0%}")
+
+    print(f"{'='*60}\n")
+    sys.exit(1 if regressions else 0)
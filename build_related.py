@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Build the related-courses index
+Represents every course as a TF-IDF vector over its title, tags,
+subcategory, description and lesson titles, and stores each course's most
+similar courses (cosine similarity) in the related_courses table, where
+GET /api/courses/<id>/related reads them with one indexed lookup.
+
+After the first build only courses touched since the last run (per the
+change log) are recomputed, together with the courses whose lists they
+enter or leave. A long-running process keeps each course's tokens between
+updates and only tokenizes the changed courses again. Term weights drift
+slowly as the catalog grows; run with --full now and then to rebuild every
+list.
+"""
+
+import argparse
+import json
+import math
+import time
+from collections import Counter
+
+import numpy as np
+
+from database import DatabaseManager
+from tokens import tokenize
+
+# Neighbours stored per course
+DEFAULT_K = 10
+
+# Text fields and how much a token in each counts towards its term frequency
+FIELD_WEIGHTS = {'title': 3, 'tags': 2, 'subcategory': 2, 'lessons': 1, 'description': 1}
+
+# Terms in more than this share of courses say little about similarity and
+# make the candidate lists long
+MAX_DF = 0.5
+
+# Highest-weighted terms kept per course
+MAX_TERMS = 64
+
+# Above this share of changed courses an incremental update is not worth it
+INCREMENTAL_LIMIT = 0.2
+
+
+def course_terms(conn, course_ids=None):
+    """Yield (course_id, weighted token counts) for every course, or only the
+    given ones, in id order"""
+    if course_ids is None:
+        yield from batch_terms(conn, '', [])
+        return
+
+    course_ids = sorted(course_ids)
+    for start in range(0, len(course_ids), 500):
+        batch = course_ids[start:start + 500]
+        yield from batch_terms(conn, f"IN ({', '.join('?' * len(batch))})", batch)
+
+
+def batch_terms(conn, condition, params):
+    """course_terms for the courses whose id matches condition"""
+    courses = conn.execute(f'''
+        SELECT id, title, description, subcategory, tags FROM courses
+        {'WHERE id ' + condition if condition else ''}
+        ORDER BY id
+    ''', params)
+    lessons = conn.execute(f'''
+        SELECT cv.course_id, v.title
+        FROM course_videos cv
+        JOIN videos v ON v.video_id = cv.video_id
+        {'WHERE cv.course_id ' + condition if condition else ''}
+        ORDER BY cv.course_id
+    ''', params)
+
+    pending = next(lessons, None)
+    for course in courses:
+        counts = Counter()
+        for field in ('title', 'description', 'subcategory'):
+            for token in tokenize(course[field]):
+                counts[token] += FIELD_WEIGHTS[field]
+        try:
+            tags = json.loads(course['tags']) if course['tags'] else []
+        except ValueError:
+            tags = []
+        for token in tokenize(' '.join(tags)):
+            counts[token] += FIELD_WEIGHTS['tags']
+
+        while pending is not None and pending['course_id'] < course['id']:
+            pending = next(lessons, None)
+        while pending is not None and pending['course_id'] == course['id']:
+            for token in tokenize(pending['title']):
+                counts[token] += FIELD_WEIGHTS['lessons']
+            pending = next(lessons, None)
+
+        yield course['id'], counts
+
+
+class CourseTerms:
+    """Each course's weighted token counts with the vocabulary and document
+    frequencies over them, kept between updates so that only the courses
+    changed since the last one are tokenized again"""
+
+    def __init__(self):
+        self.db_path = None
+        self.seq = None
+        self.rows = {}
+        self.vocabulary = {}
+        self.df = np.zeros(0, dtype=np.int64)
+
+    def refresh(self, db, seq, full=False):
+        """Catch up with the change log up to seq; return the courses tokenized"""
+        if full or self.seq is None or self.db_path != db.db_path or seq < self.seq:
+            self.__init__()
+            self.db_path = db.db_path
+            changed = None
+        else:
+            cursor = db.conn.execute('SELECT DISTINCT course_id FROM change_log WHERE seq > ?', (self.seq,))
+            changed = {row[0] for row in cursor.fetchall()}
+
+        tokenized = set()
+        for course_id, counts in course_terms(db.conn, changed):
+            self.replace(course_id, counts)
+            tokenized.add(course_id)
+        for course_id in (changed or set()) - tokenized:
+            self.replace(course_id, None)
+        self.seq = seq
+        return len(tokenized)
+
+    def replace(self, course_id, counts):
+        """Swap a course's token counts, or drop the course when counts is None"""
+        old = self.rows.pop(course_id, None)
+        if old is not None:
+            self.df[old[0]] -= 1
+        if counts is None:
+            return
+
+        indices = np.array([self.vocabulary.setdefault(token, len(self.vocabulary)) for token in counts], dtype=np.int64)
+        if len(self.vocabulary) > len(self.df):
+            grow = max(len(self.vocabulary) - len(self.df), len(self.df))
+            self.df = np.concatenate([self.df, np.zeros(grow, dtype=np.int64)])
+        self.df[indices] += 1
+        self.rows[course_id] = (indices, np.array(list(counts.values()), dtype=np.float64))
+
+
+class CourseVectors:
+    """L2-normalized TF-IDF rows plus an inverted index for similarity queries"""
+
+    def __init__(self, course_terms):
+        ids = sorted(course_terms.rows)
+        rows = [course_terms.rows[course_id] for course_id in ids]
+        vocabulary = course_terms.vocabulary
+
+        self.ids = np.array(ids, dtype=np.int64)
+        self.row_of = {course_id: row for row, course_id in enumerate(ids)}
+        indptr = np.concatenate([[0], np.cumsum([len(indices) for indices, _ in rows], dtype=np.int64)]).astype(np.int64)
+        indices = np.concatenate([indices for indices, _ in rows]) if rows else np.zeros(0, dtype=np.int64)
+        tf = np.concatenate([counts for _, counts in rows]) if rows else np.zeros(0)
+        n = len(ids)
+
+        df = course_terms.df[:len(vocabulary)]
+        idf = np.log((1 + n) / (1 + df)) + 1
+        weights = (1 + np.log(tf)) * idf[indices]
+        # A term in a single course cannot link it to another
+        useful = (df[indices] > 1) & (df[indices] <= max(MAX_DF * n, 2))
+
+        # Keep each course's strongest terms and normalize what is left
+        self.indptr = [0]
+        kept_terms = []
+        kept_weights = []
+        for row in range(n):
+            start, end = indptr[row], indptr[row + 1]
+            terms = indices[start:end][useful[start:end]]
+            values = weights[start:end][useful[start:end]]
+            if len(terms) > MAX_TERMS:
+                strongest = np.argpartition(-values, MAX_TERMS)[:MAX_TERMS]
+                terms, values = terms[strongest], values[strongest]
+            norm = math.sqrt(float(np.dot(values, values)))
+            kept_terms.append(terms)
+            kept_weights.append(values / norm if norm else values)
+            self.indptr.append(self.indptr[-1] + len(terms))
+        self.indptr = np.array(self.indptr, dtype=np.int64)
+        self.terms = np.concatenate(kept_terms) if kept_terms else np.zeros(0, dtype=np.int64)
+        self.weights = np.concatenate(kept_weights) if kept_weights else np.zeros(0)
+
+        # Postings: for each term, the rows containing it and their weights
+        rows = np.repeat(np.arange(n), np.diff(self.indptr))
+        order = np.argsort(self.terms, kind='stable')
+        self.posting_rows = rows[order]
+        self.posting_weights = self.weights[order]
+        self.posting_ptr = np.searchsorted(self.terms[order], np.arange(len(vocabulary) + 1))
+
+    def similarities(self, row):
+        """(rows, scores) of every other course sharing a term with row"""
+        start, end = self.indptr[row], self.indptr[row + 1]
+        if start == end:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+        rows = []
+        scores = []
+        for term, weight in zip(self.terms[start:end], self.weights[start:end]):
+            lo, hi = self.posting_ptr[term], self.posting_ptr[term + 1]
+            rows.append(self.posting_rows[lo:hi])
+            scores.append(self.posting_weights[lo:hi] * weight)
+        unique, inverse = np.unique(np.concatenate(rows), return_inverse=True)
+        totals = np.bincount(inverse, weights=np.concatenate(scores))
+        others = unique != row
+        return unique[others], totals[others]
+
+    def neighbours(self, row, k):
+        """The k most similar courses to row as [(course_id, score)], best first"""
+        rows, scores = self.similarities(row)
+        if len(rows) > k:
+            best = np.argpartition(-scores, k)[:k]
+            rows, scores = rows[best], scores[best]
+        order = np.lexsort((self.ids[rows], -scores))
+        return [(int(self.ids[rows[i]]), round(float(scores[i]), 6)) for i in order]
+
+
+# Token counts carried over between updates in this process
+terms_cache = CourseTerms()
+
+
+def update_related(db, k=DEFAULT_K, full=False):
+    """Bring related_courses up to date; return the number of lists rewritten"""
+
+    print(f"\n{'='*60}")
+    print("Updating Related Courses")
+    print(f"{'='*60}\n")
+
+    started = time.perf_counter()
+    cursor = db.conn.cursor()
+    seq = db.get_change_seq()
+    last_seq = db.get_setting('related_seq')
+    full = full or last_seq is None or db.get_setting('related_k') != str(k)
+    if not full and int(last_seq) == seq:
+        print("✓ Related courses already up to date")
+        print(f"{'='*60}\n")
+        return 0
+
+    tokenized = terms_cache.refresh(db, seq, full)
+    vectors = CourseVectors(terms_cache)
+    print(f"✓ Vectorized {len(vectors.ids):,} courses ({tokenized:,} tokenized) in {time.perf_counter() - started:.2f}s")
+
+    if full:
+        targets = set(vectors.ids.tolist())
+        removed = set()
+    else:
+        cursor.execute('SELECT DISTINCT course_id FROM change_log WHERE seq > ?', (int(last_seq),))
+        touched = {row[0] for row in cursor.fetchall()}
+        changed = {course_id for course_id in touched if course_id in vectors.row_of}
+        removed = touched - changed
+
+        if len(changed) > INCREMENTAL_LIMIT * max(len(vectors.ids), 1):
+            full = True
+            targets = set(vectors.ids.tolist())
+        else:
+            targets = set(changed)
+
+            # Courses listing a touched course may lose it or see its score move
+            for start in range(0, len(touched), 500):
+                batch = list(touched)[start:start + 500]
+                cursor.execute(f'''
+                    SELECT DISTINCT course_id FROM related_courses
+                    WHERE related_id IN ({', '.join('?' * len(batch))})
+                ''', batch)
+                targets.update(row[0] for row in cursor.fetchall())
+
+            # Courses whose list a changed course now belongs in
+            cursor.execute('SELECT course_id, MIN(score) AS worst, COUNT(*) AS count FROM related_courses GROUP BY course_id')
+            thresholds = {row['course_id']: row['worst'] if row['count'] >= k else 0.0 for row in cursor.fetchall()}
+            for course_id in changed:
+                rows, scores = vectors.similarities(vectors.row_of[course_id])
+                for other, score in zip(vectors.ids[rows].tolist(), scores.tolist()):
+                    if score > thresholds.get(other, 0.0):
+                        targets.add(other)
+
+            targets = {course_id for course_id in targets if course_id in vectors.row_of}
+
+    lists = {course_id: vectors.neighbours(vectors.row_of[course_id], k) for course_id in sorted(targets)}
+
+    if full:
+        cursor.execute('DELETE FROM related_courses')
+    else:
+        stale = sorted(targets | removed)
+        for start in range(0, len(stale), 500):
+            batch = stale[start:start + 500]
+            cursor.execute(f'''
+                DELETE FROM related_courses WHERE course_id IN ({', '.join('?' * len(batch))})
+            ''', batch)
+    cursor.executemany('INSERT INTO related_courses (course_id, rank, related_id, score) VALUES (?, ?, ?, ?)', [
+        (course_id, rank, related_id, score)
+        for course_id, neighbours in lists.items()
+        for rank, (related_id, score) in enumerate(neighbours, 1)
+    ])
+    db.set_setting('related_seq', seq)
+    db.set_setting('related_k', k)
+    db.conn.commit()
+
+    mode = 'full rebuild' if full else 'incremental'
+    print(f"✓ Rewrote {len(lists):,} related lists ({mode}) in {time.perf_counter() - started:.2f}s")
+    print(f"{'='*60}\n")
+    return len(lists)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Precompute similar courses for the related-courses endpoint')
+    parser.add_argument('--db', default='data/courses.db', help='course database path')
+    parser.add_argument('--k', type=int, default=DEFAULT_K, help='similar courses stored per course')
+    parser.add_argument('--full', action='store_true', help='rebuild every list instead of only changed courses')
+    args = parser.parse_args()
+
+    db = DatabaseManager(args.db)
+    db.initialize()
+    try:
+        update_related(db, k=args.k, full=args.full)
+    finally:
+        db.close()
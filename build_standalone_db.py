@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Build a browser-optimized SQLite database for the standalone viewer
+Copies only the columns the viewer reads into a compact, freshly laid out
+file (VACUUM INTO) with a tuned page size, an FTS index and the indexes the
+viewer's queries need
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import zlib
+from pathlib import Path
+
+
+def gzip_size(path):
+    """Size of the file after gzip, i.e. roughly what a browser downloads"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            size += len(compressor.compress(chunk))
+    return size + len(compressor.flush())
+
+
+def build_standalone_db(db_path='data/courses.db', output_path='standalone/courses.db',
+                        page_size=4096, description_chars=300):
+    """Write a trimmed copy of the course database for the browser viewer"""
+
+    print(f"\n{'='*60}")
+    print("Building Standalone Database")
+    print(f"{'='*60}\n")
+
+    source_uri = Path(os.path.abspath(db_path)).as_uri() + '?mode=ro'
+
+    output = Path(output_path)
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    # Build in a scratch file, then VACUUM INTO the destination so the
+    # result has no free pages and is laid out table by table
+    scratch_fd, scratch_path = tempfile.mkstemp(suffix='.db', dir=output.parent)
+    os.close(scratch_fd)
+    conn = sqlite3.connect(scratch_path)
+    try:
+        conn.execute(f'PRAGMA page_size = {int(page_size)}')
+        conn.execute('PRAGMA journal_mode = OFF')
+        conn.execute('PRAGMA synchronous = OFF')
+        conn.execute('ATTACH DATABASE ? AS src', (source_uri,))
+
+        conn.execute('''
+            CREATE TABLE courses (
+                id INTEGER PRIMARY KEY,
+                title TEXT NOT NULL,
+                description TEXT,
+                author_name TEXT,
+                thumbnail TEXT,
+                category TEXT NOT NULL,
+                subcategory TEXT,
+                language_name TEXT NOT NULL,
+                lesson_count INTEGER,
+                duration_min INTEGER
+            )
+        ''')
+        # Clustered on (course_id, idx): a course's lessons sit on adjacent pages
+        conn.execute('''
+            CREATE TABLE lessons (
+                course_id INTEGER NOT NULL,
+                idx INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                video_id TEXT NOT NULL,
+                duration_min INTEGER,
+                PRIMARY KEY (course_id, idx)
+            ) WITHOUT ROWID
+        ''')
+
+        conn.execute('''
+            INSERT INTO courses
+            SELECT id, title, substr(COALESCE(description, ''), 1, ?), author_name, thumbnail,
+                   category, subcategory, language_name, lesson_count, duration_min
+            FROM src.courses
+            ORDER BY id
+        ''', (description_chars,))
+        conn.execute('''
+            INSERT OR IGNORE INTO lessons
+            SELECT l.course_id, l.idx, l.title, l.video_id, l.duration_min
+            FROM src.lessons l
+            JOIN src.courses c ON c.id = l.course_id
+            ORDER BY l.course_id, l.idx
+        ''')
+        conn.commit()
+        conn.execute('DETACH DATABASE src')
+
+        # Filter indexes for the viewer's category/language dropdowns
+        conn.execute('CREATE INDEX idx_courses_category_language ON courses(category, language_name)')
+        conn.execute('CREATE INDEX idx_courses_language ON courses(language_name)')
+
+        # Full-text search over the course text the viewer searches, stored
+        # as an external-content index so the text is not duplicated
+        conn.execute('''
+            CREATE VIRTUAL TABLE courses_fts USING fts5(
+                title, author_name, description,
+                content='courses', content_rowid='id', prefix='2 3'
+            )
+        ''')
+        conn.execute("INSERT INTO courses_fts(courses_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO courses_fts(courses_fts) VALUES ('optimize')")
+
+        conn.execute('ANALYZE')
+        conn.commit()
+
+        courses = conn.execute('SELECT COUNT(*) FROM courses').fetchone()[0]
+        lessons = conn.execute('SELECT COUNT(*) FROM lessons').fetchone()[0]
+
+        tmp_output = output.with_name(output.name + '.tmp')
+        if tmp_output.exists():
+            tmp_output.unlink()
+        conn.execute('VACUUM INTO ?', (str(tmp_output),))
+    finally:
+        conn.close()
+        os.remove(scratch_path)
+
+    os.replace(tmp_output, output)
+
+    before = os.path.getsize(db_path)
+    after = output.stat().st_size
+    print(f"✓ Courses: {courses:,}  Lessons: {lessons:,}")
+    print(f"✓ Page size: {page_size} bytes, descriptions cut to {description_chars} chars")
+    print(f"\n  Source:     {before / 1024 / 1024:8.2f} MB ({gzip_size(db_path) / 1024 / 1024:.2f} MB gzipped)")
+    print(f"  Standalone: {after / 1024 / 1024:8.2f} MB ({gzip_size(output) / 1024 / 1024:.2f} MB gzipped)")
+    print(f"  Reduction:  {100 * (1 - after / before):.1f}%")
+    print(f"\n✓ Written to {output}")
+    print(f"{'='*60}\n")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build a trimmed SQLite database for the standalone viewer')
+    parser.add_argument('--db', default='data/courses.db', help='source database path')
+    parser.add_argument('--output', default='standalone/courses.db', help='output database path')
+    parser.add_argument('--page-size', type=int, default=4096,
+                        help='SQLite page size')
+    parser.add_argument('--description-chars', type=int, default=300,
+                        help='truncate course descriptions to this many characters')
+    args = parser.parse_args()
+
+    build_standalone_db(args.db, args.output, page_size=args.page_size,
+                        description_chars=args.description_chars)
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Build a static HTML site from the course database
+Renders one page per course plus paginated category and language listings,
+ready to upload to any static host or CDN. Pages render in parallel across
+processes, and a state file of content hashes lets later builds rewrite
+only the pages whose content changed.
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote
+
+from database import DatabaseManager
+from export_to_js import course_to_export, get_export_stats
+
+# Bump when the page templates change so every page is rebuilt
+TEMPLATE_VERSION = 1
+
+STATE_FILE = '.build-state.json'
+
+# Courses sent to the worker pool at a time
+RENDER_BATCH = 1000
+
+CARD_FIELDS = ('id', 'title', 'author_name', 'thumbnail', 'category', 'language_name',
+               'lesson_count', 'duration_min')
+
+SITE_CSS = """\
+* { box-sizing: border-box; }
+body { margin: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif;
+       background: #f7f7fb; color: #2d3748; line-height: 1.5; }
+a { color: #667eea; text-decoration: none; }
+a:hover { text-decoration: underline; }
+header { background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 24px; }
+header a { color: white; }
+header h1 { margin: 0 0 4px; font-size: 1.6em; }
+main { max-width: 1100px; margin: 0 auto; padding: 24px; }
+nav.crumbs { font-size: 0.9em; margin-bottom: 16px; }
+.grid { display: grid; grid-template-columns: repeat(auto-fill, minmax(240px, 1fr)); gap: 20px; }
+.card { background: white; border-radius: 10px; overflow: hidden; box-shadow: 0 2px 8px rgba(0,0,0,0.08); }
+.card img { width: 100%; aspect-ratio: 16 / 9; object-fit: cover; display: block; background: #667eea; }
+.card .body { padding: 12px; }
+.card h3 { font-size: 1em; margin: 0 0 6px; }
+.meta { color: #718096; font-size: 0.85em; }
+.tags a { display: inline-block; background: #edf2f7; border-radius: 12px; padding: 2px 10px; margin: 0 6px 6px 0; }
+.pager { display: flex; gap: 8px; justify-content: center; margin: 24px 0; flex-wrap: wrap; }
+.pager a, .pager span { padding: 6px 12px; border-radius: 6px; background: white; }
+.pager span.current { background: #667eea; color: white; }
+ol.lessons { padding-left: 0; list-style: none; }
+ol.lessons li { background: white; border-radius: 8px; padding: 10px 14px; margin-bottom: 8px; display: flex; gap: 12px; }
+ol.lessons .idx { color: #718096; min-width: 2em; }
+ol.lessons .duration { margin-left: auto; color: #718096; white-space: nowrap; }
+.description { white-space: pre-line; background: white; border-radius: 10px; padding: 16px; }
+ul.index { columns: 3 220px; }
+"""
+
+
+def slugify(name):
+    """URL path segment for a category or language name"""
+    slug = re.sub(r'[^\w]+', '-', (name or '').lower()).strip('-')
+    return slug or 'other'
+
+
+def escape(value):
+    return html.escape(str(value)) if value is not None else ''
+
+
+def format_duration(minutes):
+    minutes = minutes or 0
+    hours, rest = divmod(minutes, 60)
+    return f'{hours}h {rest}m' if hours else f'{rest}m'
+
+
+def page_shell(title, root, body, description=''):
+    """Wrap body in the common page layout; root is the relative path to the site root"""
+    return (
+        '<!DOCTYPE html>\n'
+        '<html lang="en">\n<head>\n'
+        '<meta charset="UTF-8">\n'
+        '<meta name="viewport" content="width=device-width, initial-scale=1.0">\n'
+        f'<title>{escape(title)}</title>\n'
+        f'<meta name="description" content="{escape(description[:160])}">\n'
+        f'<link rel="stylesheet" href="{root}site.css">\n'
+        '</head>\n<body>\n'
+        f'<header><h1><a href="{root}index.html">Free Courses</a></h1>'
+        '<div>Free programming courses from YouTube</div></header>\n'
+        f'<main>\n{body}\n</main>\n'
+        '</body>\n</html>\n'
+    )
+
+
+def render_card(card, root):
+    thumbnail = escape(card['thumbnail'])
+    image = f'<img src="{thumbnail}" alt="" loading="lazy">' if thumbnail else '<img alt="">'
+    return (
+        f'<article class="card"><a href="{root}courses/{card["id"]}.html">{image}</a>'
+        f'<div class="body"><h3><a href="{root}courses/{card["id"]}.html">{escape(card["title"])}</a></h3>'
+        f'<div class="meta">{escape(card["author_name"])}</div>'
+        f'<div class="meta">{card["lesson_count"] or 0} lessons · {format_duration(card["duration_min"])}'
+        f' · {escape(card["language_name"])}</div></div></article>'
+    )
+
+
+def render_pager(page, pages):
+    if pages <= 1:
+        return ''
+    links = []
+    for number in range(1, pages + 1):
+        if number == page:
+            links.append(f'<span class="current">{number}</span>')
+        else:
+            links.append(f'<a href="{listing_file(number)}">{number}</a>')
+    return '<nav class="pager">' + ''.join(links) + '</nav>'
+
+
+def listing_file(page):
+    return 'index.html' if page == 1 else f'page-{page}.html'
+
+
+def render_course_page(course):
+    """Full HTML page for one course"""
+    root = '../'
+    category = f'<a href="{root}categories/{quote(slugify(course["category"]))}/">{escape(course["category"])}</a>'
+    language = (f'<a href="{root}languages/{quote(slugify(course["language_name"]))}/">'
+                f'{escape(course["language_name"])}</a>')
+
+    lessons = []
+    for lesson in course['lessons']:
+        watch = f'https://www.youtube.com/watch?v={quote(lesson["video_id"])}&amp;list={quote(course["youtube_id"])}'
+        lessons.append(
+            f'<li><span class="idx">{lesson["idx"]}.</span>'
+            f'<a href="{watch}" rel="noopener">{escape(lesson["title"])}</a>'
+            f'<span class="duration">{format_duration(lesson["duration_min"])}</span></li>'
+        )
+
+    body = (
+        f'<nav class="crumbs"><a href="{root}index.html">All courses</a> › {category}</nav>\n'
+        f'<h2>{escape(course["title"])}</h2>\n'
+        f'<p class="meta">By <a href="{escape(course["author_homepage"])}" rel="noopener">'
+        f'{escape(course["author_name"])}</a> · {course["lesson_count"] or 0} lessons · '
+        f'{format_duration(course["duration_min"])} · {language}'
+        + (f' · {escape(course["subcategory"])}' if course['subcategory'] else '') + '</p>\n'
+        f'<p><a href="{escape(course["url"])}" rel="noopener">Watch the playlist on YouTube</a></p>\n'
+        + (f'<div class="description">{escape(course["description"])}</div>\n' if course['description'] else '')
+        + '<h3>Lessons</h3>\n<ol class="lessons">\n' + '\n'.join(lessons) + '\n</ol>'
+    )
+    return page_shell(course['title'], root, body, course['description'] or '')
+
+
+def render_listing_page(title, cards, page, pages, total):
+    """One page of a category or language listing"""
+    root = '../../'
+    body = (
+        f'<nav class="crumbs"><a href="{root}index.html">All courses</a></nav>\n'
+        f'<h2>{escape(title)}</h2>\n'
+        f'<p class="meta">{total:,} courses · page {page} of {pages}</p>\n'
+        '<div class="grid">\n' + '\n'.join(render_card(card, root) for card in cards) + '\n</div>\n'
+        + render_pager(page, pages)
+    )
+    return page_shell(f'{title} - page {page}' if page > 1 else title, root, body,
+                      f'{total} free {title} courses')
+
+
+def render_home_page(stats, categories, languages, newest):
+    root = ''
+    category_links = ''.join(
+        f'<li><a href="categories/{quote(slugify(name))}/">{escape(name)}</a> ({count:,})</li>'
+        for name, count in categories
+    )
+    language_links = ''.join(
+        f'<li><a href="languages/{quote(slugify(name))}/">{escape(name)}</a> ({count:,})</li>'
+        for name, count in languages
+    )
+    body = (
+        f'<p class="meta">{stats["total_courses"]:,} courses · {stats["total_lessons"]:,} lessons · '
+        f'{stats["total_hours"]:,} hours</p>\n'
+        f'<h2>Categories</h2>\n<ul class="index">{category_links}</ul>\n'
+        f'<h2>Languages</h2>\n<ul class="index">{language_links}</ul>\n'
+        '<h2>Newest courses</h2>\n'
+        '<div class="grid">\n' + '\n'.join(render_card(card, root) for card in newest) + '\n</div>'
+    )
+    return page_shell('Free Courses', root, body, 'Free programming courses from YouTube')
+
+
+def render_page(job):
+    """Render and write one page (runs in a worker process)"""
+    output_dir, path, kind, args = job
+    if kind == 'course':
+        content = render_course_page(*args)
+    elif kind == 'listing':
+        content = render_listing_page(*args)
+    else:
+        content = render_home_page(*args)
+
+    target = Path(output_dir) / path
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + '.tmp')
+    tmp.write_text(content, encoding='utf-8')
+    os.replace(tmp, target)
+    return path
+
+
+def content_hash(data):
+    """Stable hash of the data a page is rendered from"""
+    encoded = json.dumps([TEMPLATE_VERSION, data], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()[:16]
+
+
+def build_static_site(db_path='data/courses.db', output_dir='site', per_page=24, workers=None, force=False):
+    """Render the static site, rewriting only pages whose content changed"""
+
+    print(f"\n{'='*60}")
+    print("Building Static Site")
+    print(f"{'='*60}\n")
+
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+    state_path = output / STATE_FILE
+    previous = {}
+    if state_path.exists() and not force:
+        previous = json.loads(state_path.read_text(encoding='utf-8')).get('pages', {})
+
+    pages = {}
+    rendered = 0
+
+    def up_to_date(path, digest):
+        pages[path] = digest
+        return previous.get(path) == digest and (output / path).exists()
+
+    db = DatabaseManager(db_path)
+    db.initialize(read_only=True)
+    stats = get_export_stats(db.conn)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        def render(jobs):
+            nonlocal rendered
+            for _ in executor.map(render_page, jobs, chunksize=32):
+                rendered += 1
+
+        # Course pages, newest first; only card fields are kept for listings
+        cards = []
+        batch = []
+        for course in db.iter_courses(include_lessons=True, descending=True):
+            full = course_to_export(course)
+            cards.append({field: full[field] for field in CARD_FIELDS})
+
+            path = f'courses/{full["id"]}.html'
+            if not up_to_date(path, content_hash(full)):
+                batch.append((str(output), path, 'course', (full,)))
+            if len(batch) >= RENDER_BATCH:
+                render(batch)
+                batch = []
+        render(batch)
+        db.close()
+
+        # Paginated listings per category and per language
+        jobs = []
+        groups = {}
+        for card in cards:
+            groups.setdefault(('categories', card['category']), []).append(card)
+            groups.setdefault(('languages', card['language_name']), []).append(card)
+
+        for (section, name), members in groups.items():
+            page_count = max(1, -(-len(members) // per_page))
+            for page in range(1, page_count + 1):
+                chunk = members[(page - 1) * per_page:page * per_page]
+                path = f'{section}/{slugify(name)}/{listing_file(page)}'
+                args = (name, chunk, page, page_count, len(members))
+                if not up_to_date(path, content_hash(args)):
+                    jobs.append((str(output), path, 'listing', args))
+
+        def counts(section):
+            return sorted(((name, len(members)) for (kind, name), members in groups.items() if kind == section),
+                          key=lambda item: (-item[1], item[0] or ''))
+
+        home_stats = {key: stats[key] for key in ('total_courses', 'total_lessons', 'total_hours')}
+        args = (home_stats, counts('categories'), counts('languages'), cards[:per_page])
+        if not up_to_date('index.html', content_hash(args)):
+            jobs.append((str(output), 'index.html', 'home', args))
+        render(jobs)
+
+    css_path = output / 'site.css'
+    if not css_path.exists() or css_path.read_text(encoding='utf-8') != SITE_CSS:
+        css_path.write_text(SITE_CSS, encoding='utf-8')
+
+    # Remove pages for courses, categories or pages that no longer exist
+    removed = 0
+    for path in previous:
+        if path not in pages and (output / path).exists():
+            (output / path).unlink()
+            removed += 1
+
+    state = {'template_version': TEMPLATE_VERSION,
+             'built_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+             'pages': pages}
+    tmp = output / (STATE_FILE + '.tmp')
+    tmp.write_text(json.dumps(state), encoding='utf-8')
+    os.replace(tmp, state_path)
+
+    print(f"✓ Pages: {len(pages):,} ({rendered:,} rendered, {len(pages) - rendered:,} unchanged, {removed:,} removed)")
+    print(f"✓ Courses: {len(cards):,}  Categories: {len(counts('categories'))}  Languages: {len(counts('languages'))}")
+    print(f"\n✓ Site written to {output}/ - upload it to any static host or CDN")
+    print(f"{'='*60}\n")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Render static HTML pages for every course')
+    parser.add_argument('--db', default='data/courses.db', help='SQLite database path')
+    parser.add_argument('--output', default='site', help='output directory (default: site)')
+    parser.add_argument('--per-page', type=int, default=24, help='courses per listing page')
+    parser.add_argument('--workers', type=int, help='render processes (default: CPU count)')
+    parser.add_argument('--force', action='store_true', help='rebuild every page, ignoring the build state')
+    args = parser.parse_args()
+
+    build_static_site(args.db, args.output, per_page=args.per_page, workers=args.workers, force=args.force)
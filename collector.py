@@ -7,17 +7,40 @@ Collects detailed course metadata including lessons, descriptions, language, etc
 import os
 import json
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Optional
-from googleapiclient.discovery import build
+from typing import Callable, List, Dict, Optional, Tuple, Union
 from googleapiclient.errors import HttpError
 
+from database import DUPLICATE_POLICY, DUPLICATE_THRESHOLD, STATS_MAX_AGE_DAYS, VIDEO_COLUMNS, DatabaseManager
+from youtube_client import QuotaExhausted, YouTubeAPI
+
 class EnhancedCourseCollector:
-    def __init__(self, api_key: str):
-        self.youtube = build('youtube', 'v3', developerKey=api_key)
-        self.api_key = api_key
+    def __init__(self, api_keys: Union[str, List[str]], db=None):
+        # Calls are spread over every key, with adaptive concurrency
+        self.api = YouTubeAPI([api_keys] if isinstance(api_keys, str) else list(api_keys))
         self.data_dir = 'data'
         
+        # Known videos and channels are reused instead of fetched again:
+        # from the database when one is given, and from this run's cache
+        self.db = db
+        self.video_cache: Dict[str, Dict] = {}
+        self.channel_cache: Dict[str, int] = {}
+        self.videos_fetched = 0
+        self.videos_reused = 0
+        self.duplicates_skipped = 0
+        self.courses_refreshed = 0
+        self.stats_changed = 0
+        # Playlists are processed on several threads; guards counters and duplicate writes
+        self.lock = threading.Lock()
+        # Worker threads read through their own read-only connections, since
+        # the shared one may be importing on another thread
+        self.local = threading.local()
+        self.readers: List[DatabaseManager] = []
+        # Video sets of the playlists collected in this run, not stored yet
+        self.collected_videos: Dict[str, set] = {}
+        
         # Create data directory if it doesn't exist
         os.makedirs(self.data_dir, exist_ok=True)
         
@@ -140,8 +163,7 @@ class EnhancedCourseCollector:
             if language:
                 params['relevanceLanguage'] = language
             
-            request = self.youtube.search().list(**params)
-            response = request.execute()
+            response = self.api.call('search', **params)
             return response.get('items', [])
         except HttpError as e:
             print(f"Error searching for '{keyword}': {e}")
@@ -150,11 +172,11 @@ class EnhancedCourseCollector:
     def get_playlist_details(self, playlist_id: str) -> Optional[Dict]:
         """Get detailed playlist information"""
         try:
-            request = self.youtube.playlists().list(
+            response = self.api.call(
+                'playlists',
                 part='snippet,contentDetails',
                 id=playlist_id
             )
-            response = request.execute()
             items = response.get('items', [])
             return items[0] if items else None
         except HttpError as e:
@@ -168,13 +190,13 @@ class EnhancedCourseCollector:
         
         try:
             while True:
-                request = self.youtube.playlistItems().list(
+                response = self.api.call(
+                    'playlistItems',
                     part='snippet,contentDetails',
                     playlistId=playlist_id,
                     maxResults=50,
                     pageToken=page_token
                 )
-                response = request.execute()
                 
                 videos.extend(response.get('items', []))
                 page_token = response.get('nextPageToken')
@@ -193,30 +215,174 @@ class EnhancedCourseCollector:
             return []
         
         try:
-            request = self.youtube.videos().list(
+            response = self.api.call(
+                'videos',
                 part='snippet,contentDetails,statistics',
                 id=','.join(video_ids)
             )
-            response = request.execute()
             return response.get('items', [])
         except HttpError as e:
             print(f"Error getting video details: {e}")
             return []
     
+    def get_video_statistics(self, video_ids: List[str]) -> Optional[Dict[str, Dict]]:
+        """View and like counts of up to 50 videos, keyed by video ID (None on error)"""
+        try:
+            response = self.api.call('videos', part='statistics', id=','.join(video_ids))
+        except HttpError as e:
+            print(f"Error getting video statistics: {e}")
+            return None
+        
+        stats = {}
+        for video in response.get('items', []):
+            statistics = video.get('statistics', {})
+            stats[video['id']] = {
+                'view_count': int(statistics.get('viewCount', 0)),
+                'like_count': int(statistics.get('likeCount', 0))
+            }
+        return stats
+    
+    def reader(self) -> DatabaseManager:
+        """This thread's read-only view of the database"""
+        reader = getattr(self.local, 'db', None)
+        if reader is None or reader.conn is None:
+            reader = DatabaseManager(self.db.db_path)
+            reader.conn = self.db.open_read_connection()
+            reader.read_only = True
+            self.local.db = reader
+            with self.lock:
+                self.readers.append(reader)
+        return reader
+    
+    def close_readers(self):
+        """Close the read-only connections opened by worker threads"""
+        with self.lock:
+            readers, self.readers = self.readers, []
+        for reader in readers:
+            if reader.conn:
+                reader.conn.close()
+                reader.conn = None
+    
+    def collected_duplicate(self, video_ids: List[str], claim: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """(playlist, overlap) of a playlist collected in this run that video_ids
+        near-duplicates, or None. With claim, the video set is recorded for that
+        playlist when it is not a duplicate, in the same locked step."""
+        videos = set(video_ids)
+        with self.lock:
+            for playlist_id, collected in self.collected_videos.items():
+                overlap = len(videos & collected) / len(videos | collected)
+                if overlap >= DUPLICATE_THRESHOLD:
+                    return playlist_id, overlap
+            if claim:
+                self.collected_videos[claim] = videos
+        return None
+    
+    def refresh_stats(self, video_ids: List[str]) -> int:
+        """Refetch the view and like counts of stored videos and update their courses.
+        
+        Returns the number of videos whose counts changed.
+        """
+        changed = 0
+        for i in range(0, len(video_ids), 50):
+            batch = video_ids[i:i+50]
+            stats = self.get_video_statistics(batch)
+            if stats is None:
+                continue
+            for video_id, counts in stats.items():
+                if video_id in self.video_cache:
+                    self.video_cache[video_id].update(counts)
+            with self.lock:
+                count = self.db.update_video_stats(stats, batch)
+                self.stats_changed += count
+            changed += count
+        return changed
+    
+    def refresh_all(self, max_age_days: float = STATS_MAX_AGE_DAYS, limit: Optional[int] = None) -> int:
+        """Refresh the stats of every stored video not checked for max_age_days"""
+        video_ids = self.reader().get_stale_video_ids(max_age_days, limit=limit)
+        print(f"↻ Refreshing stats of {len(video_ids)} videos not checked for {max_age_days:g} days")
+        
+        # 10 calls per task, spread over the API's concurrency
+        chunks = [video_ids[i:i+500] for i in range(0, len(video_ids), 500)]
+        changed = 0
+        try:
+            with ThreadPoolExecutor(max_workers=self.api.max_concurrency) as executor:
+                for count in executor.map(self.refresh_stats, chunks):
+                    changed += count
+        except QuotaExhausted as e:
+            print(f"⚠ Stopping early: {e}")
+        finally:
+            self.api.pool.save()
+            self.close_readers()
+        
+        print(f"✓ Updated view/like counts of {changed} videos")
+        return changed
+    
     def get_channel_details(self, channel_id: str) -> Optional[Dict]:
         """Get channel details"""
         try:
-            request = self.youtube.channels().list(
+            response = self.api.call(
+                'channels',
                 part='snippet,statistics',
                 id=channel_id
             )
-            response = request.execute()
             items = response.get('items', [])
             return items[0] if items else None
         except HttpError as e:
             print(f"Error getting channel {channel_id}: {e}")
             return None
     
+    def video_to_lesson(self, video: Dict) -> Dict:
+        """Convert a videos().list item into lesson fields (without idx)"""
+        return {
+            'title': video['snippet']['title'],
+            'video_id': video['id'],
+            'duration_min': self.parse_duration(video['contentDetails']['duration']),
+            'description': video['snippet'].get('description', ''),
+            'thumbnail': video['snippet']['thumbnails'].get('medium', {}).get('url', ''),
+            'published_at': video['snippet']['publishedAt'],
+            'view_count': int(video.get('statistics', {}).get('viewCount', 0)),
+            'like_count': int(video.get('statistics', {}).get('likeCount', 0))
+        }
+    
+    def get_videos(self, video_ids: List[str]) -> Dict[str, Dict]:
+        """Lesson fields for each available video, fetching only unknown ones"""
+        videos = {vid: self.video_cache[vid] for vid in video_ids if vid in self.video_cache}
+        
+        if self.db:
+            unknown = [vid for vid in video_ids if vid not in videos]
+            for vid, row in self.reader().get_videos(unknown).items():
+                videos[vid] = {'video_id': vid, **{col: row[col] for col in VIDEO_COLUMNS}}
+        
+        missing = [vid for vid in dict.fromkeys(video_ids) if vid not in videos]
+        with self.lock:
+            self.videos_reused += len(set(video_ids)) - len(missing)
+        
+        # Fetch the rest in batches of 50
+        for i in range(0, len(missing), 50):
+            batch = missing[i:i+50]
+            for video in self.get_video_details(batch):
+                lesson = self.video_to_lesson(video)
+                videos[lesson['video_id']] = lesson
+                self.video_cache[lesson['video_id']] = lesson
+                with self.lock:
+                    self.videos_fetched += 1
+        
+        return videos
+    
+    def get_channel_subscribers(self, channel_id: str) -> int:
+        """Subscriber count of a channel, fetched only if the channel is unknown"""
+        if channel_id not in self.channel_cache:
+            known = self.reader().get_channel(channel_id) if self.db else None
+            if known:
+                self.channel_cache[channel_id] = known['subscribers'] or 0
+            else:
+                channel_details = self.get_channel_details(channel_id)
+                self.channel_cache[channel_id] = (
+                    int(channel_details.get('statistics', {}).get('subscriberCount', 0)) if channel_details else 0
+                )
+        return self.channel_cache[channel_id]
+    
     def extract_tags(self, text: str) -> List[str]:
         """Extract tags from text"""
         common_tags = [
@@ -281,6 +447,22 @@ class EnhancedCourseCollector:
         playlist_id = playlist_item.get('id', {}).get('playlistId') or playlist_item.get('id')
         print(f"Processing: {playlist_item['snippet']['title']}")
         
+        if self.db and self.reader().is_known_playlist(playlist_id):
+            course_id = self.reader().get_course_id(playlist_id)
+            if course_id is None:
+                print("  ⚠️  Skipping: merged into a stored course")
+                with self.lock:
+                    self.duplicates_skipped += 1
+                return None
+            
+            # Stored courses are not collected again, but their stats are kept current
+            stale = self.reader().get_stale_video_ids(course_id=course_id)
+            changed = self.refresh_stats(stale) if stale else 0
+            print(f"  ↻ Already in the database: refreshed {len(stale)} videos, {changed} changed")
+            with self.lock:
+                self.courses_refreshed += 1
+            return None
+        
         # Get detailed playlist info
         playlist_details = self.get_playlist_details(playlist_id)
         if not playlist_details:
@@ -292,38 +474,40 @@ class EnhancedCourseCollector:
             print(f"  ⚠️  Skipping: Only {len(playlist_videos)} videos (minimum 5 required)")
             return None
         
-        # Get video details in batches of 50
         video_ids = [v['contentDetails']['videoId'] for v in playlist_videos]
-        video_details = []
         
-        for i in range(0, len(video_ids), 50):
-            batch = video_ids[i:i+50]
-            details = self.get_video_details(batch)
-            video_details.extend(details)
+        # Re-uploads and mirrors of a stored course are merged before any video is fetched
+        if self.db and DUPLICATE_POLICY == 'merge':
+            matches = self.reader().find_near_duplicates(video_ids)
+            if matches:
+                print(f"  ⚠️  Skipping: {matches[0]['overlap']:.0%} of videos shared with \"{matches[0]['title']}\"")
+                with self.lock:
+                    self.db.record_duplicate(self.db.conn.cursor(), playlist_id, matches[0], merged=True)
+                    self.db.conn.commit()
+                    self.duplicates_skipped += 1
+                return None
+        
+        # So are mirrors of a playlist collected earlier in this run
+        if DUPLICATE_POLICY == 'merge' and self.skip_collected_duplicate(video_ids):
+            return None
+        
+        # Get video details, reusing videos that are already known
+        videos = self.get_videos(video_ids)
         
         # Get channel details
         channel_id = playlist_details['snippet']['channelId']
-        channel_details = self.get_channel_details(channel_id)
+        subscribers = self.get_channel_subscribers(channel_id)
         
-        # Calculate total duration and build lessons
+        # Calculate total duration and build lessons (private or deleted videos are skipped)
         total_duration = 0
         lessons = []
         
-        for i, video in enumerate(video_details):
-            duration = self.parse_duration(video['contentDetails']['duration'])
-            total_duration += duration
-            
-            lessons.append({
-                'idx': i + 1,
-                'title': video['snippet']['title'],
-                'video_id': video['id'],
-                'duration_min': duration,
-                'description': video['snippet'].get('description', ''),
-                'thumbnail': video['snippet']['thumbnails'].get('medium', {}).get('url', ''),
-                'published_at': video['snippet']['publishedAt'],
-                'view_count': int(video.get('statistics', {}).get('viewCount', 0)),
-                'like_count': int(video.get('statistics', {}).get('likeCount', 0))
-            })
+        for video_id in video_ids:
+            if video_id not in videos:
+                continue
+            lesson = {'idx': len(lessons) + 1, **videos[video_id]}
+            total_duration += lesson['duration_min']
+            lessons.append(lesson)
         
         # Detect language
         language_code = self.detect_language(playlist_details['snippet'])
@@ -344,7 +528,7 @@ class EnhancedCourseCollector:
                 'name': playlist_details['snippet']['channelTitle'],
                 'channel_id': channel_id,
                 'homepage': f"https://www.youtube.com/channel/{channel_id}",
-                'subscribers': int(channel_details.get('statistics', {}).get('subscriberCount', 0)) if channel_details else 0
+                'subscribers': subscribers
             },
             'description': playlist_details['snippet'].get('description', ''),
             'duration_min': total_duration,
@@ -360,9 +544,64 @@ class EnhancedCourseCollector:
             'tags': self.extract_tags(text)
         }
         
+        # A mirror in the same batch may have finished first; only one is kept
+        if DUPLICATE_POLICY == 'merge' and self.skip_collected_duplicate(video_ids, claim=playlist_id):
+            return None
+        
         print(f"  ✓ Collected: {len(lessons)} lessons, {total_duration} min, {language_name}")
         return course
     
+    def skip_collected_duplicate(self, video_ids: List[str], claim: Optional[str] = None) -> bool:
+        """True (and counted) if video_ids near-duplicates a playlist collected in this run"""
+        match = self.collected_duplicate(video_ids, claim)
+        if not match:
+            return False
+        print(f"  ⚠️  Skipping: {match[1]:.0%} of videos shared with playlist {match[0]}, collected in this run")
+        with self.lock:
+            self.duplicates_skipped += 1
+        return True
+    
+    def process_playlists(self, playlists: List[Dict], category: str, limit: int,
+                          on_course: Optional[Callable[[Dict], None]] = None,
+                          on_error: Optional[Callable[[Exception], None]] = None) -> List[Dict]:
+        """Process playlists concurrently, in order, until limit courses are collected"""
+        def process(playlist):
+            try:
+                return self.process_playlist(playlist, category)
+            except QuotaExhausted:
+                raise
+            except Exception as e:
+                print(f"  ✗ Error processing playlist: {e}")
+                if on_error:
+                    on_error(e)
+                return None
+        
+        courses = []
+        pending = list(playlists)
+        exhausted = None
+        with ThreadPoolExecutor(max_workers=self.api.max_concurrency) as executor:
+            # Only as many playlists at once as courses are still needed, so no
+            # quota is spent on playlists a sequential run would not have reached
+            while pending and len(courses) < limit and exhausted is None:
+                batch, pending = pending[:limit - len(courses)], pending[limit - len(courses):]
+                futures = [executor.submit(process, playlist) for playlist in batch]
+                # Every result is collected, so courses finished after a quota
+                # error in the same batch are kept; the error is raised after
+                for future in futures:
+                    try:
+                        course = future.result()
+                    except QuotaExhausted as e:
+                        exhausted = e
+                        continue
+                    if course:
+                        courses.append(course)
+                        if on_course:
+                            on_course(course)
+        self.close_readers()
+        if exhausted:
+            raise exhausted
+        return courses
+    
     def save_courses(self, courses: List[Dict], filename: str):
         """Save courses to JSONL file"""
         filepath = os.path.join(self.data_dir, filename)
@@ -384,32 +623,32 @@ class EnhancedCourseCollector:
         all_courses = []
         timestamp = datetime.now().strftime('%Y-%m-%d')
         
-        for category, keywords in self.search_keywords.items():
-            print(f"\n📚 Category: {category}")
-            print('-' * 60)
-            
-            category_courses = []
-            
-            for keyword in keywords:
-                if len(category_courses) >= max_per_category:
-                    break
+        try:
+            for category, keywords in self.search_keywords.items():
+                print(f"\n📚 Category: {category}")
+                print('-' * 60)
                 
-                print(f"\n🔍 Searching: \"{keyword}\"")
-                playlists = self.search_playlists(keyword, 10)
+                category_courses = []
                 
-                for playlist in playlists:
+                # Kept as they arrive, so a batch cut short by the quota is not lost
+                def keep(course):
+                    category_courses.append(course)
+                    all_courses.append(course)
+                
+                for keyword in keywords:
                     if len(category_courses) >= max_per_category:
                         break
                     
-                    try:
-                        course = self.process_playlist(playlist, category)
-                        if course:
-                            category_courses.append(course)
-                            all_courses.append(course)
-                    except Exception as e:
-                        print(f"  ✗ Error processing playlist: {e}")
-            
-            print(f"\n✓ Collected {len(category_courses)} courses for {category}")
+                    print(f"\n🔍 Searching: \"{keyword}\"")
+                    playlists = self.search_playlists(keyword, 10)
+                    self.process_playlists(playlists, category, max_per_category - len(category_courses), keep)
+                
+                print(f"\n✓ Collected {len(category_courses)} courses for {category}")
+        except QuotaExhausted as e:
+            # Keep what was collected; the rest waits for the quota reset
+            print(f"\n⚠ Stopping early: {e}")
+        finally:
+            self.api.pool.save()
         
         # Save to file
         filename = f"courses_{timestamp}.jsonl"
@@ -420,6 +659,14 @@ class EnhancedCourseCollector:
         print('Collection Complete!')
         print('=' * 60)
         print(f"Total courses: {len(all_courses)}")
+        print(f"Videos fetched: {self.videos_fetched}, reused: {self.videos_reused}")
+        print(f"Merged or near-duplicate playlists skipped: {self.duplicates_skipped}")
+        print(f"Stored courses refreshed: {self.courses_refreshed} ({self.stats_changed} videos changed)")
+        stats = self.api.stats()
+        print(f"API calls: {stats['calls']} ({stats['units']} quota units), retries: {stats['retries']}, "
+              f"quota errors: {stats['quota_errors']}, rate limited: {stats['rate_limit_errors']}, "
+              f"other errors: {stats['other_errors'] + stats['server_errors']}")
+        print(f"Quota left: {', '.join(f'{key} {units}' for key, units in stats['quota_remaining'].items())}")
         print(f"File: {filename}")
         
         language_counts = {}
@@ -439,16 +686,33 @@ if __name__ == '__main__':
     import sys
     from dotenv import load_dotenv
     
+    from youtube_client import load_api_keys
+    
     load_dotenv()
-    api_key = os.getenv('YOUTUBE_API_KEY')
+    api_keys = load_api_keys()
     
-    if not api_key:
-        print('❌ Error: YOUTUBE_API_KEY not found in environment variables')
+    if not api_keys:
+        print('❌ Error: YOUTUBE_API_KEYS or YOUTUBE_API_KEY not found in environment variables')
         print('Please set it in your .env file or export it:')
-        print('  export YOUTUBE_API_KEY="your_api_key"')
+        print('  export YOUTUBE_API_KEYS="first_key,second_key"')
         sys.exit(1)
     
-    max_per_category = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    # Reuse videos and channels already in the database
+    db = None
+    if os.path.exists('data/courses.db'):
+        from database import DatabaseManager
+        db = DatabaseManager()
+        db.initialize()
     
-    collector = EnhancedCourseCollector(api_key)
+    collector = EnhancedCourseCollector(api_keys, db)
+    
+    # python collector.py --refresh [days]: only refetch view/like counts of stored videos
+    if len(sys.argv) > 1 and sys.argv[1] == '--refresh':
+        if not db:
+            print('❌ Error: no database to refresh (data/courses.db)')
+            sys.exit(1)
+        collector.refresh_all(float(sys.argv[2]) if len(sys.argv) > 2 else STATS_MAX_AGE_DAYS)
+        sys.exit(0)
+    
+    max_per_category = int(sys.argv[1]) if len(sys.argv) > 1 else 5
     collector.collect_all(max_per_category)
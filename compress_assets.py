@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Precompress standalone assets
+Writes .gz (and .br when the brotli module is installed) siblings next to
+every static asset so serve.py can send the smallest variant the browser
+accepts without compressing on each request
+"""
+
+import argparse
+import gzip
+import os
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# File types worth compressing; images and archives are already compressed.
+# The viewer downloads courses.db whole, so it gets variants too (serve.py
+# still answers Range requests from the plain file)
+COMPRESSIBLE = {'.html', '.js', '.css', '.json', '.svg', '.txt', '.md', '.db'}
+
+ENCODINGS = ('.gz', '.br')
+
+
+def compress_gzip(data):
+    # mtime=0 keeps the output byte-identical between builds
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def compress_brotli(data):
+    return brotli.compress(data, quality=11)
+
+
+def write_variant(source, suffix, compress):
+    """Write source+suffix unless it is up to date; return (written, size)"""
+    target = source.with_name(source.name + suffix)
+    source_mtime = source.stat().st_mtime
+    if target.exists() and target.stat().st_mtime >= source_mtime:
+        return False, target.stat().st_size
+
+    data = source.read_bytes()
+    compressed = compress(data)
+    if len(compressed) >= len(data):
+        # Not worth it; make sure a stale variant is not served instead
+        if target.exists():
+            target.unlink()
+        return False, None
+
+    tmp = target.with_name(target.name + '.tmp')
+    tmp.write_bytes(compressed)
+    os.replace(tmp, target)
+    # Carry the source mtime so serve.py can tell the variant is current
+    os.utime(target, (source_mtime, source_mtime))
+    return True, len(compressed)
+
+
+def compress_assets(root='standalone'):
+    """Precompress every compressible file under root"""
+
+    print(f"\n{'='*60}")
+    print("Precompressing Static Assets")
+    print(f"{'='*60}\n")
+
+    root = Path(root)
+    if not brotli:
+        print("⚠ brotli not installed, writing .gz only (pip install brotli)")
+
+    variants = [('.gz', compress_gzip)]
+    if brotli:
+        variants.append(('.br', compress_brotli))
+
+    written = 0
+    total_raw = 0
+    total_best = 0
+    for dirpath, _, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            path = Path(dirpath) / filename
+
+            if path.suffix in ENCODINGS:
+                # Drop variants whose source file is gone
+                if not path.with_suffix('').exists():
+                    path.unlink()
+                    print(f"  removed stale {path}")
+                continue
+            if path.suffix not in COMPRESSIBLE:
+                continue
+
+            raw = path.stat().st_size
+            best = raw
+            for suffix, compress in variants:
+                changed, size = write_variant(path, suffix, compress)
+                written += changed
+                if size is not None:
+                    best = min(best, size)
+
+            total_raw += raw
+            total_best += best
+            if best < raw:
+                print(f"  {str(path):<50} {raw / 1024:10.1f} KB -> {best / 1024:8.1f} KB")
+
+    print(f"\n✓ {written} compressed files written")
+    if total_raw:
+        print(f"✓ Total: {total_raw / 1024 / 1024:.2f} MB -> {total_best / 1024 / 1024:.2f} MB "
+              f"({100 * (1 - total_best / total_raw):.1f}% smaller)")
+    print(f"{'='*60}\n")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write .gz/.br siblings for standalone assets')
+    parser.add_argument('root', nargs='?', default='standalone', help='directory to compress (default: standalone)')
+    args = parser.parse_args()
+
+    compress_assets(args.root)
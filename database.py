@@ -6,26 +6,204 @@ Manages SQLite database for efficient querying
 
 import sqlite3
 import json
+import math
 import os
-from typing import List, Dict, Optional, Tuple
-from datetime import datetime
+import time
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple, Iterator, Iterable
+from datetime import datetime, timezone
+
+import descriptions
+import metrics
+import profiling
+
+
+# Low-cardinality columns exposed as facets (each also accepted as a filter)
+FACET_COLUMNS = ('category', 'subcategory', 'language_name')
+
+# Course rows with the channel details that are stored once per channel
+COURSE_SELECT = '''
+    SELECT c.*, ch.homepage AS author_homepage, ch.subscribers AS author_subscribers
+    FROM courses c
+    LEFT JOIN channels ch ON ch.channel_id = c.author_channel_id
+'''
+
+VIDEO_COLUMNS = ('title', 'duration_min', 'description', 'thumbnail', 'published_at',
+                 'view_count', 'like_count')
+
+# Columns of the videos table; descriptions are kept compressed in video_descriptions
+VIDEO_TABLE_COLUMNS = tuple(col for col in VIDEO_COLUMNS if col != 'description')
+
+# Lessons with their compressed descriptions (see _inflate_description)
+LESSON_SELECT = '''
+    SELECT l.*, d.dict_id AS description_dict, d.data AS description_data
+    FROM lessons l
+    LEFT JOIN video_descriptions d ON d.video_id = l.video_id
+'''
+
+# Materialized per-course aggregates, maintained by refresh_course_stats
+COURSE_STAT_COLUMNS = ('total_views', 'total_likes', 'avg_views', 'popularity')
+
+# Sort keys accepted by search_courses, mapped to the column they order by
+SORT_COLUMNS = {
+    'created_at': 'c.created_at',
+    'id': 'c.id',
+    'title': 'c.title',
+    'author_name': 'c.author_name',
+    'published_at': 'c.published_at',
+    'last_updated': 'c.last_updated',
+    'lesson_count': 'c.lesson_count',
+    'duration_min': 'c.duration_min',
+    'popularity': 'c.popularity',
+    'views': 'c.total_views',
+    'total_views': 'c.total_views',
+    'likes': 'c.total_likes',
+    'total_likes': 'c.total_likes',
+    'avg_views': 'c.avg_views'
+}
+
+
+def parse_popularity_weights(spec: str) -> Dict[str, float]:
+    """Parse "views=1,likes=2" into weights, on top of the defaults"""
+    weights = {'views': 1.0, 'likes': 1.0, 'avg_views': 1.0, 'subscribers': 0.5}
+    for item in spec.split(','):
+        name, _, value = item.partition('=')
+        if name.strip():
+            if name.strip() not in weights:
+                raise ValueError(f'Unknown popularity signal: {name.strip()}')
+            weights[name.strip()] = float(value)
+    return weights
+
+
+# Popularity is the sum of weight * log10(1 + signal) over these signals
+POPULARITY_WEIGHTS = parse_popularity_weights(os.environ.get('COURSESPIDER_POPULARITY_WEIGHTS', ''))
+
+# Playlists sharing at least this share of their videos with a stored course
+# (Jaccard similarity of the video sets) are near-duplicates of it
+DUPLICATE_THRESHOLD = float(os.environ.get('COURSESPIDER_DUPLICATE_THRESHOLD', 0.8))
+
+# What happens to a near-duplicate: 'merge' records the playlist as an alias
+# of the stored course instead of storing it, 'flag' stores it and records
+# the match, 'off' skips the check
+DUPLICATE_POLICY = os.environ.get('COURSESPIDER_DUPLICATE_POLICY', 'merge')
+
+# Train the first description dictionary once this many descriptions are stored
+DESCRIPTION_TRAINING_MIN = 500
+
+# Descriptions sampled to train a dictionary
+DESCRIPTION_TRAINING_SAMPLE = 5000
+
+# View and like counts checked longer ago than this are refetched by stats refreshes
+STATS_MAX_AGE_DAYS = float(os.environ.get('COURSESPIDER_STATS_MAX_AGE_DAYS', 7))
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that reports statement and fetch timings to the metrics registry"""
+    
+    # Statement recorded for the request being profiled, if any
+    profile_entry = None
+    
+    def execute(self, sql, parameters=()):
+        self.last_sql = sql
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.registry.observe_sql(sql, elapsed)
+            if profiling.current is not None:
+                self.profile_entry = profiling.observe_sql(self, sql, parameters, elapsed)
+    
+    def executemany(self, sql, seq_of_parameters):
+        self.last_sql = sql
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.registry.observe_sql(sql, elapsed)
+            if profiling.current is not None:
+                self.profile_entry = profiling.observe_sql(self, sql, seq_of_parameters, elapsed, many=True)
+    
+    def fetchone(self):
+        start = time.perf_counter()
+        try:
+            row = super().fetchone()
+        finally:
+            metrics.registry.observe_fetch(self.last_sql, time.perf_counter() - start)
+        if self.profile_entry is not None:
+            profiling.observe_rows(self.profile_entry, row is not None)
+        return row
+    
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        try:
+            rows = super().fetchmany(size or self.arraysize)
+        finally:
+            metrics.registry.observe_fetch(self.last_sql, time.perf_counter() - start)
+        if self.profile_entry is not None:
+            profiling.observe_rows(self.profile_entry, len(rows))
+        return rows
+    
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            rows = super().fetchall()
+        finally:
+            metrics.registry.observe_fetch(self.last_sql, time.perf_counter() - start)
+        if self.profile_entry is not None:
+            profiling.observe_rows(self.profile_entry, len(rows))
+        return rows
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors (including execute shortcuts) are TimedCursors"""
+    
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+    
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
 
 
 class DatabaseManager:
     def __init__(self, db_path: str = 'data/courses.db'):
         self.db_path = db_path
         self.conn = None
+        self.read_only = False
+        self.description_dicts = {}
+        # Dictionary new descriptions are compressed with, looked up once per import
+        self.current_dict: Optional[Tuple[int, bytes]] = None
+        self.importing = False
         
         # Ensure data directory exists
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
     
-    def initialize(self):
+    def initialize(self, read_only: bool = False):
         """Initialize database connection and create tables"""
-        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.read_only = read_only
+        if read_only:
+            self.conn = self.open_read_connection()
+            print('✓ Connected to SQLite database (read-only)')
+            return
+        
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False, factory=TimedConnection)
         self.conn.row_factory = sqlite3.Row
+        # WAL keeps readers in other processes unblocked while collection jobs write
+        self.conn.execute('PRAGMA journal_mode=WAL')
         print('✓ Connected to SQLite database')
         self.create_tables()
     
+    def open_read_connection(self) -> sqlite3.Connection:
+        """Open a separate read-only connection (for long-running streaming reads)"""
+        uri = Path(os.path.abspath(self.db_path)).as_uri() + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, factory=TimedConnection)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
     def create_tables(self):
         """Create database tables"""
         cursor = self.conn.cursor()
@@ -42,8 +220,6 @@ class DatabaseManager:
                 description TEXT,
                 author_name TEXT,
                 author_channel_id TEXT,
-                author_homepage TEXT,
-                author_subscribers INTEGER DEFAULT 0,
                 duration_min INTEGER DEFAULT 0,
                 lesson_count INTEGER DEFAULT 0,
                 language TEXT NOT NULL,
@@ -54,38 +230,357 @@ class DatabaseManager:
                 verified_free INTEGER DEFAULT 1,
                 scraped_at TEXT,
                 tags TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                total_views INTEGER DEFAULT 0,
+                total_likes INTEGER DEFAULT 0,
+                avg_views REAL DEFAULT 0,
+                popularity REAL DEFAULT 0
             )
         ''')
         
-        # Create lessons table
+        # Create channels table (author details, stored once per channel)
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS lessons (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                course_id INTEGER NOT NULL,
-                idx INTEGER NOT NULL,
+            CREATE TABLE IF NOT EXISTS channels (
+                channel_id TEXT PRIMARY KEY,
+                name TEXT,
+                homepage TEXT,
+                subscribers INTEGER DEFAULT 0,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Create videos table (one row per video, shared by every playlist containing it)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS videos (
+                video_id TEXT PRIMARY KEY,
                 title TEXT NOT NULL,
-                video_id TEXT NOT NULL,
                 duration_min INTEGER DEFAULT 0,
-                description TEXT,
                 thumbnail TEXT,
                 published_at TEXT,
                 view_count INTEGER DEFAULT 0,
                 like_count INTEGER DEFAULT 0,
-                FOREIGN KEY (course_id) REFERENCES courses (id) ON DELETE CASCADE
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                stats_checked_at DATETIME
+            )
+        ''')
+        
+        # Create course_videos table (a course's lessons, in order)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS course_videos (
+                course_id INTEGER NOT NULL,
+                idx INTEGER NOT NULL,
+                video_id TEXT NOT NULL,
+                PRIMARY KEY (course_id, idx),
+                FOREIGN KEY (course_id) REFERENCES courses (id) ON DELETE CASCADE,
+                FOREIGN KEY (video_id) REFERENCES videos (video_id)
+            ) WITHOUT ROWID
+        ''')
+        
+        # Create description tables (lesson descriptions, deflated against a shared dictionary)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS description_dicts (
+                id INTEGER PRIMARY KEY,
+                data BLOB NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS video_descriptions (
+                video_id TEXT PRIMARY KEY,
+                dict_id INTEGER NOT NULL DEFAULT 0,
+                data BLOB NOT NULL
             )
         ''')
         
+        # Create settings table (values the stored data was derived with)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+        
+        # Create related_courses table (similar courses, written by build_related.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS related_courses (
+                course_id INTEGER NOT NULL,
+                rank INTEGER NOT NULL,
+                related_id INTEGER NOT NULL,
+                score REAL NOT NULL,
+                PRIMARY KEY (course_id, rank)
+            ) WITHOUT ROWID
+        ''')
+        
+        # Create playlist_duplicates table (near-duplicate playlists and what they duplicate)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS playlist_duplicates (
+                youtube_id TEXT PRIMARY KEY,
+                course_id INTEGER NOT NULL,
+                overlap REAL NOT NULL,
+                merged INTEGER NOT NULL DEFAULT 0,
+                detected_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        migrated = self.migrate_lessons_table(cursor)
+        migrated = self.migrate_video_descriptions(cursor) or migrated
+        self.migrate_course_stats(cursor)
+        self.migrate_video_stats_checked(cursor)
+        
+        # Lessons keep their original shape for readers, joined from the tables
+        # above; descriptions are added by LESSON_SELECT
+        cursor.execute('''
+            CREATE VIEW IF NOT EXISTS lessons AS
+            SELECT cv.course_id, cv.idx, v.title, cv.video_id, v.duration_min,
+                   v.thumbnail, v.published_at, v.view_count, v.like_count
+            FROM course_videos cv
+            JOIN videos v ON v.video_id = cv.video_id
+        ''')
+        
+        # Keep the course's author name in sync with its channel, and drop a
+        # deleted course's lessons (foreign keys are not enforced)
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_channels_name AFTER UPDATE OF name ON channels
+            WHEN NEW.name IS NOT OLD.name
+            BEGIN
+                UPDATE courses SET author_name = NEW.name WHERE author_channel_id = NEW.channel_id;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_courses_delete_videos AFTER DELETE ON courses
+            BEGIN
+                DELETE FROM course_videos WHERE course_id = OLD.id;
+            END
+        ''')
+        
         # Create indexes
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_courses_category ON courses(category)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_courses_language ON courses(language)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_courses_subcategory ON courses(subcategory)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_lessons_course_id ON lessons(course_id)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_courses_youtube_id ON courses(youtube_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_courses_channel ON courses(author_channel_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_course_videos_video ON course_videos(video_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_courses_popularity ON courses(popularity)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_courses_total_views ON courses(total_views)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_related_courses_related ON related_courses(related_id)')
+        
+        self.create_change_log(cursor)
+        
+        # Rescore every course when the popularity weights change
+        weights = json.dumps(POPULARITY_WEIGHTS, sort_keys=True)
+        if self.get_setting('popularity_weights') != weights:
+            print('⚙ Computing course popularity...')
+            self.refresh_course_stats(cursor)
+            self.set_setting('popularity_weights', weights)
         
         self.conn.commit()
+        if migrated:
+            # Reclaim the pages of the duplicated video copies and raw descriptions
+            self.conn.execute('VACUUM')
         print('✓ Database tables created/verified')
     
+    def migrate_lessons_table(self, cursor) -> bool:
+        """Move an older database to the channels/videos/course_videos tables.
+        
+        Older databases kept a full copy of every video in lessons, once per
+        playlist containing it, and the channel details on every course.
+        Videos and channels are folded into their own tables (the most recent
+        copy wins), lessons is replaced by a view over course_videos, and the
+        moved course columns are dropped.
+        """
+        cursor.execute("SELECT type FROM sqlite_master WHERE name = 'lessons'")
+        row = cursor.fetchone()
+        if not row or row[0] != 'table':
+            return False
+        
+        print('⚙ Migrating lessons to channels/videos tables...')
+        columns = {info[1] for info in cursor.execute('PRAGMA table_info(courses)').fetchall()}
+        
+        if 'author_homepage' in columns:
+            cursor.execute('''
+                INSERT OR REPLACE INTO channels (channel_id, name, homepage, subscribers)
+                SELECT author_channel_id, author_name, author_homepage, author_subscribers
+                FROM courses
+                WHERE COALESCE(author_channel_id, '') != ''
+                ORDER BY id
+            ''')
+        
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO videos (video_id, {', '.join(VIDEO_TABLE_COLUMNS)})
+            SELECT video_id, {', '.join(VIDEO_TABLE_COLUMNS)}
+            FROM lessons
+            ORDER BY id
+        ''')
+        cursor.execute('SELECT video_id, description FROM lessons ORDER BY id')
+        self.store_descriptions(cursor, {row[0]: row[1] for row in cursor.fetchall()})
+        cursor.execute('''
+            INSERT OR IGNORE INTO course_videos (course_id, idx, video_id)
+            SELECT course_id, idx, video_id
+            FROM lessons
+            WHERE course_id IN (SELECT id FROM courses)
+        ''')
+        cursor.execute('DROP TABLE lessons')
+        
+        for column in ('author_homepage', 'author_subscribers'):
+            if column in columns:
+                cursor.execute(f'ALTER TABLE courses DROP COLUMN {column}')
+        
+        cursor.execute('SELECT COUNT(*) FROM videos')
+        videos = cursor.fetchone()[0]
+        cursor.execute('SELECT COUNT(*) FROM channels')
+        print(f'✓ Migrated {videos} videos and {cursor.fetchone()[0]} channels')
+        return True
+    
+    def migrate_course_stats(self, cursor):
+        """Add the materialized stats columns to an older courses table"""
+        columns = {info[1] for info in cursor.execute('PRAGMA table_info(courses)').fetchall()}
+        for column in COURSE_STAT_COLUMNS:
+            if column not in columns:
+                kind = 'INTEGER' if column.startswith('total_') else 'REAL'
+                cursor.execute(f'ALTER TABLE courses ADD COLUMN {column} {kind} DEFAULT 0')
+    
+    def migrate_video_stats_checked(self, cursor):
+        """Add the stats check time to an older videos table (NULL falls back to updated_at)"""
+        columns = {info[1] for info in cursor.execute('PRAGMA table_info(videos)').fetchall()}
+        if 'stats_checked_at' not in columns:
+            cursor.execute('ALTER TABLE videos ADD COLUMN stats_checked_at DATETIME')
+    
+    def migrate_video_descriptions(self, cursor) -> bool:
+        """Move descriptions stored inline in videos to video_descriptions"""
+        columns = {info[1] for info in cursor.execute('PRAGMA table_info(videos)').fetchall()}
+        if 'description' not in columns:
+            return False
+        
+        print('⚙ Compressing video descriptions...')
+        cursor.execute('SELECT video_id, description FROM videos')
+        self.store_descriptions(cursor, {row[0]: row[1] for row in cursor.fetchall()})
+        
+        # The lessons view reads the column; it is recreated without it
+        cursor.execute('DROP VIEW IF EXISTS lessons')
+        cursor.execute('ALTER TABLE videos DROP COLUMN description')
+        return True
+    
+    def store_descriptions(self, cursor, texts: Dict[str, str]):
+        """Compress many descriptions at once with a dictionary trained on them"""
+        cursor.executemany('''
+            INSERT OR REPLACE INTO video_descriptions (video_id, dict_id, data) VALUES (?, 0, ?)
+        ''', ((video_id, descriptions.compress(text)) for video_id, text in texts.items() if text))
+        
+        cursor.execute('SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM video_descriptions')
+        count, stored = cursor.fetchone()
+        # Too few samples make a poor dictionary; insert_course trains one once there are enough
+        if count >= DESCRIPTION_TRAINING_MIN:
+            self.recompress_descriptions(cursor)
+            cursor.execute('SELECT COALESCE(SUM(LENGTH(data)), 0) FROM video_descriptions')
+            stored = cursor.fetchone()[0]
+        raw = sum(len(text.encode('utf-8')) for text in texts.values() if text)
+        print(f'✓ Compressed {count} descriptions: {raw / 1024 / 1024:.2f} MB -> {stored / 1024 / 1024:.2f} MB')
+    
+    def create_change_log(self, cursor):
+        """Create the change log and the triggers that feed it.
+        
+        The log keeps the latest change per course: every insert, update or
+        delete of a course (or of one of its lessons, or of a video or channel
+        it uses) replaces the course's entry with a new, higher seq. Lessons
+        are only inserted together with their new course, whose own insert
+        is logged, so inserting them logs nothing more. Consumers
+        such as the delta exporter remember the last seq they processed and
+        read only newer entries, while the table stays bounded by the number
+        of courses ever stored.
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                course_id INTEGER UNIQUE NOT NULL,
+                op TEXT NOT NULL,
+                changed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Refreshed stats are derived from the videos and channels, which log
+        # their own changes, so only updates of the other columns count
+        content = ', '.join(info[1] for info in cursor.execute('PRAGMA table_info(courses)').fetchall()
+                            if info[1] not in COURSE_STAT_COLUMNS)
+        # Recording when stats were checked changes nothing a reader sees
+        video_content = ', '.join(info[1] for info in cursor.execute('PRAGMA table_info(videos)').fetchall()
+                                  if info[1] != 'stats_checked_at')
+        
+        # (name, event, table, query for the affected course ids, op)
+        triggers = (
+            ('courses_insert', 'INSERT', 'courses', 'SELECT NEW.id', 'insert'),
+            ('courses_update', f'UPDATE OF {content}', 'courses', 'SELECT NEW.id', 'update'),
+            ('courses_delete', 'DELETE', 'courses', 'SELECT OLD.id', 'delete'),
+            ('course_videos_update', 'UPDATE', 'course_videos', 'SELECT NEW.course_id', 'update'),
+            ('course_videos_delete', 'DELETE', 'course_videos', 'SELECT OLD.course_id', 'update'),
+            # A shared video or channel changes every course that uses it
+            ('videos_update', f'UPDATE OF {video_content}', 'videos',
+             'SELECT course_id FROM course_videos WHERE video_id = NEW.video_id', 'update'),
+            ('channels_update', 'UPDATE', 'channels',
+             'SELECT id FROM courses WHERE author_channel_id = NEW.channel_id', 'update'),
+        )
+        # One log write per lesson made a single import write ~20 entries per course
+        cursor.execute('DROP TRIGGER IF EXISTS trg_course_videos_insert')
+        
+        for name, event, table, courses, op in triggers:
+            # Old entries are deleted explicitly rather than with INSERT OR
+            # REPLACE: triggers fired by an upsert take on its conflict policy.
+            # Recreated each time so older databases pick up changes.
+            cursor.execute(f'DROP TRIGGER IF EXISTS trg_{name}')
+            cursor.execute(f'''
+                CREATE TRIGGER trg_{name} AFTER {event} ON {table}
+                BEGIN
+                    DELETE FROM change_log WHERE course_id IN ({courses});
+                    INSERT INTO change_log (course_id, op) SELECT DISTINCT *, '{op}' FROM ({courses});
+                END
+            ''')
+    
+    def get_change_seq(self, conn: Optional[sqlite3.Connection] = None) -> int:
+        """Latest change log sequence number (a generation number for the catalog)"""
+        cursor = (conn or self.conn).cursor()
+        cursor.execute('SELECT COALESCE(MAX(seq), 0) FROM change_log')
+        return cursor.fetchone()[0]
+    
+    def get_setting(self, key: str) -> Optional[str]:
+        """Stored setting value, or None if it was never set"""
+        row = self.conn.execute('SELECT value FROM settings WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+    
+    def set_setting(self, key: str, value):
+        """Store a setting (committed with the caller's transaction)"""
+        self.conn.execute('INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)', (key, str(value)))
+    
+    def get_max_course_id(self) -> int:
+        """Highest course id ever assigned (ids are never reused)"""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'courses'")
+        row = cursor.fetchone()
+        return row[0] if row else 0
+    
+    def get_changes_since(self, seq: int, max_course_id: int) -> Dict[str, List[int]]:
+        """Classify courses changed after seq as added, changed or deleted.
+        
+        max_course_id is the highest course id at the time of seq: anything
+        above it did not exist yet and counts as added.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT l.course_id, c.id IS NOT NULL AS present
+            FROM change_log l
+            LEFT JOIN courses c ON c.id = l.course_id
+            WHERE l.seq > ?
+            ORDER BY l.course_id
+        ''', (seq,))
+        
+        changes = {'added': [], 'changed': [], 'deleted': []}
+        for row in cursor.fetchall():
+            known = row['course_id'] <= max_course_id
+            if row['present']:
+                changes['changed' if known else 'added'].append(row['course_id'])
+            elif known:
+                changes['deleted'].append(row['course_id'])
+            # Created and deleted again since seq: nothing to report
+        return changes
+    
     def import_from_jsonl(self, filepath: str) -> Tuple[int, int]:
         """Import courses from JSONL file"""
         print(f"\nImporting courses from {filepath}...")
@@ -93,17 +588,22 @@ class DatabaseManager:
         imported = 0
         skipped = 0
         
-        with open(filepath, 'r', encoding='utf-8') as f:
-            for line in f:
-                try:
-                    course = json.loads(line)
-                    if self.insert_course(course):
-                        imported += 1
-                    else:
+        self.importing = True
+        self.current_dict = None
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        course = json.loads(line)
+                        if self.insert_course(course):
+                            imported += 1
+                        else:
+                            skipped += 1
+                    except Exception as e:
+                        print(f"Error importing course: {e}")
                         skipped += 1
-                except Exception as e:
-                    print(f"Error importing course: {e}")
-                    skipped += 1
+        finally:
+            self.importing = False
         
         print(f"✓ Imported {imported} courses, skipped {skipped} duplicates")
         return imported, skipped
@@ -111,20 +611,42 @@ class DatabaseManager:
     def insert_course(self, course: Dict) -> bool:
         """Insert a single course with its lessons"""
         cursor = self.conn.cursor()
+        if not self.importing:
+            self.current_dict = None
         
         # Check if course already exists
-        cursor.execute('SELECT id FROM courses WHERE youtube_id = ?', (course['youtube_id'],))
-        if cursor.fetchone():
-            return False  # Course already exists
+        if self.is_known_playlist(course['youtube_id']):
+            return False  # Course already exists (or was merged into one)
+        
+        # Re-uploads, mirrors and compilations of a stored course
+        duplicate = None
+        if DUPLICATE_POLICY != 'off' and course.get('lessons'):
+            matches = self.find_near_duplicates([lesson['video_id'] for lesson in course['lessons']])
+            if matches:
+                duplicate = matches[0]
+                if DUPLICATE_POLICY == 'merge':
+                    self.record_duplicate(cursor, course['youtube_id'], duplicate, merged=True)
+                    self.conn.commit()
+                    return False
+        
+        # Channel details are stored once per channel
+        channel_changed = False
+        if course['author'].get('channel_id'):
+            channel_changed = self.upsert_channel(cursor, {
+                'channel_id': course['author']['channel_id'],
+                'name': course['author'].get('name', 'Unknown'),
+                'homepage': course['author'].get('homepage', ''),
+                'subscribers': course['author'].get('subscribers', 0)
+            })
         
         # Insert course
         cursor.execute('''
             INSERT INTO courses (
                 youtube_id, url, category, subcategory, title, description,
-                author_name, author_channel_id, author_homepage, author_subscribers,
+                author_name, author_channel_id,
                 duration_min, lesson_count, language, language_name, thumbnail,
                 published_at, last_updated, verified_free, scraped_at, tags
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             course['youtube_id'],
             course['url'],
@@ -134,8 +656,6 @@ class DatabaseManager:
             course.get('description', ''),
             course['author'].get('name', 'Unknown'),
             course['author'].get('channel_id', ''),
-            course['author'].get('homepage', ''),
-            course['author'].get('subscribers', 0),
             course.get('duration_min', 0),
             course.get('lesson_count', 0),
             course.get('language', 'en'),
@@ -149,80 +669,476 @@ class DatabaseManager:
         ))
         
         course_id = cursor.lastrowid
+        if duplicate:
+            self.record_duplicate(cursor, course['youtube_id'], duplicate, merged=False)
         
-        # Insert lessons
+        # Insert lessons; each video is stored once however many playlists contain it
+        changed_videos = []
         if 'lessons' in course and course['lessons']:
+            known = self.get_known_video_ids(cursor, [lesson['video_id'] for lesson in course['lessons']])
             for lesson in course['lessons']:
-                cursor.execute('''
-                    INSERT INTO lessons (
-                        course_id, idx, title, video_id, duration_min, description,
-                        thumbnail, published_at, view_count, like_count
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    course_id,
-                    lesson['idx'],
-                    lesson['title'],
-                    lesson['video_id'],
-                    lesson.get('duration_min', 0),
-                    lesson.get('description', ''),
-                    lesson.get('thumbnail', ''),
-                    lesson.get('published_at', datetime.utcnow().isoformat()),
-                    lesson.get('view_count', 0),
-                    lesson.get('like_count', 0)
-                ))
+                if self.upsert_video(cursor, lesson, lesson['video_id'] in known):
+                    changed_videos.append(lesson['video_id'])
+            cursor.executemany('''
+                INSERT OR IGNORE INTO course_videos (course_id, idx, video_id) VALUES (?, ?, ?)
+            ''', [(course_id, lesson['idx'], lesson['video_id']) for lesson in course['lessons']])
+        
+        # Refresh the stats of this course and of every course whose videos or channel changed
+        affected = {course_id}
+        for start in range(0, len(changed_videos), 500):
+            batch = changed_videos[start:start + 500]
+            cursor.execute(f'''
+                SELECT DISTINCT course_id FROM course_videos WHERE video_id IN ({', '.join('?' * len(batch))})
+            ''', batch)
+            affected.update(row[0] for row in cursor.fetchall())
+        if channel_changed:
+            cursor.execute('SELECT id FROM courses WHERE author_channel_id = ?', (course['author']['channel_id'],))
+            affected.update(row[0] for row in cursor.fetchall())
+        self.refresh_course_stats(cursor, affected)
+        
+        # Train the first dictionary once there is enough text to learn from (an
+        # empty dictionary left by an older migration does not count)
+        cursor.execute('SELECT COUNT(*) FROM description_dicts WHERE LENGTH(data) > 0')
+        if not cursor.fetchone()[0]:
+            cursor.execute('SELECT COUNT(*) FROM video_descriptions')
+            if cursor.fetchone()[0] >= DESCRIPTION_TRAINING_MIN:
+                self.recompress_descriptions(cursor)
         
         self.conn.commit()
         return True
     
-    def search_courses(self, filters: Dict) -> List[Dict]:
-        """Search courses with filters"""
-        query = '''
-            SELECT c.*
-            FROM courses c
-            WHERE 1=1
-        '''
+    def upsert_channel(self, cursor: sqlite3.Cursor, channel: Dict) -> bool:
+        """Insert a channel, or update it if any of its details changed; True if written"""
+        cursor.execute('''
+            INSERT INTO channels (channel_id, name, homepage, subscribers) VALUES (?, ?, ?, ?)
+            ON CONFLICT(channel_id) DO UPDATE SET
+                name = excluded.name, homepage = excluded.homepage,
+                subscribers = excluded.subscribers, updated_at = CURRENT_TIMESTAMP
+            WHERE (name, homepage, subscribers) IS NOT (excluded.name, excluded.homepage, excluded.subscribers)
+        ''', (channel['channel_id'], channel['name'], channel['homepage'], channel['subscribers']))
+        return cursor.rowcount > 0
+    
+    def get_known_video_ids(self, cursor: sqlite3.Cursor, video_ids: List[str]) -> set:
+        """The video_ids already stored in videos"""
+        known = set()
+        unique = list(dict.fromkeys(video_ids))
+        for start in range(0, len(unique), 500):
+            batch = unique[start:start + 500]
+            cursor.execute(f'SELECT video_id FROM videos WHERE video_id IN ({", ".join("?" * len(batch))})', batch)
+            known.update(row[0] for row in cursor.fetchall())
+        return known
+    
+    def upsert_video(self, cursor: sqlite3.Cursor, lesson: Dict, known: bool = True) -> bool:
+        """Insert a video, or update it if any of its details changed.
+        
+        Unchanged videos are left alone, so re-importing a playlist does not
+        mark every course sharing its videos as changed. known=False promises
+        the video is not stored yet, which saves the description lookup.
+        Returns True if the video row was written.
+        """
+        values = (
+            lesson['title'],
+            lesson.get('duration_min', 0),
+            lesson.get('thumbnail', ''),
+            lesson.get('published_at', datetime.utcnow().isoformat()),
+            lesson.get('view_count', 0),
+            lesson.get('like_count', 0)
+        )
+        columns = ', '.join(VIDEO_TABLE_COLUMNS)
+        cursor.execute(f'''
+            INSERT INTO videos (video_id, {columns}) VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(video_id) DO UPDATE SET
+                {', '.join(f'{col} = excluded.{col}' for col in VIDEO_TABLE_COLUMNS)},
+                updated_at = CURRENT_TIMESTAMP
+            WHERE ({columns}) IS NOT ({', '.join(f'excluded.{col}' for col in VIDEO_TABLE_COLUMNS)})
+        ''', (lesson['video_id'],) + values)
+        written = cursor.rowcount > 0
+        self.upsert_description(cursor, lesson['video_id'], lesson.get('description') or '', known, written)
+        return written
+    
+    def get_course_id(self, youtube_id: str) -> Optional[int]:
+        """Id of the stored course for a playlist (None for unknown or merged playlists)"""
+        row = self.conn.execute('SELECT id FROM courses WHERE youtube_id = ?', (youtube_id,)).fetchone()
+        return row[0] if row else None
+    
+    def get_stale_video_ids(self, max_age_days: float = STATS_MAX_AGE_DAYS, course_id: Optional[int] = None,
+                            limit: Optional[int] = None) -> List[str]:
+        """Videos whose view and like counts were checked more than max_age_days ago, oldest first"""
+        where = 'COALESCE(v.stats_checked_at, v.updated_at) < datetime(\'now\', ?)'
+        params: List = [f'-{max_age_days} days']
+        if course_id is not None:
+            where += ' AND v.video_id IN (SELECT video_id FROM course_videos WHERE course_id = ?)'
+            params.append(course_id)
+        sql = f'SELECT v.video_id FROM videos v WHERE {where} ORDER BY COALESCE(v.stats_checked_at, v.updated_at)'
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return [row[0] for row in self.conn.execute(sql, params).fetchall()]
+    
+    def update_video_stats(self, stats: Dict[str, Dict], checked: Iterable[str]) -> int:
+        """Store refetched view/like counts and recompute the stats of the courses using them.
+        
+        stats maps video IDs to {'view_count', 'like_count'}; every ID in
+        checked is marked as checked now, including videos that are no
+        longer available. Returns the number of videos whose counts changed.
+        """
+        cursor = self.conn.cursor()
+        changed = []
+        for video_id, counts in stats.items():
+            cursor.execute('''
+                UPDATE videos SET view_count = ?, like_count = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE video_id = ? AND (view_count, like_count) IS NOT (?, ?)
+            ''', (counts['view_count'], counts['like_count'], video_id, counts['view_count'], counts['like_count']))
+            if cursor.rowcount > 0:
+                changed.append(video_id)
+        
+        checked = list(checked)
+        for start in range(0, len(checked), 500):
+            batch = checked[start:start + 500]
+            cursor.execute(f'''
+                UPDATE videos SET stats_checked_at = CURRENT_TIMESTAMP
+                WHERE video_id IN ({', '.join('?' * len(batch))})
+            ''', batch)
+        
+        affected = set()
+        for start in range(0, len(changed), 500):
+            batch = changed[start:start + 500]
+            cursor.execute(f'''
+                SELECT DISTINCT course_id FROM course_videos WHERE video_id IN ({', '.join('?' * len(batch))})
+            ''', batch)
+            affected.update(row[0] for row in cursor.fetchall())
+        self.refresh_course_stats(cursor, affected)
+        self.conn.commit()
+        return len(changed)
+    
+    def refresh_course_stats(self, cursor: sqlite3.Cursor, course_ids: Optional[Iterable[int]] = None):
+        """Recompute the view/like totals and popularity of courses (all courses if None)"""
+        if course_ids is None:
+            cursor.execute('SELECT id FROM courses')
+            course_ids = [row[0] for row in cursor.fetchall()]
+        course_ids = sorted(set(course_ids))
+        
+        for start in range(0, len(course_ids), 500):
+            batch = course_ids[start:start + 500]
+            cursor.execute(f'''
+                SELECT c.id, COUNT(v.video_id) AS videos,
+                       COALESCE(SUM(v.view_count), 0) AS total_views,
+                       COALESCE(SUM(v.like_count), 0) AS total_likes,
+                       COALESCE(ch.subscribers, 0) AS subscribers
+                FROM courses c
+                LEFT JOIN course_videos cv ON cv.course_id = c.id
+                LEFT JOIN videos v ON v.video_id = cv.video_id
+                LEFT JOIN channels ch ON ch.channel_id = c.author_channel_id
+                WHERE c.id IN ({', '.join('?' * len(batch))})
+                GROUP BY c.id
+            ''', batch)
+            
+            updates = []
+            for row in cursor.fetchall():
+                signals = {
+                    'views': row['total_views'],
+                    'likes': row['total_likes'],
+                    'avg_views': row['total_views'] / row['videos'] if row['videos'] else 0,
+                    'subscribers': row['subscribers']
+                }
+                popularity = sum(weight * math.log10(1 + max(signals[name], 0))
+                                 for name, weight in POPULARITY_WEIGHTS.items())
+                values = (row['total_views'], row['total_likes'], round(signals['avg_views'], 2), round(popularity, 6))
+                updates.append(values + (row['id'],) + values)
+            
+            # Skip rows whose stats did not move
+            cursor.executemany(f'''
+                UPDATE courses SET {', '.join(f'{col} = ?' for col in COURSE_STAT_COLUMNS)}
+                WHERE id = ? AND ({', '.join(COURSE_STAT_COLUMNS)}) IS NOT (?, ?, ?, ?)
+            ''', updates)
+    
+    def upsert_description(self, cursor: sqlite3.Cursor, video_id: str, text: str,
+                           known: bool = True, written: bool = False):
+        """Store a video's description if it changed.
+        
+        A video that was not known has no description to compare with, and
+        one whose row was just written has already logged its change.
+        """
+        if known:
+            cursor.execute('SELECT dict_id, data FROM video_descriptions WHERE video_id = ?', (video_id,))
+            row = cursor.fetchone()
+            if text == (self._decompress_description(row['data'], row['dict_id']) if row else ''):
+                return
+        
+        if text:
+            dict_id, zdict = self.current_description_dict(cursor)
+            cursor.execute('''
+                INSERT OR REPLACE INTO video_descriptions (video_id, dict_id, data) VALUES (?, ?, ?)
+            ''', (video_id, dict_id, descriptions.compress(text, zdict)))
+        elif known:
+            cursor.execute('DELETE FROM video_descriptions WHERE video_id = ?', (video_id,))
+        
+        if known and not written:
+            # Touch the video so the change log picks up every course using it
+            cursor.execute('UPDATE videos SET updated_at = CURRENT_TIMESTAMP WHERE video_id = ?', (video_id,))
+    
+    def current_description_dict(self, cursor: sqlite3.Cursor) -> Tuple[int, bytes]:
+        """Id and data of the newest dictionary (cached for the length of an import)"""
+        if self.current_dict is None:
+            cursor.execute('SELECT COALESCE(MAX(id), 0) FROM description_dicts')
+            dict_id = cursor.fetchone()[0]
+            self.current_dict = (dict_id, self.get_description_dict(dict_id))
+        return self.current_dict
+    
+    def recompress_descriptions(self, cursor: Optional[sqlite3.Cursor] = None):
+        """Train a new description dictionary and recompress every description with it.
+        
+        Run occasionally as the catalog grows so the dictionary keeps up with
+        new channels' boilerplate. Descriptions are rewritten in batches and
+        dictionaries no longer referenced are deleted; the text itself does
+        not change, so the change log is left alone.
+        """
+        commit = cursor is None
+        cursor = cursor or self.conn.cursor()
+        
+        cursor.execute('''
+            SELECT dict_id, data FROM video_descriptions ORDER BY random() LIMIT ?
+        ''', (DESCRIPTION_TRAINING_SAMPLE,))
+        samples = [self._decompress_description(row['data'], row['dict_id']) for row in cursor.fetchall()]
+        cursor.execute('INSERT INTO description_dicts (data) VALUES (?)', (descriptions.train_dictionary(samples),))
+        dict_id = cursor.lastrowid
+        zdict = self.get_description_dict(dict_id)
+        self.current_dict = (dict_id, zdict)
+        
+        last = ''
+        while True:
+            cursor.execute('''
+                SELECT video_id, dict_id, data FROM video_descriptions
+                WHERE video_id > ?
+                ORDER BY video_id
+                LIMIT 1000
+            ''', (last,))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            cursor.executemany('UPDATE video_descriptions SET dict_id = ?, data = ? WHERE video_id = ?', [
+                (dict_id, descriptions.compress(self._decompress_description(row['data'], row['dict_id']), zdict),
+                 row['video_id'])
+                for row in rows
+            ])
+            last = rows[-1]['video_id']
+        
+        # A dictionary still referenced (say by an import in another process
+        # that looked up the previous one) is kept until the next run
+        cursor.execute('''
+            DELETE FROM description_dicts
+            WHERE id != ? AND id NOT IN (SELECT DISTINCT dict_id FROM video_descriptions)
+        ''', (dict_id,))
+        if commit:
+            self.conn.commit()
+    
+    def get_description_dict(self, dict_id: int, conn: Optional[sqlite3.Connection] = None) -> bytes:
+        """Preset dictionary dict_id (dictionaries never change, so they are cached)"""
+        if not dict_id:
+            return b''
+        if dict_id not in self.description_dicts:
+            row = (conn or self.conn).execute('SELECT data FROM description_dicts WHERE id = ?', (dict_id,)).fetchone()
+            self.description_dicts[dict_id] = row[0]
+        return self.description_dicts[dict_id]
+    
+    def _decompress_description(self, data: bytes, dict_id: int,
+                                conn: Optional[sqlite3.Connection] = None) -> str:
+        return descriptions.decompress(data, self.get_description_dict(dict_id, conn))
+    
+    def _inflate_description(self, lesson: Dict, conn: Optional[sqlite3.Connection] = None) -> Dict:
+        """Replace the compressed description columns of a LESSON_SELECT row with the text"""
+        dict_id = lesson.pop('description_dict')
+        data = lesson.pop('description_data')
+        lesson['description'] = self._decompress_description(data, dict_id, conn) if data is not None else ''
+        return lesson
+    
+    def get_videos(self, video_ids: List[str]) -> Dict[str, Dict]:
+        """Stored videos among video_ids, keyed by video ID"""
+        videos = {}
+        unique = list(dict.fromkeys(video_ids))
+        cursor = self.conn.cursor()
+        for start in range(0, len(unique), 500):
+            batch = unique[start:start + 500]
+            placeholders = ', '.join('?' * len(batch))
+            cursor.execute(f'''
+                SELECT v.*, d.dict_id AS description_dict, d.data AS description_data
+                FROM videos v
+                LEFT JOIN video_descriptions d ON d.video_id = v.video_id
+                WHERE v.video_id IN ({placeholders})
+            ''', batch)
+            for row in cursor.fetchall():
+                videos[row['video_id']] = self._inflate_description(dict(row))
+        return videos
+    
+    def is_known_playlist(self, youtube_id: str) -> bool:
+        """True if the playlist is stored, or was merged into a stored course"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT 1 FROM courses WHERE youtube_id = ?
+            UNION ALL
+            SELECT 1 FROM playlist_duplicates
+            WHERE youtube_id = ? AND merged = 1 AND course_id IN (SELECT id FROM courses)
+        ''', (youtube_id, youtube_id))
+        return cursor.fetchone() is not None
+    
+    def find_near_duplicates(self, video_ids: List[str], threshold: Optional[float] = None) -> List[Dict]:
+        """Stored courses whose video set overlaps video_ids by at least threshold (Jaccard).
+        
+        Candidates come from the video index on course_videos, so only
+        courses sharing a video are looked at. Most similar first, each as
+        {course_id, youtube_id, title, overlap}.
+        """
+        threshold = DUPLICATE_THRESHOLD if threshold is None else threshold
+        videos = list(dict.fromkeys(video_ids))
+        if not videos:
+            return []
+        
+        cursor = self.conn.cursor()
+        shared = {}
+        for start in range(0, len(videos), 500):
+            batch = videos[start:start + 500]
+            cursor.execute(f'''
+                SELECT course_id, COUNT(DISTINCT video_id) AS shared
+                FROM course_videos
+                WHERE video_id IN ({', '.join('?' * len(batch))})
+                GROUP BY course_id
+            ''', batch)
+            for row in cursor.fetchall():
+                shared[row['course_id']] = shared.get(row['course_id'], 0) + row['shared']
+        
+        matches = []
+        for course_id, count in shared.items():
+            # Jaccard >= threshold needs at least this many shared videos
+            if count < threshold * len(videos):
+                continue
+            cursor.execute('''
+                SELECT c.youtube_id, c.title,
+                       (SELECT COUNT(DISTINCT video_id) FROM course_videos WHERE course_id = c.id) AS size
+                FROM courses c
+                WHERE c.id = ?
+            ''', (course_id,))
+            row = cursor.fetchone()
+            if not row:
+                continue
+            overlap = count / (len(videos) + row['size'] - count)
+            if overlap >= threshold:
+                matches.append({'course_id': course_id, 'youtube_id': row['youtube_id'],
+                                'title': row['title'], 'overlap': round(overlap, 4)})
+        
+        matches.sort(key=lambda match: (-match['overlap'], match['course_id']))
+        return matches
+    
+    def record_duplicate(self, cursor: sqlite3.Cursor, youtube_id: str, match: Dict, merged: bool):
+        """Remember that a playlist duplicates a stored course"""
+        cursor.execute('''
+            INSERT OR REPLACE INTO playlist_duplicates (youtube_id, course_id, overlap, merged)
+            VALUES (?, ?, ?, ?)
+        ''', (youtube_id, match['course_id'], match['overlap'], 1 if merged else 0))
+    
+    def get_duplicates(self, limit: int = 100, offset: int = 0) -> List[Dict]:
+        """Recorded near-duplicate playlists with the course each one duplicates"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT d.youtube_id, d.overlap, d.merged, d.detected_at,
+                   d.course_id, c.title, c.youtube_id AS course_youtube_id,
+                   dup.id AS duplicate_course_id
+            FROM playlist_duplicates d
+            JOIN courses c ON c.id = d.course_id
+            LEFT JOIN courses dup ON dup.youtube_id = d.youtube_id
+            ORDER BY d.detected_at DESC, d.youtube_id
+            LIMIT ? OFFSET ?
+        ''', (limit, offset))
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def get_channel(self, channel_id: str) -> Optional[Dict]:
+        """Stored channel details, or None if the channel is unknown"""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT * FROM channels WHERE channel_id = ?', (channel_id,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    
+    def _build_filter_clause(self, filters: Dict) -> Tuple[str, List]:
+        """Build the WHERE conditions shared by search_courses and iter_courses"""
+        clause = ''
         params = []
         
         if filters.get('category'):
-            query += ' AND c.category = ?'
+            clause += ' AND c.category = ?'
             params.append(filters['category'])
         
         if filters.get('subcategory'):
-            query += ' AND c.subcategory = ?'
+            clause += ' AND c.subcategory = ?'
             params.append(filters['subcategory'])
         
         if filters.get('language'):
-            query += ' AND c.language = ?'
+            clause += ' AND c.language = ?'
             params.append(filters['language'])
         
         if filters.get('language_name'):
-            query += ' AND c.language_name = ?'
+            clause += ' AND c.language_name = ?'
             params.append(filters['language_name'])
         
         if filters.get('author'):
-            query += ' AND c.author_name LIKE ?'
+            clause += ' AND c.author_name LIKE ?'
             params.append(f"%{filters['author']}%")
         
         if filters.get('search'):
-            query += ' AND (c.title LIKE ? OR c.description LIKE ?)'
+            clause += ' AND (c.title LIKE ? OR c.description LIKE ?)'
             params.extend([f"%{filters['search']}%", f"%{filters['search']}%"])
         
         if filters.get('min_lessons'):
-            query += ' AND c.lesson_count >= ?'
+            clause += ' AND c.lesson_count >= ?'
             params.append(filters['min_lessons'])
         
         if filters.get('max_duration'):
-            query += ' AND c.duration_min <= ?'
+            clause += ' AND c.duration_min <= ?'
             params.append(filters['max_duration'])
         
         if filters.get('min_duration'):
-            query += ' AND c.duration_min >= ?'
+            clause += ' AND c.duration_min >= ?'
             params.append(filters['min_duration'])
         
-        # Sorting
+        if filters.get('changed_since_seq') is not None:
+            clause += ' AND c.id IN (SELECT course_id FROM change_log WHERE seq > ?)'
+            params.append(filters['changed_since_seq'])
+        
+        if filters.get('created_since'):
+            clause += ' AND c.created_at > ?'
+            params.append(self._normalize_timestamp(filters['created_since']))
+        
+        return clause, params
+    
+    @staticmethod
+    def _normalize_timestamp(value: str) -> str:
+        """Convert an ISO 8601 timestamp to SQLite's CURRENT_TIMESTAMP format (UTC)"""
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed.strftime('%Y-%m-%d %H:%M:%S')
+    
+    @staticmethod
+    def _decode_tags(course: Dict) -> Dict:
+        """Decode the JSON tags column in place"""
+        try:
+            course['tags'] = json.loads(course['tags']) if course['tags'] else []
+        except:
+            course['tags'] = []
+        return course
+    
+    def search_courses(self, filters: Dict) -> List[Dict]:
+        """Search courses with filters"""
+        where, params = self._build_filter_clause(filters)
+        query = f'''
+            {COURSE_SELECT}
+            WHERE 1=1{where}
+        '''
+        
+        # Sorting (only known columns, so the key cannot inject SQL)
         sort_by = filters.get('sort', 'created_at')
-        sort_order = filters.get('order', 'DESC')
-        query += f' ORDER BY c.{sort_by} {sort_order}'
+        if sort_by not in SORT_COLUMNS:
+            raise ValueError(f"Unsupported sort: {sort_by} (use one of {', '.join(SORT_COLUMNS)})")
+        sort_order = 'ASC' if str(filters.get('order', 'DESC')).upper() == 'ASC' else 'DESC'
+        query += f' ORDER BY {SORT_COLUMNS[sort_by]} {sort_order}'
         
         # Pagination
         limit = min(int(filters.get('limit', 20)), 100)
@@ -233,21 +1149,103 @@ class DatabaseManager:
         cursor = self.conn.cursor()
         cursor.execute(query, params)
         
-        courses = []
+        rows = cursor.fetchall()
+        
+        with metrics.registry.timed('decode_tags'):
+            return [self._decode_tags(dict(row)) for row in rows]
+    
+    def iter_courses(self, filters: Optional[Dict] = None, include_lessons: bool = False,
+                     descending: bool = False,
+                     conn: Optional[sqlite3.Connection] = None) -> Iterator[Dict]:
+        """Stream matching courses in id order, optionally with their lessons.
+        
+        Courses and lessons are read as two cursors sorted by course id and
+        merged, so memory stays constant regardless of catalog size. Pass a
+        dedicated connection (see open_read_connection) for long-running streams.
+        """
+        conn = conn or self.conn
+        where, params = self._build_filter_clause(filters or {})
+        order = 'DESC' if descending else 'ASC'
+        
+        courses = conn.execute(f'''
+            {COURSE_SELECT}
+            WHERE 1=1{where}
+            ORDER BY c.id {order}
+        ''', params)
+        
+        if not include_lessons:
+            for row in courses:
+                yield self._decode_tags(dict(row))
+            return
+        
+        lessons = conn.execute(f'''
+            {LESSON_SELECT}
+            WHERE l.course_id IN (SELECT c.id FROM courses c WHERE 1=1{where})
+            ORDER BY l.course_id {order}, l.idx
+        ''', params)
+        
+        # True while the pending lesson belongs to a course earlier in the stream
+        if descending:
+            behind = lambda lesson_course, course_id: lesson_course > course_id
+        else:
+            behind = lambda lesson_course, course_id: lesson_course < course_id
+        
+        pending = next(lessons, None)
+        for row in courses:
+            course = self._decode_tags(dict(row))
+            while pending is not None and behind(pending['course_id'], course['id']):
+                pending = next(lessons, None)
+            course['lessons'] = []
+            while pending is not None and pending['course_id'] == course['id']:
+                course['lessons'].append(self._inflate_description(dict(pending), conn))
+                pending = next(lessons, None)
+            yield course
+    
+    def get_facet_counts(self, filters: Dict) -> Dict:
+        """Count courses per category/subcategory/language for the current filters.
+        
+        A single grouped query applies every non-facet filter and returns one
+        count per value combination. Each facet is then rolled up from those
+        rows applying the other facet filters but not its own, so a dropdown
+        keeps listing the alternatives to its current selection.
+        """
+        base_filters = {k: v for k, v in filters.items() if k not in FACET_COLUMNS}
+        where, params = self._build_filter_clause(base_filters)
+        columns = ', '.join(f'c.{col}' for col in FACET_COLUMNS)
+        
+        cursor = self.conn.cursor()
+        cursor.execute(f'''
+            SELECT {columns}, COUNT(*) as count
+            FROM courses c
+            WHERE 1=1{where}
+            GROUP BY {columns}
+        ''', params)
+        
+        selected = {col: filters[col] for col in FACET_COLUMNS if filters.get(col)}
+        counts = {col: {} for col in FACET_COLUMNS}
+        total = 0
+        
         for row in cursor.fetchall():
-            course = dict(row)
-            try:
-                course['tags'] = json.loads(course['tags']) if course['tags'] else []
-            except:
-                course['tags'] = []
-            courses.append(course)
+            mismatched = [col for col, value in selected.items() if row[col] != value]
+            if not mismatched:
+                total += row['count']
+            for col in FACET_COLUMNS:
+                # Count the row unless it fails a filter on some other facet
+                if all(other == col for other in mismatched):
+                    counts[col][row[col]] = counts[col].get(row[col], 0) + row['count']
         
-        return courses
+        facets = {
+            col: [{'name': name, 'count': count}
+                  for name, count in sorted(values.items(), key=lambda item: (-item[1], str(item[0])))]
+            for col, values in counts.items()
+        }
+        facets['total'] = total
+        return facets
     
     def get_course_by_id(self, course_id: int) -> Optional[Dict]:
         """Get course by ID with lessons"""
         cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM courses WHERE id = ?', (course_id,))
+        cursor.execute(f'{COURSE_SELECT} WHERE c.id = ?', (course_id,))
         row = cursor.fetchone()
         
         if not row:
@@ -256,20 +1254,15 @@ class DatabaseManager:
         course = dict(row)
         
         # Get lessons
-        cursor.execute('SELECT * FROM lessons WHERE course_id = ? ORDER BY idx', (course_id,))
-        course['lessons'] = [dict(r) for r in cursor.fetchall()]
-        
-        try:
-            course['tags'] = json.loads(course['tags']) if course['tags'] else []
-        except:
-            course['tags'] = []
+        cursor.execute(f'{LESSON_SELECT} WHERE l.course_id = ? ORDER BY l.idx', (course_id,))
+        course['lessons'] = [self._inflate_description(dict(r)) for r in cursor.fetchall()]
         
-        return course
+        return self._decode_tags(course)
     
     def get_course_by_youtube_id(self, youtube_id: str) -> Optional[Dict]:
         """Get course by YouTube ID"""
         cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM courses WHERE youtube_id = ?', (youtube_id,))
+        cursor.execute(f'{COURSE_SELECT} WHERE c.youtube_id = ?', (youtube_id,))
         row = cursor.fetchone()
         
         if not row:
@@ -278,15 +1271,25 @@ class DatabaseManager:
         course = dict(row)
         
         # Get lessons
-        cursor.execute('SELECT * FROM lessons WHERE course_id = ? ORDER BY idx', (course['id'],))
-        course['lessons'] = [dict(r) for r in cursor.fetchall()]
-        
-        try:
-            course['tags'] = json.loads(course['tags']) if course['tags'] else []
-        except:
-            course['tags'] = []
+        cursor.execute(f'{LESSON_SELECT} WHERE l.course_id = ? ORDER BY l.idx', (course['id'],))
+        course['lessons'] = [self._inflate_description(dict(r)) for r in cursor.fetchall()]
         
-        return course
+        return self._decode_tags(course)
+    
+    def get_related_courses(self, course_id: int, limit: int = 10) -> List[Dict]:
+        """Precomputed similar courses, most similar first (see build_related.py)"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT c.*, ch.homepage AS author_homepage, ch.subscribers AS author_subscribers,
+                   r.score AS similarity
+            FROM related_courses r
+            JOIN courses c ON c.id = r.related_id
+            LEFT JOIN channels ch ON ch.channel_id = c.author_channel_id
+            WHERE r.course_id = ?
+            ORDER BY r.rank
+            LIMIT ?
+        ''', (course_id, limit))
+        return [self._decode_tags(dict(row)) for row in cursor.fetchall()]
     
     def get_statistics(self) -> Dict:
         """Get database statistics"""
@@ -320,6 +1323,7 @@ class DatabaseManager:
         """Close database connection"""
         if self.conn:
             self.conn.close()
+            self.conn = None
             print('✓ Database connection closed')
 
 
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Compressed description storage for CourseSpider
+Lesson descriptions are mostly channel boilerplate (links, sponsor lines,
+hashtags) repeated across thousands of videos. They are stored deflated
+against a preset dictionary trained from the stored text, which lets even
+short descriptions share the bytes they have in common.
+"""
+
+import zlib
+from collections import Counter
+from typing import Iterable
+
+# Deflate can only reference the last 32 KB, so a larger dictionary is wasted
+DICTIONARY_SIZE = 32 * 1024
+
+# Raw deflate without the zlib header and checksum; SQLite checks its own pages
+WBITS = -15
+LEVEL = 9
+
+# Lines shorter than this cost more to match than they save
+MIN_LINE_LENGTH = 8
+
+
+def train_dictionary(samples: Iterable[str], size: int = DICTIONARY_SIZE) -> bytes:
+    """Build a preset dictionary from the lines and words that recur across samples"""
+    lines = Counter()
+    words = Counter()
+    for text in samples:
+        lines.update(line for line in set(text.splitlines()) if len(line) >= MIN_LINE_LENGTH)
+        words.update(set(text.split()))
+
+    # Whole boilerplate lines first, then common words to fill the rest
+    chosen = []
+    used = 0
+    for counts, separator in ((lines, b'\n'), (words, b' ')):
+        ranked = sorted((item for item, count in counts.items() if count > 1),
+                        key=lambda item: counts[item] * len(item), reverse=True)
+        for item in ranked:
+            data = item.encode('utf-8') + separator
+            if used + len(data) > size:
+                continue
+            chosen.append(data)
+            used += len(data)
+
+    # Matches near the end of the window get the shortest distance codes
+    return b''.join(reversed(chosen))
+
+
+def compress(text: str, zdict: bytes = b'') -> bytes:
+    """Deflate text, using zdict as the preset dictionary if given"""
+    if zdict:
+        compressor = zlib.compressobj(LEVEL, zlib.DEFLATED, WBITS, zdict=zdict)
+    else:
+        compressor = zlib.compressobj(LEVEL, zlib.DEFLATED, WBITS)
+    return compressor.compress(text.encode('utf-8')) + compressor.flush()
+
+
+def decompress(data: bytes, zdict: bytes = b'') -> str:
+    """Inflate data written by compress with the same dictionary"""
+    if zdict:
+        decompressor = zlib.decompressobj(WBITS, zdict=zdict)
+    else:
+        decompressor = zlib.decompressobj(WBITS)
+    return (decompressor.decompress(data) + decompressor.flush()).decode('utf-8')
@@ -3,128 +3,144 @@
 Export SQLite database to JavaScript file for standalone web app
 """
 
+import argparse
+import base64
+import hashlib
 import json
-import sqlite3
+import os
+import sys
+from array import array
 from datetime import datetime
 from pathlib import Path
 
+from database import DatabaseManager
+from tokens import tokenize
+
+
+# Card-level fields kept in the sharded manifest; everything else lives in shards
+CARD_FIELDS = (
+    'id', 'youtube_id', 'url', 'title', 'category', 'subcategory', 'author_name',
+    'author_homepage', 'thumbnail', 'duration_min', 'lesson_count', 'language',
+    'language_name', 'published_at'
+)
+
+
+def course_to_export(course):
+    """Build the exported course object (with lessons) from a database course"""
+    return {
+        'id': course['id'],
+        'youtube_id': course['youtube_id'],
+        'url': course['url'],
+        'title': course['title'],
+        'description': course['description'] or '',
+        'category': course['category'],
+        'subcategory': course['subcategory'],
+        'author_name': course['author_name'],
+        'author_channel_id': course['author_channel_id'],
+        'author_homepage': course['author_homepage'],
+        'author_subscribers': course['author_subscribers'],
+        'thumbnail': course['thumbnail'],
+        'duration_min': course['duration_min'],
+        'lesson_count': course['lesson_count'],
+        'language': course['language'],
+        'language_name': course['language_name'],
+        'published_at': course['published_at'],
+        'lessons': [
+            {
+                'idx': lesson['idx'],
+                'title': lesson['title'],
+                'video_id': lesson['video_id'],
+                'duration_min': lesson['duration_min'],
+                'description': lesson['description'] or '',
+                'thumbnail': lesson['thumbnail'],
+                'view_count': lesson['view_count'],
+                'like_count': lesson['like_count']
+            }
+            for lesson in course['lessons']
+        ]
+    }
+
+
+def get_export_stats(conn):
+    """Catalog totals for the export header, computed in SQL up front"""
+    cursor = conn.cursor()
+
+    cursor.execute('SELECT COUNT(*), SUM(duration_min) FROM courses')
+    total_courses, total_minutes = cursor.fetchone()
+
+    cursor.execute('SELECT COUNT(*) FROM course_videos WHERE course_id IN (SELECT id FROM courses)')
+    total_lessons = cursor.fetchone()[0]
+
+    cursor.execute('SELECT DISTINCT category FROM courses ORDER BY category')
+    categories = [row[0] for row in cursor.fetchall()]
+
+    cursor.execute('SELECT DISTINCT language_name FROM courses ORDER BY language_name')
+    languages = [row[0] for row in cursor.fetchall()]
+
+    return {
+        'total_courses': total_courses,
+        'total_lessons': total_lessons,
+        'total_hours': round((total_minutes or 0) / 60),
+        'categories': categories,
+        'languages': languages,
+        'last_updated': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+
+def export_database_to_js(db_path='data/courses.db', output_path='standalone/courses-data.js', minify=False):
+    """Export entire database to JavaScript file.
+
+    Courses and lessons are read as one merged stream ordered by course id and
+    written to the file one course at a time with compact separators, so time
+    and memory stay linear in catalog size. With minify=True the newline
+    between courses and the header comments are dropped as well.
+    """
 
-def export_database_to_js(db_path='data/courses.db', output_path='standalone/courses-data.js'):
-    """Export entire database to JavaScript file"""
-    
     print(f"\n{'='*60}")
     print("Exporting Database to JavaScript")
     print(f"{'='*60}\n")
-    
-    # Connect to database
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
-    # Get all courses
-    cursor.execute('''
-        SELECT * FROM courses
-        ORDER BY created_at DESC
-    ''')
-    
-    courses_data = []
-    total_lessons = 0
-    categories = set()
-    languages = set()
-    
-    for course_row in cursor.fetchall():
-        course = dict(course_row)
-        
-        # Get lessons for this course
-        cursor.execute('''
-            SELECT * FROM lessons
-            WHERE course_id = ?
-            ORDER BY idx
-        ''', (course['id'],))
-        
-        lessons = [dict(row) for row in cursor.fetchall()]
-        total_lessons += len(lessons)
-        
-        # Add to sets
-        categories.add(course['category'])
-        languages.add(course['language_name'])
-        
-        # Build course object
-        course_obj = {
-            'id': course['id'],
-            'youtube_id': course['youtube_id'],
-            'url': course['url'],
-            'title': course['title'],
-            'description': course['description'] or '',
-            'category': course['category'],
-            'subcategory': course['subcategory'],
-            'author_name': course['author_name'],
-            'author_channel_id': course['author_channel_id'],
-            'author_homepage': course['author_homepage'],
-            'author_subscribers': course['author_subscribers'],
-            'thumbnail': course['thumbnail'],
-            'duration_min': course['duration_min'],
-            'lesson_count': course['lesson_count'],
-            'language': course['language'],
-            'language_name': course['language_name'],
-            'published_at': course['published_at'],
-            'lessons': [
-                {
-                    'idx': lesson['idx'],
-                    'title': lesson['title'],
-                    'video_id': lesson['video_id'],
-                    'duration_min': lesson['duration_min'],
-                    'description': lesson['description'] or '',
-                    'thumbnail': lesson['thumbnail'],
-                    'view_count': lesson['view_count'],
-                    'like_count': lesson['like_count']
-                }
-                for lesson in lessons
-            ]
-        }
-        
-        courses_data.append(course_obj)
-    
-    # Calculate total hours
-    cursor.execute('SELECT SUM(duration_min) FROM courses')
-    total_minutes = cursor.fetchone()[0] or 0
-    total_hours = round(total_minutes / 60)
-    
-    # Create JavaScript file
-    js_content = f'''// Auto-generated on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-// Total courses: {len(courses_data)}
-// Total lessons: {total_lessons}
-// Total hours: {total_hours}
-
-const COURSES_DATA = {{
-    stats: {{
-        total_courses: {len(courses_data)},
-        total_lessons: {total_lessons},
-        total_hours: {total_hours},
-        categories: {json.dumps(sorted(categories))},
-        languages: {json.dumps(sorted(languages))},
-        last_updated: "{datetime.now().strftime("%Y-%m-%d %H:%M:%S")}"
-    }},
-    courses: {json.dumps(courses_data, indent=2, ensure_ascii=False)}
-}};
-'''
-    
-    # Write to file
+
+    db = DatabaseManager(db_path)
+    db.initialize(read_only=True)
+
+    stats = get_export_stats(db.conn)
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    newline = '' if minify else '\n'
+
     output_file = Path(output_path)
     output_file.parent.mkdir(parents=True, exist_ok=True)
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(js_content)
-    
+
+    exported = 0
+    with open(output_file, 'w', encoding='utf-8', buffering=1024 * 1024) as f:
+        if not minify:
+            f.write(f'// Auto-generated on {stats["last_updated"]}\n')
+            f.write(f'// Total courses: {stats["total_courses"]}\n')
+            f.write(f'// Total lessons: {stats["total_lessons"]}\n')
+            f.write(f'// Total hours: {stats["total_hours"]}\n\n')
+
+        f.write(f'const COURSES_DATA={{{newline}stats:{encoder.encode(stats)},{newline}courses:[')
+
+        # Newest first, matching the previous created_at DESC order
+        for course in db.iter_courses(include_lessons=True, descending=True):
+            if exported:
+                f.write(',')
+            f.write(newline)
+            f.write(encoder.encode(course_to_export(course)))
+            exported += 1
+
+        f.write(f'{newline}]{newline}}};\n')
+
+    db.close()
+
     # Print statistics
-    print(f"✓ Exported {len(courses_data)} courses")
-    print(f"✓ Total lessons: {total_lessons:,}")
-    print(f"✓ Total hours: {total_hours:,}")
-    print(f"✓ Categories: {len(categories)}")
-    print(f"✓ Languages: {len(languages)}")
+    print(f"✓ Exported {exported} courses")
+    print(f"✓ Total lessons: {stats['total_lessons']:,}")
+    print(f"✓ Total hours: {stats['total_hours']:,}")
+    print(f"✓ Categories: {len(stats['categories'])}")
+    print(f"✓ Languages: {len(stats['languages'])}")
     print(f"\n✓ JavaScript file created: {output_file}")
     print(f"  File size: {output_file.stat().st_size / 1024 / 1024:.2f} MB")
-    
+
     print(f"\n{'='*60}")
     print("Export Complete!")
     print(f"{'='*60}\n")
@@ -133,9 +149,424 @@ const COURSES_DATA = {{
     print("2. Copy standalone/courses-data.js to your website")
     print("3. Open index.html in a browser - no server needed!")
     print(f"{'='*60}\n")
-    
-    conn.close()
+
+
+def write_hashed(directory, stem, content):
+    """Write content to <stem>.<hash>.json unless it already exists; return the file name"""
+    digest = hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
+    name = f'{stem}.{digest}.json'
+    path = directory / name
+    if not path.exists():
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(content, encoding='utf-8')
+        os.replace(tmp, path)
+    return name
+
+
+def build_search_index(conn):
+    """Build an inverted index over title, author, tags and subcategory.
+
+    Terms are sorted, so the viewer finds every term starting with a prefix
+    with a binary search. Courses are numbered by their position in the
+    ascending ids list, and each posting list stores gaps between those
+    positions, which keeps the JSON small.
+    """
+    cursor = conn.cursor()
+    cursor.execute('SELECT id, title, author_name, subcategory, tags FROM courses ORDER BY id')
+
+    ids = []
+    postings = {}
+    for course_id, title, author_name, subcategory, tags in cursor:
+        position = len(ids)
+        ids.append(course_id)
+
+        try:
+            tag_text = ' '.join(json.loads(tags)) if tags else ''
+        except (json.JSONDecodeError, TypeError):
+            tag_text = ''
+
+        terms = set(tokenize(title))
+        terms.update(tokenize(author_name))
+        terms.update(tokenize(subcategory))
+        terms.update(tokenize(tag_text))
+        for term in terms:
+            postings.setdefault(term, []).append(position)
+
+    # UTF-16 order, which is how JavaScript compares strings
+    terms = sorted(postings, key=lambda term: term.encode('utf-16-be'))
+    gaps = []
+    for term in terms:
+        previous = 0
+        encoded = []
+        for position in postings[term]:
+            encoded.append(position - previous)
+            previous = position
+        gaps.append(encoded)
+
+    return {'version': 1, 'ids': ids, 'terms': terms, 'postings': gaps}
+
+
+def write_search_index(conn, directory, encoder):
+    """Write the search index as a content-hashed file; return its name"""
+    index = build_search_index(conn)
+    name = write_hashed(directory, 'search', encoder.encode(index))
+    size = (directory / name).stat().st_size
+    print(f"✓ Search index: {len(index['terms']):,} terms over {len(index['ids']):,} courses "
+          f"({size / 1024:.1f} KB)")
+    return name
+
+
+def export_sharded(db_path='data/courses.db', output_dir='standalone/catalog', bucket_size=50):
+    """Export a card-level manifest plus lazily loaded lesson shards.
+
+    manifest.json holds stats, facets and the card fields of every course, so
+    the viewer can render the grid from one small request. Descriptions and
+    lessons go into shards of bucket_size consecutive course ids named by
+    content hash: unchanged buckets keep their file name between exports and
+    can be cached indefinitely. Only manifest.json needs revalidation.
+
+    Files of the previous export stay until the next one, so a visitor still
+    holding the previous manifest can open its shards.
+    """
+
+    print(f"\n{'='*60}")
+    print("Exporting Sharded Catalog")
+    print(f"{'='*60}\n")
+
+    db = DatabaseManager(db_path)
+    db.initialize(read_only=True)
+
+    output = Path(output_dir)
+    shard_dir = output / 'shards'
+    shard_dir.mkdir(parents=True, exist_ok=True)
+
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    stats = get_export_stats(db.conn)
+    facets = db.get_facet_counts({})
+    facets.pop('total')
+    search_index = write_search_index(db.conn, output, encoder)
+
+    cards = []
+    shards = []
+    bucket, bucket_courses = None, {}
+
+    def flush():
+        if bucket_courses:
+            content = encoder.encode({'courses': bucket_courses})
+            shards.append('shards/' + write_hashed(shard_dir, f'{bucket:06d}', content))
+
+    for course in db.iter_courses(include_lessons=True):
+        course_bucket = course['id'] // bucket_size
+        if course_bucket != bucket:
+            flush()
+            bucket, bucket_courses = course_bucket, {}
+
+        full = course_to_export(course)
+        bucket_courses[str(course['id'])] = {'description': full['description'], 'lessons': full['lessons']}
+
+        card = {field: full[field] for field in CARD_FIELDS}
+        card['shard'] = len(shards)
+        cards.append(encoder.encode(card))
+    flush()
+
+    db.close()
+
+    # Newest first, as in the JavaScript export
+    cards.reverse()
+    manifest = (
+        '{"version":1,'
+        f'"stats":{encoder.encode(stats)},'
+        f'"facets":{encoder.encode(facets)},'
+        f'"shards":{encoder.encode(shards)},'
+        f'"search_index":{encoder.encode(search_index)},'
+        '"courses":[\n' + ',\n'.join(cards) + '\n]}\n'
+    )
+    manifest_path = output / 'manifest.json'
+    previous = {'shards': [], 'search_index': None}
+    if manifest_path.exists():
+        try:
+            previous = json.loads(manifest_path.read_text(encoding='utf-8'))
+        except ValueError:
+            pass
+    tmp = output / 'manifest.json.tmp'
+    tmp.write_text(manifest, encoding='utf-8')
+    os.replace(tmp, manifest_path)
+
+    # Drop shards referenced by neither this manifest nor the previous one
+    keep = {Path(name).name for name in shards + previous.get('shards', [])}
+    removed = 0
+    for path in shard_dir.glob('*.json'):
+        if path.name not in keep:
+            path.unlink()
+            removed += 1
+    for path in output.glob('search.*.json'):
+        if path.name not in (search_index, previous.get('search_index')):
+            path.unlink()
+
+    shard_bytes = sum((output / name).stat().st_size for name in shards)
+    print(f"✓ Exported {len(cards)} courses")
+    print(f"✓ Manifest: {manifest_path} ({manifest_path.stat().st_size / 1024:.1f} KB)")
+    print(f"✓ Shards: {len(shards)} files, {shard_bytes / 1024 / 1024:.2f} MB ({removed} stale removed)")
+    print(f"\n{'='*60}")
+    print("Copy the catalog/ folder next to standalone/index.html to use it.")
+    print(f"{'='*60}\n")
+
+
+def export_delta(db_path='data/courses.db', output_dir='standalone/deltas', max_chain=10,
+                 max_chain_ratio=0.5):
+    """Export a base snapshot plus a chain of delta files.
+
+    deltas.json records the change_log seq of the last export, the base
+    snapshot and the delta chain. Each run writes one delta with the courses
+    added, changed or deleted since the previous run. All data files are
+    content-hashed, so returning visitors re-download only new deltas. The
+    chain is compacted into a new base once it has max_chain deltas or its
+    size exceeds max_chain_ratio of the base.
+    """
+
+    print(f"\n{'='*60}")
+    print("Exporting Delta Catalog")
+    print(f"{'='*60}\n")
+
+    db = DatabaseManager(db_path)
+    db.initialize(read_only=True)
+
+    if not db.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'change_log'").fetchone():
+        print("❌ No change_log table: open the database once with the API server or")
+        print("   import script so it is migrated, then run the export again.")
+        db.close()
+        return
+
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+    manifest_path = output / 'deltas.json'
+    manifest = json.loads(manifest_path.read_text(encoding='utf-8')) if manifest_path.exists() else None
+
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+    # One read transaction so the seq and the course data agree
+    db.conn.execute('BEGIN')
+    seq = db.get_change_seq()
+    max_course_id = db.get_max_course_id()
+
+    chain_bytes = sum(delta['bytes'] for delta in manifest['deltas']) if manifest else 0
+    compact = (
+        manifest is None
+        or len(manifest['deltas']) >= max_chain
+        or chain_bytes > manifest['base']['bytes'] * max_chain_ratio
+    )
+
+    if compact:
+        courses = [course_to_export(c) for c in db.iter_courses(include_lessons=True, descending=True)]
+        content = encoder.encode({'seq': seq, 'courses': courses})
+        manifest = {
+            'version': 1,
+            'seq': seq,
+            'max_course_id': max_course_id,
+            'base': {'file': write_hashed(output, 'base', content), 'seq': seq,
+                     'courses': len(courses), 'bytes': len(content.encode('utf-8'))},
+            'deltas': []
+        }
+        print(f"✓ Wrote base snapshot with {len(courses)} courses (seq {seq})")
+    elif seq > manifest['seq']:
+        changes = db.get_changes_since(manifest['seq'], manifest['max_course_id'])
+        records = {
+            course['id']: course_to_export(course)
+            for course in db.iter_courses({'changed_since_seq': manifest['seq']}, include_lessons=True)
+        }
+        delta = {
+            'from': manifest['seq'],
+            'to': seq,
+            'added': [records[i] for i in changes['added'] if i in records],
+            'changed': [records[i] for i in changes['changed'] if i in records],
+            'deleted': changes['deleted']
+        }
+        content = encoder.encode(delta)
+        manifest['deltas'].append({
+            'file': write_hashed(output, f"delta-{delta['from']}-{seq}", content),
+            'from': delta['from'], 'to': seq,
+            'added': len(delta['added']), 'changed': len(delta['changed']),
+            'deleted': len(delta['deleted']), 'bytes': len(content.encode('utf-8'))
+        })
+        manifest['seq'] = seq
+        manifest['max_course_id'] = max_course_id
+        print(f"✓ Wrote delta {delta['from']}→{seq}: {len(delta['added'])} added, "
+              f"{len(delta['changed'])} changed, {len(delta['deleted'])} deleted")
+    else:
+        print(f"✓ No changes since seq {seq}")
+
+    if 'search_index' not in manifest or manifest['search_index_seq'] != seq:
+        manifest['search_index'] = write_search_index(db.conn, output, encoder)
+        manifest['search_index_seq'] = seq
+
+    db.conn.rollback()
+    db.close()
+
+    manifest['generated_at'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    tmp = output / 'deltas.json.tmp'
+    tmp.write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+    os.replace(tmp, manifest_path)
+
+    # Drop bases and deltas that fell out of the chain
+    current = {manifest['base']['file'], manifest['search_index']}
+    current |= {delta['file'] for delta in manifest['deltas']}
+    for path in output.glob('*.json'):
+        if path.name != 'deltas.json' and path.name not in current:
+            path.unlink()
+
+    print(f"✓ Chain: base + {len(manifest['deltas'])} deltas ({manifest_path})")
+    print(f"\n{'='*60}\n")
+
+
+# Null markers inside packed numeric columns
+INT32_NULL = -2 ** 31
+
+# URLs the collector builds from ids; the decoder rebuilds them
+DERIVED_COURSE_FIELDS = {
+    'url': ('https://www.youtube.com/playlist?list={}', 'youtube_id'),
+    'author_homepage': ('https://www.youtube.com/channel/{}', 'author_channel_id'),
+}
+DERIVED_LESSON_FIELDS = {
+    'thumbnail': ('https://i.ytimg.com/vi/{}/mqdefault.jpg', 'video_id'),
+}
+
+# Column encodings: int32/float64 are packed little-endian and base64'd,
+# dict columns store indexes into a value list, string columns stay as is
+# unless at least half their values are repeats
+COURSE_COLUMNS = {
+    'id': 'int32', 'youtube_id': 'string', 'title': 'string', 'description': 'string',
+    'category': 'dict', 'subcategory': 'dict', 'author_name': 'dict', 'author_channel_id': 'dict',
+    'author_subscribers': 'float64', 'thumbnail': 'string', 'duration_min': 'int32',
+    'lesson_count': 'int32', 'language': 'dict', 'language_name': 'dict', 'published_at': 'string',
+}
+LESSON_COLUMNS = {
+    'idx': 'int32', 'title': 'string', 'video_id': 'string', 'duration_min': 'int32',
+    'description': 'string', 'view_count': 'float64', 'like_count': 'float64',
+}
+
+
+def pack_numbers(values, typecode, null):
+    """Pack numbers into a little-endian typed array, base64 encoded"""
+    packed = array(typecode, (null if value is None else value for value in values))
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return base64.b64encode(packed.tobytes()).decode('ascii')
+
+
+def encode_column(values, kind):
+    """Encode one column of values"""
+    if kind == 'int32':
+        return {'type': 'int32', 'data': pack_numbers(values, 'i', INT32_NULL)}
+    if kind == 'float64':
+        return {'type': 'float64', 'data': pack_numbers(values, 'd', float('nan'))}
+    if kind == 'string' and len(set(values)) * 2 <= len(values):
+        # Mostly repeated text (e.g. a channel's boilerplate lesson description)
+        kind = 'dict'
+    if kind == 'dict':
+        codes = {}
+        indexes = [codes.setdefault(value, len(codes)) for value in values]
+        typecode, width = ('H', 16) if len(codes) <= 0xFFFF else ('I', 32)
+        return {'type': 'dict', 'values': list(codes), 'width': width,
+                'data': pack_numbers(indexes, typecode, 0)}
+    return {'type': 'string', 'values': values}
+
+
+def encode_derived(values, keys, template):
+    """Store only the values that differ from the template URL built from the key column"""
+    exceptions = {
+        str(row): value
+        for row, (value, key) in enumerate(zip(values, keys))
+        if value != template.format(key)
+    }
+    return {'type': 'derived', 'template': template, 'exceptions': exceptions}
+
+
+def encode_table(records, columns, derived):
+    """Turn a list of row dicts into encoded columns"""
+    table = {name: encode_column([r[name] for r in records], kind) for name, kind in columns.items()}
+    for name, (template, key) in derived.items():
+        table[name] = encode_derived([r[name] for r in records], [r[key] for r in records], template)
+        table[name]['key'] = key
+    return table
+
+
+def export_columnar(db_path='data/courses.db', output_path='standalone/courses.columnar.json'):
+    """Export the catalog column by column.
+
+    Every field becomes one column. Repetitive strings (category, language,
+    author) are dictionary encoded, numbers are packed into base64 typed
+    arrays, and URLs the collector derives from ids are dropped unless they
+    differ from the usual pattern. Lessons form a second table
+    in course order, with a per-course lesson count to split them. columnar.js
+    decodes the file back into the same course objects as the JSON export.
+    """
+
+    print(f"\n{'='*60}")
+    print("Exporting Columnar Catalog")
+    print(f"{'='*60}\n")
+
+    db = DatabaseManager(db_path)
+    db.initialize(read_only=True)
+
+    stats = get_export_stats(db.conn)
+    courses = []
+    lessons = []
+    lessons_per_course = []
+    json_bytes = 0
+    for course in db.iter_courses(include_lessons=True, descending=True):
+        full = course_to_export(course)
+        # What the same course costs in the old indent=2 JSON export
+        json_bytes += len(json.dumps(full, indent=2, ensure_ascii=False).encode('utf-8'))
+        lessons.extend(full.pop('lessons'))
+        lessons_per_course.append(len(course['lessons']))
+        courses.append(full)
+
+    db.close()
+
+    course_table = encode_table(courses, COURSE_COLUMNS, DERIVED_COURSE_FIELDS)
+    course_table['lessons'] = encode_column(lessons_per_course, 'int32')
+    payload = {
+        'format': 'columnar',
+        'version': 1,
+        'stats': stats,
+        'courses': {'count': len(courses), 'columns': course_table},
+        'lessons': {'count': len(lessons), 'columns': encode_table(lessons, LESSON_COLUMNS, DERIVED_LESSON_FIELDS)},
+    }
+
+    output = Path(output_path)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output.with_name(output.name + '.tmp')
+    tmp.write_text(json.dumps(payload, ensure_ascii=False, separators=(',', ':')), encoding='utf-8')
+    os.replace(tmp, output)
+
+    size = output.stat().st_size
+    print(f"✓ Exported {len(courses)} courses, {len(lessons):,} lessons")
+    print(f"\n  JSON (indent=2): {json_bytes / 1024 / 1024:8.2f} MB")
+    print(f"  Columnar:        {size / 1024 / 1024:8.2f} MB ({json_bytes / max(size, 1):.1f}x smaller)")
+    print(f"\n✓ Written to {output}")
+    print("  Decode in the browser with columnar.js (decodeColumnarCatalog)")
+    print(f"{'='*60}\n")
 
 
 if __name__ == '__main__':
-    export_database_to_js()
+    parser = argparse.ArgumentParser(description='Export the course database for the standalone web app')
+    parser.add_argument('--format', choices=['js', 'sharded', 'delta', 'columnar'], default='js',
+                        help='js: single courses-data.js; sharded: manifest plus lazy lesson shards; '
+                             'delta: base snapshot plus incremental deltas; '
+                             'columnar: dictionary-encoded column arrays (courses.columnar.json)')
+    parser.add_argument('--db', default='data/courses.db', help='SQLite database path')
+    parser.add_argument('--output', help='output file (js, columnar) or directory (sharded, delta)')
+    parser.add_argument('--minify', action='store_true', help='omit comments and newlines (js format)')
+    parser.add_argument('--bucket-size', type=int, default=50, help='course ids per shard (sharded format)')
+    parser.add_argument('--max-chain', type=int, default=10,
+                        help='deltas kept before compacting into a new base (delta format)')
+    args = parser.parse_args()
+
+    if args.format == 'columnar':
+        export_columnar(args.db, args.output or 'standalone/courses.columnar.json')
+    elif args.format == 'delta':
+        export_delta(args.db, args.output or 'standalone/deltas', max_chain=args.max_chain)
+    elif args.format == 'sharded':
+        export_sharded(args.db, args.output or 'standalone/catalog', bucket_size=args.bucket_size)
+    else:
+        export_database_to_js(args.db, args.output or 'standalone/courses-data.js', minify=args.minify)
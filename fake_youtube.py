@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the YouTube Data API
+Answers the five calls the collector makes (search, playlists,
+playlistItems, videos, channels) with generated but self-consistent data,
+so collection jobs can run under load tests without network access or
+quota. Every search returns playlists the collector has not seen yet.
+
+Point the collector at it with YOUTUBE_API_ENDPOINT=http://127.0.0.1:<port>/
+(any YOUTUBE_API_KEY is accepted). --quota and --rate-limit make each key
+run out of quota or get rate limited the way the real API reports it.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from generate_benchmark_data import TOPICS, WORDS, lesson_count, view_count
+
+CHANNELS = 200
+
+# Quota units per call, as charged by the real API
+QUOTA_COSTS = {'search': 100}
+
+
+def seeded(*key) -> random.Random:
+    """A generator seeded by key, so the same id always describes the same thing"""
+    return random.Random(zlib.crc32(repr(key).encode('utf-8')))
+
+
+def playlist_snippet(playlist_id: str) -> dict:
+    rng = seeded('playlist', playlist_id)
+    topic = rng.choice([topic for topics in TOPICS.values() for topic in topics])
+    channel = rng.randrange(CHANNELS)
+    title = f'{topic} {rng.choice(["Full Course", "Tutorial for Beginners", "Crash Course", "Bootcamp"])}'
+    return {
+        'title': title,
+        'description': f'{title}. ' + ' '.join(rng.choices(WORDS, k=30)),
+        'channelId': f'UCfake{channel:018d}',
+        'channelTitle': f'Fake Academy {channel}',
+        'thumbnails': {'high': {'url': f'https://i.ytimg.com/vi/{playlist_id}/hqdefault.jpg'}},
+        'publishedAt': f'20{rng.randint(15, 25)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}T12:00:00Z'
+    }
+
+
+def playlist_video_ids(playlist_id: str) -> list:
+    rng = seeded('videos', playlist_id)
+    return [f'{playlist_id[-6:]}{idx:05d}' for idx in range(lesson_count(rng))]
+
+
+def video_resource(video_id: str) -> dict:
+    rng = seeded('video', video_id)
+    views = view_count(rng)
+    minutes, seconds = rng.randint(2, 40), rng.randint(0, 59)
+    return {
+        'id': video_id,
+        'snippet': {
+            'title': f'Lesson {video_id[-5:].lstrip("0") or "0"}: {rng.choice(WORDS)}',
+            'description': ' '.join(rng.choices(WORDS, k=rng.randint(10, 60))),
+            'thumbnails': {'medium': {'url': f'https://i.ytimg.com/vi/{video_id}/mqdefault.jpg'}},
+            'publishedAt': '2024-01-01T00:00:00Z'
+        },
+        'contentDetails': {'duration': f'PT{minutes}M{seconds}S'},
+        'statistics': {'viewCount': str(views), 'likeCount': str(views // 50)}
+    }
+
+
+class FakeYouTube(ThreadingHTTPServer):
+    """HTTP server answering YouTube Data API v3 list calls"""
+
+    daemon_threads = True
+
+    def __init__(self, address, latency: float = 0.0, quota: int = 0, rate_limit: float = 0.0):
+        super().__init__(address, FakeYouTubeHandler)
+        self.latency = latency
+        # Units per key before quotaExceeded, and calls per key and second before rateLimitExceeded (0: no limit)
+        self.quota = quota
+        self.rate_limit = rate_limit
+        self.lock = threading.Lock()
+        self.searches = 0
+        self.calls = {}
+        self.errors = {}
+        self.used = {}
+        self.recent = {}
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def count(self, resource: str) -> int:
+        with self.lock:
+            self.calls[resource] = self.calls.get(resource, 0) + 1
+            if resource == 'search':
+                self.searches += 1
+            return self.searches
+
+    def refuse(self, key: str, resource: str):
+        """The error reason for a call that would exceed the key's limits, or None"""
+        now = time.monotonic()
+        with self.lock:
+            reason = None
+            cost = QUOTA_COSTS.get(resource, 1)
+            if self.quota and self.used.get(key, 0) + cost > self.quota:
+                reason = 'quotaExceeded'
+            elif self.rate_limit:
+                recent = [t for t in self.recent.get(key, []) if now - t < 1.0]
+                if len(recent) >= self.rate_limit:
+                    reason = 'rateLimitExceeded'
+                else:
+                    recent.append(now)
+                self.recent[key] = recent
+            if reason:
+                self.errors[reason] = self.errors.get(reason, 0) + 1
+            else:
+                self.used[key] = self.used.get(key, 0) + cost
+            return reason
+
+    def start(self) -> threading.Thread:
+        """Serve from a background thread"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class FakeYouTubeHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        resource = url.path.rstrip('/').rsplit('/', 1)[-1]
+        handler = getattr(self, f'list_{resource}', None)
+        if handler is None:
+            self.reply(404, {'error': {'code': 404, 'message': f'Unknown resource {resource}'}})
+            return
+
+        reason = self.server.refuse(params.get('key', ''), resource)
+        if reason:
+            self.reply(403, {'error': {'code': 403, 'message': f'The request cannot be completed: {reason}',
+                                       'errors': [{'domain': 'youtube.quota', 'reason': reason}]}})
+            return
+
+        search_number = self.server.count(resource)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.reply(200, handler(params, search_number))
+
+    def reply(self, status: int, body: dict):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def list_search(self, params, search_number):
+        count = int(params.get('maxResults', 5))
+        items = []
+        for n in range(count):
+            playlist_id = f'PLfake{search_number:08d}{n:04d}'
+            items.append({
+                'kind': 'youtube#searchResult',
+                'id': {'kind': 'youtube#playlist', 'playlistId': playlist_id},
+                'snippet': playlist_snippet(playlist_id)
+            })
+        return {'kind': 'youtube#searchListResponse', 'items': items}
+
+    def list_playlists(self, params, _):
+        items = []
+        for playlist_id in params.get('id', '').split(','):
+            if playlist_id:
+                items.append({'id': playlist_id, 'snippet': playlist_snippet(playlist_id),
+                              'contentDetails': {'itemCount': len(playlist_video_ids(playlist_id))}})
+        return {'kind': 'youtube#playlistListResponse', 'items': items}
+
+    def list_playlistItems(self, params, _):
+        video_ids = playlist_video_ids(params.get('playlistId', ''))
+        page_size = int(params.get('maxResults', 5))
+        start = int(params.get('pageToken') or 0)
+        page = video_ids[start:start + page_size]
+        response = {
+            'kind': 'youtube#playlistItemListResponse',
+            'items': [{'contentDetails': {'videoId': video_id}, 'snippet': {'position': start + i}}
+                      for i, video_id in enumerate(page)]
+        }
+        if start + page_size < len(video_ids):
+            response['nextPageToken'] = str(start + page_size)
+        return response
+
+    def list_videos(self, params, _):
+        return {'kind': 'youtube#videoListResponse',
+                'items': [video_resource(video_id) for video_id in params.get('id', '').split(',') if video_id]}
+
+    def list_channels(self, params, _):
+        items = []
+        for channel_id in params.get('id', '').split(','):
+            if channel_id:
+                subscribers = int(seeded('channel', channel_id).lognormvariate(10, 2))
+                items.append({'id': channel_id, 'statistics': {'subscriberCount': str(subscribers)}})
+        return {'kind': 'youtube#channelListResponse', 'items': items}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve a fake YouTube Data API for local collection runs')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=8089, help='port to listen on')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds added to every response')
+    parser.add_argument('--quota', type=int, default=0, help='quota units per API key (0: unlimited)')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='calls per second per API key (0: unlimited)')
+    args = parser.parse_args()
+
+    server = FakeYouTube((args.host, args.port), latency=args.latency, quota=args.quota, rate_limit=args.rate_limit)
+    print(f"✓ Fake YouTube API on {server.endpoint}")
+    print(f"  Start the API server with YOUTUBE_API_ENDPOINT={server.endpoint} YOUTUBE_API_KEY=fake")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
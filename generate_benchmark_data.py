@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic course data for benchmarks
+Writes JSONL in the collector's format (one course per line, lessons
+inline) at any scale. Distributions follow what real collections look
+like: a few channels publish most playlists, lesson counts and view counts
+are long-tailed, compilations reuse videos of other playlists and
+descriptions repeat per-channel boilerplate.
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+# Named sizes for --courses
+SIZES = {'small': 1_000, 'medium': 100_000, 'large': 1_000_000}
+
+# Topics per category; titles, tags and subcategories are drawn from these
+TOPICS = {
+    'AI/ML': ['Machine Learning', 'Deep Learning', 'TensorFlow', 'PyTorch', 'Computer Vision', 'NLP'],
+    'Web Dev': ['React', 'Vue.js', 'Angular', 'Node.js', 'Frontend', 'Backend', 'Full Stack'],
+    'Data Science': ['Pandas', 'Data Visualization', 'Statistics', 'SQL', 'Big Data', 'NumPy'],
+    'Mobile': ['Android', 'iOS', 'React Native', 'Flutter', 'Swift', 'Kotlin'],
+    'Cloud': ['AWS', 'Azure', 'Google Cloud', 'Docker', 'Kubernetes', 'Serverless'],
+    'Cybersecurity': ['Ethical Hacking', 'Network Security', 'Penetration Testing', 'CISSP'],
+    'DevOps': ['CI/CD', 'Jenkins', 'Terraform', 'Ansible', 'Site Reliability'],
+    'Programming': ['Python', 'Java', 'JavaScript', 'C++', 'Go', 'Rust'],
+    'Database': ['MongoDB', 'PostgreSQL', 'MySQL', 'Database Design', 'NoSQL'],
+    'Design': ['UI Design', 'UX Design', 'Figma', 'Graphic Design', 'Design Thinking']
+}
+
+# Category shares of a typical collection
+CATEGORY_WEIGHTS = [18, 20, 12, 8, 9, 5, 6, 14, 4, 4]
+
+LANGUAGES = [('en', 'English', 70), ('es', 'Spanish', 8), ('hi', 'Hindi', 7), ('pt', 'Portuguese', 4),
+             ('fr', 'French', 3), ('de', 'German', 3), ('ru', 'Russian', 2), ('ar', 'Arabic', 2),
+             ('ja', 'Japanese', 1)]
+
+TITLE_TEMPLATES = ['{topic} Full Course', 'Learn {topic} in {n} Hours', '{topic} Tutorial for Beginners',
+                   'Complete {topic} Bootcamp', '{topic} Crash Course', 'Advanced {topic}',
+                   '{topic} Masterclass {year}', '{topic} from Scratch', 'Mastering {topic}']
+
+LESSON_TEMPLATES = ['Introduction to {topic}', '{topic} Setup and Installation', '{topic} Basics',
+                    'Working with {word}', '{word} in {topic}', 'Project: {word} App', '{topic} Best Practices',
+                    'Debugging {word}', '{topic} Q&A', 'Deploying {word}']
+
+WORDS = ['variables', 'functions', 'classes', 'arrays', 'APIs', 'databases', 'testing', 'routing', 'state',
+         'models', 'pipelines', 'containers', 'networks', 'layouts', 'forms', 'hooks', 'queries', 'security',
+         'performance', 'authentication', 'components', 'modules', 'events', 'streams', 'files', 'caching']
+
+LEVEL_TAGS = ['beginner', 'intermediate', 'advanced']
+
+
+def lesson_count(rng):
+    """Mostly 5-40 lessons with a tail of very long playlists"""
+    return max(1, min(400, int(rng.lognormvariate(2.8, 0.7))))
+
+
+def view_count(rng):
+    """Long-tailed view counts; most videos have few views, a handful millions"""
+    return int(rng.lognormvariate(8.5, 2.0))
+
+
+def channel_boilerplate(channel_id, name):
+    """The lines a channel appends to every video description"""
+    return '\n'.join([
+        f'Subscribe to {name} for more tutorials: https://www.youtube.com/channel/{channel_id}?sub_confirmation=1',
+        f'Source code: https://github.com/{name.lower().replace(" ", "")}/courses',
+        f'Join our Discord: https://discord.gg/{channel_id[-8:]}',
+        f'#programming #coding #{name.lower().replace(" ", "")}'
+    ])
+
+
+def generate(n, output, seed=42, compilation_rate=0.03):
+    """Write n synthetic courses to output; return the number of lessons written"""
+    rng = random.Random(seed)
+    categories = list(TOPICS)
+    languages = [lang[:2] for lang in LANGUAGES]
+    language_weights = [lang[2] for lang in LANGUAGES]
+
+    # Channel popularity is Zipf-like: playlists go to channel k with weight 1/k
+    channel_count = max(10, n // 20)
+    channels = []
+    for k in range(channel_count):
+        channel_id = 'UC' + ''.join(rng.choice('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-')
+                                    for _ in range(22))
+        name = f'{rng.choice(["Code", "Tech", "Dev", "Learn", "Byte", "Stack"])} ' \
+               f'{rng.choice(["Academy", "School", "Lab", "Hub", "Camp", "Tutorials"])} {k}'
+        channels.append({
+            'channel_id': channel_id,
+            'name': name,
+            'homepage': f'https://www.youtube.com/channel/{channel_id}',
+            'subscribers': int(rng.lognormvariate(10, 2)),
+            'boilerplate': channel_boilerplate(channel_id, name)
+        })
+    channel_weights = [1 / (k + 1) for k in range(channel_count)]
+    cumulative = []
+    total = 0.0
+    for weight in channel_weights:
+        total += weight
+        cumulative.append(total)
+
+    # Recent videos a compilation can reuse
+    recent_videos = []
+    start = datetime(2015, 1, 1)
+    lessons_written = 0
+
+    with open(output, 'w', encoding='utf-8') as f:
+        for i in range(n):
+            category = rng.choices(categories, CATEGORY_WEIGHTS)[0]
+            topic = rng.choice(TOPICS[category])
+            channel = channels[rng.choices(range(channel_count), cum_weights=cumulative)[0]]
+            language, language_name = rng.choices(languages, language_weights)[0]
+            published = start + timedelta(seconds=rng.randrange(int((datetime(2026, 1, 1) - start).total_seconds())))
+            playlist_id = f'PL{i:010d}{rng.getrandbits(32):08x}'
+
+            lessons = []
+            reused = rng.random() < compilation_rate and len(recent_videos) > 50
+            for idx in range(1, lesson_count(rng) + 1):
+                if reused and rng.random() < 0.8:
+                    lessons.append(dict(rng.choice(recent_videos), idx=idx))
+                    continue
+
+                video_id = f'v{i:08d}{idx:03d}'
+                word = rng.choice(WORDS)
+                views = view_count(rng)
+                lesson = {
+                    'idx': idx,
+                    'title': rng.choice(LESSON_TEMPLATES).format(topic=topic, word=word) + f' (Part {idx})',
+                    'video_id': video_id,
+                    'duration_min': max(1, int(rng.lognormvariate(2.5, 0.6))),
+                    'description': f'In this lesson we cover {word} in {topic}. '
+                                   f'{" ".join(rng.choices(WORDS, k=rng.randint(5, 40)))}\n\n{channel["boilerplate"]}',
+                    'thumbnail': f'https://i.ytimg.com/vi/{video_id}/mqdefault.jpg',
+                    'published_at': (published + timedelta(days=idx)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                    'view_count': views,
+                    'like_count': int(views * rng.uniform(0.005, 0.05))
+                }
+                lessons.append(lesson)
+                if len(recent_videos) < 5000:
+                    recent_videos.append(lesson)
+                else:
+                    recent_videos[rng.randrange(5000)] = lesson
+
+            lessons_written += len(lessons)
+            title = rng.choice(TITLE_TEMPLATES).format(topic=topic, n=rng.randint(2, 12), year=published.year)
+            course = {
+                'youtube_id': playlist_id,
+                'url': f'https://www.youtube.com/playlist?list={playlist_id}',
+                'category': category,
+                'subcategory': topic if rng.random() < 0.7 else category,
+                'title': title,
+                'description': f'{title} by {channel["name"]}. '
+                               f'{" ".join(rng.choices(WORDS, k=rng.randint(10, 60)))}',
+                'author': {key: channel[key] for key in ('name', 'channel_id', 'homepage', 'subscribers')},
+                'duration_min': sum(lesson['duration_min'] for lesson in lessons),
+                'lesson_count': len(lessons),
+                'language': language,
+                'language_name': language_name,
+                'thumbnail': lessons[0]['thumbnail'],
+                'published_at': published.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'verified_free': True,
+                'tags': sorted({topic.lower(), category.lower(), rng.choice(LEVEL_TAGS)}),
+                'lessons': lessons
+            }
+            f.write(json.dumps(course, ensure_ascii=False) + '\n')
+
+            if (i + 1) % 100_000 == 0:
+                print(f"  ✓ {i + 1:,} courses")
+
+    return lessons_written
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate synthetic course JSONL for benchmarks')
+    parser.add_argument('--courses', default='small',
+                        help=f"number of courses, or one of {', '.join(f'{k} ({v:,})' for k, v in SIZES.items())}")
+    parser.add_argument('--output', default=None, help='output path (default: data/bench_<courses>.jsonl)')
+    parser.add_argument('--seed', type=int, default=42, help='random seed; the same seed gives the same data')
+    parser.add_argument('--compilation-rate', type=float, default=0.03,
+                        help='share of playlists that mostly reuse videos of other playlists')
+    args = parser.parse_args()
+
+    n = SIZES.get(args.courses) or int(args.courses)
+    output = args.output or f'data/bench_{n}.jsonl'
+
+    print(f"\n{'='*60}")
+    print(f"Generating {n:,} Synthetic Courses")
+    print(f"{'='*60}\n")
+
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    started = time.perf_counter()
+    lessons = generate(n, output, seed=args.seed, compilation_rate=args.compilation_rate)
+    print(f"✓ Wrote {n:,} courses, {lessons:,} lessons to {output} in {time.perf_counter() - started:.1f}s")
+    print(f"{'='*60}\n")
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Load test for the CourseSpider API
+Simulates visitors of public/browse.html and public/database.html: each
+virtual user loads a page (stats, filter options, first page of courses),
+then filters, pages, searches and opens course details with think time in
+between. The same requests the pages send, in the same order, so the mix
+matches real traffic. Reports throughput and p50/p95/p99 latency per
+endpoint.
+
+Optionally a collection job writes to the database during the test,
+fetching from fake_youtube.py instead of the real API:
+
+    python loadtest.py --serve --db /tmp/load.db --fake-youtube --collect
+    python loadtest.py --url http://localhost:5000 --concurrency 64 --duration 120
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmark import percentile
+
+# Share of visitors on each page
+PAGE_WEIGHTS = {'browse': 0.75, 'database': 0.25}
+
+# What a visitor does after the page loads, with relative weights
+BROWSE_ACTIONS = {'filter': 3, 'page': 3, 'search': 2, 'detail': 4}
+DATABASE_ACTIONS = {'filter': 3, 'page': 4, 'detail': 3}
+
+# Sort options offered by each page
+BROWSE_SORTS = ['created_at', 'popularity', 'views', 'lesson_count', 'duration_min', 'title']
+DATABASE_SORTS = ['created_at', 'lesson_count', 'duration_min', 'title']
+
+SEARCH_TERMS = ['python', 'react', 'machine learning', 'docker', 'java', 'sql', 'flutter', 'aws', 'design']
+
+# Ids in paths are grouped into one endpoint
+ID_PATTERN = re.compile(r'/\d+(?=/|$)')
+
+
+class Results:
+    """Latencies and errors per endpoint, shared by all virtual users"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, endpoint: str, seconds: float, ok: bool):
+        with self.lock:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+
+class Visitor:
+    """One virtual user with its own keep-alive connection"""
+
+    def __init__(self, url: str, results: Results, think: float, rng: random.Random, filters: Dict):
+        parsed = urllib.parse.urlparse(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.results = results
+        self.think = think
+        self.rng = rng
+        self.filters = filters
+        self.conn: Optional[http.client.HTTPConnection] = None
+
+    def get(self, path: str, **params) -> Optional[dict]:
+        """GET /api/<path>, record its latency and return the decoded body"""
+        query = urllib.parse.urlencode({k: v for k, v in params.items() if v not in (None, '')})
+        target = f'/api/{path}' + (f'?{query}' if query else '')
+        endpoint = ID_PATTERN.sub('/<id>', f'/api/{path}')
+
+        started = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            self.conn.request('GET', target)
+            response = self.conn.getresponse()
+            body = response.read()
+            ok = response.status == 200
+        except (OSError, http.client.HTTPException):
+            self.conn = None
+            body, ok = b'', False
+        self.results.record(endpoint, time.perf_counter() - started, ok)
+
+        try:
+            return json.loads(body) if ok else None
+        except ValueError:
+            return None
+
+    def pause(self):
+        """Think time between actions: exponential around the configured mean"""
+        if self.think:
+            time.sleep(self.rng.expovariate(1 / self.think))
+
+    def random_filters(self, sorts: List[str]) -> Dict:
+        rng = self.rng
+        filters = {'sort': rng.choice(sorts), 'order': 'DESC'}
+        if self.filters['categories'] and rng.random() < 0.6:
+            filters['category'] = rng.choice(self.filters['categories'])
+        if self.filters['languages'] and rng.random() < 0.3:
+            filters['language_name'] = rng.choice(self.filters['languages'])
+        if rng.random() < 0.2:
+            filters['min_lessons'] = rng.choice([5, 10, 20, 50])
+        if rng.random() < 0.1:
+            filters['max_duration'] = rng.choice([5, 10, 20]) * 60
+        return filters
+
+    def browse_session(self, actions: int):
+        """public/browse.html: 12 courses per page, facet counts follow the filters"""
+        filters = {}
+        page = 1
+        self.get('stats')
+        self.get('facets')
+        listing = self.get('courses', limit=12, offset=0)
+        for _ in range(actions):
+            self.pause()
+            action = self.rng.choices(list(BROWSE_ACTIONS), list(BROWSE_ACTIONS.values()))[0]
+            if action == 'detail' and listing and listing.get('data'):
+                course_id = self.rng.choice(listing['data'])['id']
+                self.get(f'courses/{course_id}')
+                self.get(f'courses/{course_id}/related', limit=6)
+                continue
+            if action == 'search':
+                term = self.rng.choice(SEARCH_TERMS)
+                # One suggestion request per pause in typing
+                for length in range(2, len(term) + 1, 3):
+                    self.get('suggest', q=term[:length], limit=8)
+                filters = {**filters, 'search': term}
+                page = 1
+            elif action == 'filter':
+                filters = self.random_filters(BROWSE_SORTS)
+                page = 1
+            else:
+                page += 1
+            if page == 1:
+                self.get('facets', **{k: v for k, v in filters.items() if k not in ('sort', 'order')})
+            listing = self.get('courses', limit=12, offset=(page - 1) * 12, **filters)
+
+    def database_session(self, actions: int):
+        """public/database.html: 20 courses per page"""
+        filters = {'sort': 'created_at', 'order': 'DESC'}
+        page = 1
+        self.get('stats')
+        self.get('filters')
+        listing = self.get('courses', limit=20, offset=0, **filters)
+        for _ in range(actions):
+            self.pause()
+            action = self.rng.choices(list(DATABASE_ACTIONS), list(DATABASE_ACTIONS.values()))[0]
+            if action == 'detail' and listing and listing.get('data'):
+                self.get(f"courses/{self.rng.choice(listing['data'])['id']}")
+                continue
+            if action == 'filter':
+                filters = self.random_filters(DATABASE_SORTS)
+                filters.pop('min_lessons', None)
+                filters.pop('max_duration', None)
+                page = 1
+            else:
+                page += 1
+            listing = self.get('courses', limit=20, offset=(page - 1) * 20, **filters)
+
+    def run(self, deadline: float):
+        while time.monotonic() < deadline:
+            page = self.rng.choices(list(PAGE_WEIGHTS), list(PAGE_WEIGHTS.values()))[0]
+            actions = self.rng.randint(1, 10)
+            if page == 'browse':
+                self.browse_session(actions)
+            else:
+                self.database_session(actions)
+            self.pause()
+
+
+def copy_database(source: str, target: str):
+    """Copy a database with SQLite's backup API, so pages still in its WAL are included"""
+    conn = sqlite3.connect(Path(os.path.abspath(source)).as_uri() + '?mode=ro', uri=True)
+    copy = sqlite3.connect(target)
+    try:
+        conn.backup(copy)
+    finally:
+        copy.close()
+        conn.close()
+
+
+def wait_for_server(url: str, timeout: float = 30.0):
+    """Poll /api/health until the server answers"""
+    parsed = urllib.parse.urlparse(url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=2)
+            conn.request('GET', '/api/health')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f'API server at {url} did not come up within {timeout:.0f}s')
+
+
+def api_request(url: str, method: str, path: str, body: Optional[dict] = None) -> dict:
+    parsed = urllib.parse.urlparse(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+    conn.request(method, path, body=json.dumps(body) if body is not None else None,
+                 headers={'Content-Type': 'application/json'})
+    return json.loads(conn.getresponse().read())
+
+
+def report(results: Results, elapsed: float):
+    """Print throughput and latency percentiles per endpoint and overall"""
+    print(f"\n  {'Endpoint':<30} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    everything = []
+    for endpoint in sorted(results.latencies, key=lambda e: -len(results.latencies[e])):
+        samples = results.latencies[endpoint]
+        everything.extend(samples)
+        print(f"  {endpoint:<30} {len(samples):>9,} {len(samples) / elapsed:>8.1f} "
+              f"{percentile(samples, 50) * 1000:>8.1f} {percentile(samples, 95) * 1000:>8.1f} "
+              f"{percentile(samples, 99) * 1000:>8.1f} {results.errors.get(endpoint, 0):>7,}")
+    if everything:
+        errors = sum(results.errors.values())
+        print(f"\n✓ {len(everything):,} requests in {elapsed:.1f}s: {len(everything) / elapsed:.1f} req/s, "
+              f"p50 {percentile(everything, 50) * 1000:.1f} ms, p95 {percentile(everything, 95) * 1000:.1f} ms, "
+              f"p99 {percentile(everything, 99) * 1000:.1f} ms, {errors:,} errors ({errors / len(everything):.2%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay browse-page traffic against the CourseSpider API')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='API server to test')
+    parser.add_argument('--concurrency', type=int, default=16, help='simultaneous virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='test length in seconds')
+    parser.add_argument('--think', type=float, default=1.0,
+                        help='mean seconds a user pauses between actions (0 for a closed loop at full speed)')
+    parser.add_argument('--seed', type=int, default=42, help='random seed for user behaviour')
+    parser.add_argument('--serve', action='store_true',
+                        help='start api_server.py on --url for the test instead of using a running server')
+    parser.add_argument('--db', help='database for --serve (copied first so the test does not write to it; '
+                                     'with --collect the default database is copied too)')
+    parser.add_argument('--fake-youtube', action='store_true',
+                        help='run fake_youtube.py for collection jobs (needs --serve, or a server started '
+                             'with YOUTUBE_API_ENDPOINT set to the printed endpoint)')
+    parser.add_argument('--fake-port', type=int, default=8089, help='port of the fake YouTube API')
+    parser.add_argument('--fake-latency', type=float, default=0.05, help='seconds the fake API takes per call')
+    parser.add_argument('--collect', action='store_true', help='run a collection job during the test')
+    parser.add_argument('--collect-categories', default='Programming,Web Dev,AI/ML',
+                        help='comma-separated categories for the collection job')
+    parser.add_argument('--collect-per-category', type=int, default=20,
+                        help='courses collected per category')
+    args = parser.parse_args()
+
+    print(f"\n{'='*60}")
+    print("CourseSpider Load Test")
+    print(f"{'='*60}\n")
+
+    fake = None
+    if args.fake_youtube:
+        from fake_youtube import FakeYouTube
+        fake = FakeYouTube(('127.0.0.1', args.fake_port), latency=args.fake_latency)
+        fake.start()
+        print(f"✓ Fake YouTube API on {fake.endpoint}")
+
+    server = None
+    copy = None
+    if args.serve:
+        env = dict(os.environ, PORT=str(urllib.parse.urlparse(args.url).port or 80))
+        source = args.db or env.get('COURSESPIDER_DB', 'data/courses.db')
+        if args.db or args.collect:
+            # A collection job imports into the database; keep it off the real one
+            copy = os.path.abspath(source) + '.loadtest'
+            if os.path.exists(source):
+                copy_database(source, copy)
+            env['COURSESPIDER_DB'] = copy
+        if fake:
+            env.update(YOUTUBE_API_ENDPOINT=fake.endpoint, YOUTUBE_API_KEY=env.get('YOUTUBE_API_KEY', 'fake'))
+        log = open('loadtest-server.log', 'w')
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api_server.py')
+        server = subprocess.Popen([sys.executable, script], env=env, stdout=log, stderr=subprocess.STDOUT)
+        print(f"⚙ Started api_server.py (pid {server.pid}, log in loadtest-server.log)")
+
+    try:
+        wait_for_server(args.url)
+        options = api_request(args.url, 'GET', '/api/filters').get('data') or {}
+        filters = {'categories': options.get('categories', []), 'languages': options.get('languages', [])}
+        print(f"✓ {options.get('total_courses', 0):,} courses, {args.concurrency} users, "
+              f"{args.think:.1f}s think time, {args.duration:.0f}s")
+
+        job_id = None
+        if args.collect:
+            job = api_request(args.url, 'POST', '/api/collect', {
+                'categories': [c.strip() for c in args.collect_categories.split(',') if c.strip()],
+                'courses_per_category': args.collect_per_category
+            })
+            job_id = job.get('job_id')
+            print(f"✓ Collection job {job_id} started" if job_id else f"⚠ Collection not started: {job}")
+
+        results = Results()
+        rng = random.Random(args.seed)
+        deadline = time.monotonic() + args.duration
+        visitors = [Visitor(args.url, results, args.think, random.Random(rng.random()), filters)
+                    for _ in range(args.concurrency)]
+        threads = [threading.Thread(target=visitor.run, args=(deadline,), daemon=True) for visitor in visitors]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        report(results, time.perf_counter() - started)
+
+        if job_id:
+            status = api_request(args.url, 'GET', f'/api/collect/status/{job_id}').get('status', {})
+            print(f"✓ Collection job {status.get('status')}: {status.get('collected', 0)} courses collected")
+        if fake:
+            print(f"✓ Fake YouTube served {sum(fake.calls.values()):,} calls {fake.calls}")
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+        if copy:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(copy + suffix):
+                    os.remove(copy + suffix)
+        if fake:
+            fake.shutdown()
+
+    print(f"{'='*60}\n")
+
+
+if __name__ == '__main__':
+    main()
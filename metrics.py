@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Metrics for CourseSpider
+Collects request latencies, SQL timings per query shape and named phase
+timings, and renders them in Prometheus text format. Metrics are kept per
+process, so with the pre-fork server each worker reports its own series.
+"""
+
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Statements slower than this are printed to the slow-query log
+SLOW_QUERY_MS = float(os.environ.get('COURSESPIDER_SLOW_QUERY_MS', 200))
+
+# A gauge sample: (metric name, labels, value)
+Sample = Tuple[str, Dict[str, str], float]
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is the +Inf overflow
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        """Record one observation"""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+
+@lru_cache(maxsize=1024)
+def query_shape(sql: str) -> str:
+    """Normalize a SQL statement so executions of the same query group together"""
+    shape = re.sub(r'\s+', ' ', sql).strip()
+    shape = re.sub(r"'(?:[^']|'')*'", '?', shape)
+    shape = re.sub(r'\b\d+\b', '?', shape)
+    shape = re.sub(r'\?(?:\s*,\s*\?)+', '?, ...', shape)
+    return shape
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.request_latency: Dict[Tuple[str, str], Histogram] = {}
+        self.sql_latency: Dict[str, Histogram] = {}
+        self.sql_fetch_seconds: Dict[str, float] = {}
+        self.phase_latency: Dict[str, Histogram] = {}
+        self.slow_queries = 0
+        self.gauge_sources: List[Callable[[], Iterable[Sample]]] = []
+
+    @staticmethod
+    def histogram(table: Dict, key) -> Histogram:
+        """The histogram for key, created on first use (call with the lock held)"""
+        histogram = table.get(key)
+        if histogram is None:
+            histogram = table[key] = Histogram()
+        return histogram
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float):
+        """Record a finished HTTP request"""
+        with self.lock:
+            key = (method, route, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.histogram(self.request_latency, (method, route)).observe(seconds)
+
+    def observe_sql(self, sql: str, seconds: float):
+        """Record a statement execution and log it if slow"""
+        shape = query_shape(sql)
+        with self.lock:
+            self.histogram(self.sql_latency, shape).observe(seconds)
+            slow = seconds * 1000 >= SLOW_QUERY_MS
+            if slow:
+                self.slow_queries += 1
+        if slow:
+            print(f'⚠ Slow query ({seconds * 1000:.1f} ms): {shape}')
+
+    def observe_fetch(self, sql: str, seconds: float):
+        """Record time spent fetching rows after execution"""
+        shape = query_shape(sql)
+        with self.lock:
+            self.sql_fetch_seconds[shape] = self.sql_fetch_seconds.get(shape, 0.0) + seconds
+
+    def observe_phase(self, phase: str, seconds: float):
+        """Record time spent in a named processing phase"""
+        with self.lock:
+            self.histogram(self.phase_latency, phase).observe(seconds)
+
+    @contextmanager
+    def timed(self, phase: str):
+        """Time the enclosed block as a named phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_phase(phase, time.perf_counter() - start)
+
+    def register_gauges(self, source: Callable[[], Iterable[Sample]]):
+        """Register a callable returning gauge samples at scrape time"""
+        self.gauge_sources.append(source)
+
+    def render(self) -> str:
+        """Render all metrics in Prometheus text exposition format"""
+        lines = []
+
+        with self.lock:
+            lines.append('# HELP courtspider_http_requests_total HTTP requests by route and status')
+            lines.append('# TYPE courtspider_http_requests_total counter')
+            for (method, route, status), count in sorted(self.requests.items()):
+                labels = _labels(method=method, route=route, status=str(status))
+                lines.append(f'courtspider_http_requests_total{labels} {count}')
+
+            _render_histograms(lines, 'courtspider_http_request_duration_seconds',
+                               'HTTP request latency by route',
+                               {_labels(method=method, route=route): hist
+                                for (method, route), hist in self.request_latency.items()})
+
+            _render_histograms(lines, 'courtspider_sql_execute_duration_seconds',
+                               'SQL statement execution time by query shape',
+                               {_labels(query=shape): hist for shape, hist in self.sql_latency.items()})
+
+            lines.append('# HELP courtspider_sql_fetch_seconds_total Time spent fetching result rows by query shape')
+            lines.append('# TYPE courtspider_sql_fetch_seconds_total counter')
+            for shape, seconds in sorted(self.sql_fetch_seconds.items()):
+                lines.append(f'courtspider_sql_fetch_seconds_total{_labels(query=shape)} {seconds:.6f}')
+
+            lines.append('# HELP courtspider_sql_slow_queries_total Statements slower than the slow-query threshold')
+            lines.append('# TYPE courtspider_sql_slow_queries_total counter')
+            lines.append(f'courtspider_sql_slow_queries_total {self.slow_queries}')
+
+            _render_histograms(lines, 'courtspider_phase_duration_seconds',
+                               'Time spent in named processing phases',
+                               {_labels(phase=phase): hist for phase, hist in self.phase_latency.items()})
+
+            sources = list(self.gauge_sources)
+
+        seen = set()
+        for source in sources:
+            for name, labels, value in source():
+                if name not in seen:
+                    lines.append(f'# TYPE {name} gauge')
+                    seen.add(name)
+                lines.append(f'{name}{_labels(**labels)} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(**labels: str) -> str:
+    """Format a Prometheus label set"""
+    if not labels:
+        return ''
+    escaped = (f'{key}="{_escape(value)}"' for key, value in labels.items())
+    return '{' + ','.join(escaped) + '}'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _render_histograms(lines: List[str], name: str, help_text: str, series: Dict[str, Histogram]):
+    """Append cumulative histogram series for each label set"""
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+    for labels, hist in sorted(series.items()):
+        base = labels[1:-1] + ',' if labels else ''
+        cumulative = 0
+        for bound, count in zip(hist.buckets, hist.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{base}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{base}le="+Inf"}} {hist.count}')
+        lines.append(f'{name}_sum{labels} {hist.total:.6f}')
+        lines.append(f'{name}_count{labels} {hist.count}')
+
+
+# Process-wide registry
+registry = MetricsRegistry()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Opt-in request profiling for CourseSpider
+A sampled request, or one carrying the profile header, runs under cProfile
+while every SQL statement it executes is recorded with its timing, row
+count and EXPLAIN QUERY PLAN. Each profile is written to a bounded ring of
+files in the profile directory for GET /api/admin/profiles to serve.
+
+Nothing is recorded unless COURSESPIDER_PROFILE_RATE or
+COURSESPIDER_PROFILE_TOKEN is set; when neither is, the per-statement cost
+is a single attribute check. Profiles hold SQL, bound parameters and query
+strings, so reading them always requires the token: without one configured
+the admin endpoints refuse every request, even while sampling is on.
+"""
+
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import random
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+import metrics
+
+# Share of requests profiled at random (0 disables sampling)
+PROFILE_RATE = float(os.environ.get('COURSESPIDER_PROFILE_RATE', 0))
+
+# Requests sending this token in the header are profiled; it also guards the admin endpoints
+PROFILE_TOKEN = os.environ.get('COURSESPIDER_PROFILE_TOKEN', '')
+PROFILE_HEADER = 'X-CourseSpider-Profile'
+
+# Profiles kept on disk; the oldest are removed first
+PROFILE_DIR = os.environ.get('COURSESPIDER_PROFILE_DIR', 'data/profiles')
+PROFILE_KEEP = int(os.environ.get('COURSESPIDER_PROFILE_KEEP', 100))
+
+ENABLED = PROFILE_RATE > 0 or bool(PROFILE_TOKEN)
+
+# Functions listed per profile, by cumulative time
+TOP_FUNCTIONS = 40
+
+# Statements recorded per request; loops over thousands of rows stop here
+MAX_STATEMENTS = 500
+
+PROFILE_ID = re.compile(r'^[0-9]+-[0-9]+-[0-9a-f]+$')
+
+
+class RequestProfile:
+    """cProfile and SQL statements of one request"""
+
+    def __init__(self, reason: str):
+        self.id = f'{int(time.time() * 1000)}-{os.getpid()}-{random.getrandbits(16):04x}'
+        self.reason = reason
+        self.thread = threading.get_ident()
+        self.started = time.perf_counter()
+        self.statements: List[Dict] = []
+        self.dropped = 0
+        self.profiler = cProfile.Profile()
+
+
+# The request being profiled in this process; cProfile can only follow one
+# at a time, so concurrent requests are not profiled meanwhile
+current: Optional[RequestProfile] = None
+_lock = threading.Lock()
+
+
+def wanted(header: Optional[str]) -> Optional[str]:
+    """Why this request should be profiled, or None"""
+    if PROFILE_TOKEN and header == PROFILE_TOKEN:
+        return 'header'
+    if PROFILE_RATE and random.random() < PROFILE_RATE:
+        return 'sampled'
+    return None
+
+
+def authorized(header: Optional[str]) -> bool:
+    """Whether a request may read profiles (only token holders; nobody if no token is set)"""
+    return bool(PROFILE_TOKEN) and hmac.compare_digest((header or '').encode('utf-8'), PROFILE_TOKEN.encode('utf-8'))
+
+
+def start(reason: str) -> Optional[RequestProfile]:
+    """Start profiling the calling thread's request, unless another one is being profiled"""
+    global current
+    if not _lock.acquire(blocking=False):
+        return None
+    profile = RequestProfile(reason)
+    current = profile
+    profile.profiler.enable()
+    return profile
+
+
+def observe_sql(cursor: sqlite3.Cursor, sql: str, parameters, seconds: float, many: bool = False) -> Optional[Dict]:
+    """Record a statement of the profiled request (called by TimedCursor)"""
+    profile = current
+    if profile is None or profile.thread != threading.get_ident():
+        return None
+    if len(profile.statements) >= MAX_STATEMENTS:
+        profile.dropped += 1
+        return None
+
+    entry = {
+        'query': metrics.query_shape(sql),
+        'seconds': round(seconds, 6),
+        # Changed rows for writes; fetched rows are added as they are read
+        'rows': max(cursor.rowcount, 0),
+        'executions': len(parameters) if many and hasattr(parameters, '__len__') else 1,
+        'sql': sql,
+        'parameters': None if many else parameters,
+        'connection': cursor.connection
+    }
+    profile.statements.append(entry)
+    return entry
+
+
+def observe_rows(entry: Optional[Dict], count: int):
+    """Add fetched rows to a recorded statement"""
+    if entry is not None:
+        entry['rows'] += count
+
+
+def explain(conn: sqlite3.Connection, sql: str, parameters) -> List[str]:
+    """EXPLAIN QUERY PLAN of a recorded statement, as indented lines"""
+    if parameters is None or not re.match(r'\s*(SELECT|WITH|UPDATE|DELETE|INSERT)\b', sql, re.IGNORECASE):
+        return []
+    try:
+        # A plain cursor, so explaining is not itself timed or recorded
+        rows = conn.cursor(sqlite3.Cursor).execute('EXPLAIN QUERY PLAN ' + sql, parameters).fetchall()
+    except sqlite3.Error as e:
+        return [f'(no plan: {e})']
+
+    depth = {0: -1}
+    lines = []
+    for row in rows:
+        depth[row[0]] = depth.get(row[1], -1) + 1
+        lines.append('  ' * depth[row[0]] + row[3])
+    return lines
+
+
+def finish(profile: RequestProfile, request_info: Dict) -> str:
+    """Stop profiling, write the profile to the ring and return its id"""
+    global current
+    profile.profiler.disable()
+    seconds = time.perf_counter() - profile.started
+    current = None
+    _lock.release()
+
+    plans = {}
+    for entry in profile.statements:
+        sql, parameters, conn = entry.pop('sql'), entry.pop('parameters'), entry.pop('connection')
+        key = (sql, repr(parameters))
+        if key not in plans:
+            plans[key] = explain(conn, sql, parameters)
+        entry['plan'] = plans[key]
+        if parameters is not None:
+            entry['parameters'] = repr(parameters)[:200]
+
+    stats = pstats.Stats(profile.profiler)
+    functions = []
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in sorted(
+            stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]:
+        functions.append({
+            'function': f'{os.path.basename(filename)}:{line}({name})',
+            'calls': calls,
+            'tottime': round(tottime, 6),
+            'cumtime': round(cumtime, 6)
+        })
+
+    document = {
+        'id': profile.id,
+        'pid': os.getpid(),
+        'reason': profile.reason,
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        **request_info,
+        'seconds': round(seconds, 6),
+        'sql_seconds': round(sum(entry['seconds'] for entry in profile.statements), 6),
+        'statements_dropped': profile.dropped,
+        'statements': profile.statements,
+        'functions': functions
+    }
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, profile.id)
+    stats.dump_stats(path + '.prof')
+    tmp = path + '.json.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2, default=str)
+    os.replace(tmp, path + '.json')
+    prune()
+    return profile.id
+
+
+def prune():
+    """Keep the newest PROFILE_KEEP profiles"""
+    ids = sorted((name[:-5] for name in os.listdir(PROFILE_DIR) if name.endswith('.json')),
+                 key=lambda profile_id: int(profile_id.split('-')[0]))
+    for profile_id in ids[:max(len(ids) - PROFILE_KEEP, 0)]:
+        for suffix in ('.json', '.prof'):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, profile_id + suffix))
+            except FileNotFoundError:
+                pass  # Another worker pruned it first
+
+
+def list_profiles() -> List[Dict]:
+    """Summaries of the stored profiles, newest first"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    summaries = []
+    for name in os.listdir(PROFILE_DIR):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIR, name), encoding='utf-8') as f:
+                document = json.load(f)
+        except (OSError, ValueError):
+            continue  # Pruned or still being written
+        summaries.append({key: document.get(key) for key in
+                          ('id', 'created_at', 'reason', 'method', 'path', 'query', 'status', 'seconds',
+                           'sql_seconds')})
+        summaries[-1]['statements'] = len(document.get('statements', []))
+    summaries.sort(key=lambda summary: int(summary['id'].split('-')[0]), reverse=True)
+    return summaries
+
+
+def profile_path(profile_id: str, suffix: str = '.json') -> Optional[str]:
+    """Path of a stored profile file, or None for unknown or malformed ids"""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, profile_id + suffix)
+    return path if os.path.exists(path) else None
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Publish a snapshot of the course database for the standalone site
+Copies the live database with SQLite's online backup API a few pages at a
+time, so the API server and collection jobs keep writing while it runs.
+The snapshot is integrity-checked and optimized, then swapped into place
+atomically; visitors never download a half-written file.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from database import DatabaseManager
+
+# Stepped backups restart whenever another connection writes; after this
+# many restarts the copy falls back to a single step
+MAX_RESTARTS = 3
+
+
+class BackupRestarted(Exception):
+    pass
+
+
+def read_change_seq(conn):
+    """Catalog generation from change_log, or None for databases without one"""
+    try:
+        return conn.execute('SELECT COALESCE(MAX(seq), 0) FROM change_log').fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+
+
+def copy_snapshot(source, snapshot, pages, pause):
+    """Back up source into snapshot a few pages per step"""
+    restarts = 0
+    last_remaining = None
+
+    def progress(status, remaining, total):
+        nonlocal restarts, last_remaining
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > MAX_RESTARTS:
+                raise BackupRestarted()
+        last_remaining = remaining
+        # Yield between steps so writers get the database in between
+        if pause:
+            time.sleep(pause)
+
+    try:
+        source.backup(snapshot, pages=pages, progress=progress)
+    except BackupRestarted:
+        # In WAL mode a single step reads one consistent snapshot without
+        # blocking writers; with a rollback journal it holds off commits
+        # for the length of the copy
+        mode = source.execute('PRAGMA journal_mode').fetchone()[0]
+        print(f"⚠ Backup restarted {restarts} times under concurrent writes, "
+              f"copying in one step ({mode} mode)")
+        source.backup(snapshot, pages=-1)
+
+
+def publish(db_path='data/courses.db', output_path='standalone/courses.db', pages=256,
+            pause=0.005, trim=False, page_size=4096, description_chars=300, force=False):
+    """Snapshot db_path into output_path; return True if a new file was published"""
+
+    print(f"\n{'='*60}")
+    print("Publishing Database Snapshot")
+    print(f"{'='*60}\n")
+
+    output = Path(output_path)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    state_path = output.with_name(output.name + '.publish.json')
+    state = json.loads(state_path.read_text(encoding='utf-8')) if state_path.exists() else {}
+
+    db = DatabaseManager(db_path)
+    source = db.open_read_connection()
+
+    # Skip the copy entirely when nothing changed since the last publish
+    seq = read_change_seq(source)
+    if not force and seq is not None and output.exists() and state.get('seq') == seq and state.get('trim') == trim:
+        source.close()
+        print(f"✓ No changes since last publish (seq {seq}), nothing to do")
+        print(f"{'='*60}\n")
+        return False
+
+    snapshot_fd, snapshot_path = tempfile.mkstemp(suffix='.db', prefix='.publish-', dir=output.parent)
+    os.close(snapshot_fd)
+    started = time.perf_counter()
+
+    try:
+        snapshot = sqlite3.connect(snapshot_path)
+        try:
+            # Copy `pages` pages per step; the source is only locked during a step
+            copy_snapshot(source, snapshot, pages, pause)
+            source.close()
+
+            result = snapshot.execute('PRAGMA integrity_check').fetchone()[0]
+            if result != 'ok':
+                raise sqlite3.DatabaseError(f'integrity check failed: {result}')
+
+            # A single self-contained file for static hosting
+            snapshot.execute('PRAGMA journal_mode = DELETE')
+            snapshot.execute('PRAGMA optimize')
+            seq = read_change_seq(snapshot)
+            snapshot.commit()
+        finally:
+            snapshot.close()
+
+        copied = time.perf_counter() - started
+        print(f"✓ Snapshot copied and verified in {copied:.2f}s "
+              f"({os.path.getsize(snapshot_path) / 1024 / 1024:.2f} MB)")
+
+        if trim:
+            from build_standalone_db import build_standalone_db
+            build_standalone_db(snapshot_path, str(output), page_size=page_size,
+                                description_chars=description_chars)
+        else:
+            with open(snapshot_path, 'rb+') as f:
+                os.fsync(f.fileno())
+            os.chmod(snapshot_path, 0o644)
+            os.replace(snapshot_path, output)
+    except Exception as e:
+        print(f"❌ Publish failed, {output} left unchanged: {e}")
+        raise
+    finally:
+        source.close()
+        if os.path.exists(snapshot_path):
+            os.remove(snapshot_path)
+
+    state = {'seq': seq, 'trim': trim, 'published_at': time.strftime('%Y-%m-%d %H:%M:%S')}
+    tmp = state_path.with_name(state_path.name + '.tmp')
+    tmp.write_text(json.dumps(state, indent=2), encoding='utf-8')
+    os.replace(tmp, state_path)
+
+    print(f"✓ Published {output} ({output.stat().st_size / 1024 / 1024:.2f} MB, seq {seq})")
+    print(f"{'='*60}\n")
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Publish a consistent snapshot of the live database')
+    parser.add_argument('--db', default='data/courses.db', help='live database path')
+    parser.add_argument('--output', default='standalone/courses.db', help='published database path')
+    parser.add_argument('--pages', type=int, default=256, help='pages copied per backup step')
+    parser.add_argument('--pause', type=float, default=0.005, help='seconds to yield to writers between steps')
+    parser.add_argument('--trim', action='store_true',
+                        help='publish the trimmed viewer database (build_standalone_db.py) instead of a full copy')
+    parser.add_argument('--page-size', type=int, default=4096, help='page size of the trimmed database')
+    parser.add_argument('--description-chars', type=int, default=300,
+                        help='truncate course descriptions in the trimmed database')
+    parser.add_argument('--force', action='store_true', help='publish even if nothing changed')
+    args = parser.parse_args()
+
+    publish(args.db, args.output, pages=args.pages, pause=args.pause, trim=args.trim,
+            page_size=args.page_size, description_chars=args.description_chars, force=args.force)
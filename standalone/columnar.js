@@ -0,0 +1,77 @@
+// Decoder for the columnar catalog written by
+// `python export_to_js.py --format columnar` (courses.columnar.json).
+// Returns { stats, courses } with the same course objects, lessons
+// included, as the JSON export.
+
+const COLUMNAR_INT32_NULL = -2147483648;
+
+// Base64 -> typed array. Exports are little-endian, as are all browsers'
+// typed arrays in practice.
+function decodePackedColumn(data, ArrayType) {
+    const binary = atob(data);
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) {
+        bytes[i] = binary.charCodeAt(i);
+    }
+    return new ArrayType(bytes.buffer);
+}
+
+// Decode one column into a plain array of count values
+function decodeColumn(column, count, columns) {
+    switch (column.type) {
+        case 'int32':
+            return Array.from(decodePackedColumn(column.data, Int32Array),
+                value => value === COLUMNAR_INT32_NULL ? null : value);
+        case 'float64':
+            return Array.from(decodePackedColumn(column.data, Float64Array),
+                value => Number.isNaN(value) ? null : value);
+        case 'dict': {
+            const codes = decodePackedColumn(column.data, column.width === 32 ? Uint32Array : Uint16Array);
+            return Array.from(codes, code => column.values[code]);
+        }
+        case 'derived': {
+            // Rebuild the URL from its key column unless the row stored its own
+            const keys = decodeColumn(columns[column.key], count, columns);
+            return keys.map((key, row) => row in column.exceptions
+                ? column.exceptions[row]
+                : column.template.replace('{}', key));
+        }
+        default:
+            return column.values;
+    }
+}
+
+// Decode every column of a table into row objects
+function decodeColumnarTable(table, skip = []) {
+    const names = Object.keys(table.columns).filter(name => !skip.includes(name));
+    const decoded = names.map(name => decodeColumn(table.columns[name], table.count, table.columns));
+
+    const rows = new Array(table.count);
+    for (let row = 0; row < table.count; row++) {
+        const obj = {};
+        names.forEach((name, col) => {
+            obj[name] = decoded[col][row];
+        });
+        rows[row] = obj;
+    }
+    return rows;
+}
+
+function decodeColumnarCatalog(payload) {
+    if (payload.format !== 'columnar' || payload.version !== 1) {
+        throw new Error('Unsupported catalog format');
+    }
+
+    const courses = decodeColumnarTable(payload.courses, ['lessons']);
+    const lessons = decodeColumnarTable(payload.lessons);
+    const lessonCounts = decodeColumn(payload.courses.columns.lessons, payload.courses.count);
+
+    // Lessons are stored in course order; split them back per course
+    let offset = 0;
+    courses.forEach((course, row) => {
+        course.lessons = lessons.slice(offset, offset + lessonCounts[row]);
+        offset += lessonCounts[row];
+    });
+
+    return { stats: payload.stats, courses };
+}
@@ -2,15 +2,55 @@
 """
 Simple HTTP server for standalone app
 Serves files from current directory on port 8080
+
+Requests are handled on threads, files support Range requests (206 Partial
+Content) and If-Modified-Since revalidation, and bodies are sent with
+sendfile() where the OS supports it.
+
+Precompressed .br/.gz siblings written by compress_assets.py are sent when
+the browser accepts them, including courses.db, which the viewer downloads
+whole. Range requests always get the plain file, since byte offsets address
+it and not an encoded variant. Content-hashed files are marked immutable.
 """
 
+import email.utils
 import http.server
-import socketserver
 import os
+import re
 
 PORT = 8080
 
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Names like shards/000001.<16 hex>.json change whenever their content does
+HASHED_NAME = re.compile(r'\.[0-9a-f]{16}\.[A-Za-z0-9]+$')
+
+# Precompressed variants in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def parse_accept_encoding(header):
+    """Map each encoding in an Accept-Encoding header to its q-value"""
+    accepted = {}
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted
+
+
 class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
+    # Keep-alive: a page load fetches the viewer, its manifest and shards
+    protocol_version = 'HTTP/1.1'
+
     def end_headers(self):
         # Add CORS headers for database file
         self.send_header('Access-Control-Allow-Origin', '*')
@@ -18,12 +58,189 @@ class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         self.send_header('Cross-Origin-Embedder-Policy', 'require-corp')
         super().end_headers()
 
+    def do_GET(self):
+        self.serve_file(send_body=True)
+
+    def do_HEAD(self):
+        self.serve_file(send_body=False)
+
+    def serve_file(self, send_body):
+        """Serve a regular file with Range and conditional request support"""
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) or not os.path.isfile(path):
+            # Directory listings, index.html redirects and 404s
+            return super().do_GET() if send_body else super().do_HEAD()
+
+        content_type = self.guess_type(path)
+        cache_control = self.cache_control(path)
+        path, encoding = self.choose_encoding(path)
+
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            self.send_error(404, 'File not found')
+            return
+
+        with f:
+            stat = os.fstat(f.fileno())
+            size = stat.st_size
+            last_modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+            etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+
+            byte_range = self.requested_range(size, last_modified, etag)
+
+            if byte_range is None and self.not_modified(stat.st_mtime, etag):
+                self.send_response(304)
+                self.send_header('Last-Modified', last_modified)
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', cache_control)
+                self.send_header('Vary', 'Accept-Encoding')
+                self.end_headers()
+                return
+
+            if byte_range == 'unsatisfiable':
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            if byte_range is None:
+                start, end = 0, size - 1
+                self.send_response(200)
+            else:
+                start, end = byte_range
+                self.send_response(206)
+                self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+
+            length = max(end - start + 1, 0)
+            self.send_header('Content-Type', content_type)
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
+            else:
+                # Ranges address the plain file, not an encoded variant
+                self.send_header('Accept-Ranges', 'bytes')
+            self.send_header('Content-Length', str(length))
+            self.send_header('Last-Modified', last_modified)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', cache_control)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+
+            if send_body and length:
+                self.send_file_range(f, start, length)
+
+    def choose_encoding(self, path):
+        """Pick the best precompressed sibling the client accepts, or the file itself"""
+        # Byte ranges always address the uncompressed file
+        if self.headers.get('Range'):
+            return path, None
+
+        accepted = parse_accept_encoding(self.headers.get('Accept-Encoding', ''))
+        source_mtime = os.stat(path).st_mtime
+        for encoding, suffix in ENCODINGS:
+            if accepted.get(encoding, accepted.get('*', 0)) <= 0:
+                continue
+            try:
+                variant = os.stat(path + suffix)
+            except OSError:
+                continue
+            # Ignore variants left over from an older version of the file
+            if variant.st_mtime >= source_mtime:
+                return path + suffix, encoding
+        return path, None
+
+    def cache_control(self, path):
+        """Cache hashed files forever; revalidate everything else"""
+        if HASHED_NAME.search(path):
+            return 'public, max-age=31536000, immutable'
+        return 'no-cache'
+
+    def requested_range(self, size, last_modified, etag):
+        """Parse a single-range Range header into (start, end), or None for the whole file"""
+        header = self.headers.get('Range')
+        if not header:
+            return None
+
+        # A stale If-Range validator means the client wants the full new file
+        if_range = self.headers.get('If-Range')
+        if if_range and if_range not in (last_modified, etag):
+            return None
+
+        match = RANGE_PATTERN.match(header.strip())
+        if not match or match.groups() == ('', ''):
+            return None  # Multiple or malformed ranges: serve the whole file
+        if size == 0:
+            return 'unsatisfiable'  # An empty file has no byte to point at
+
+        first, last = match.groups()
+        if first == '':
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length == 0:
+                return 'unsatisfiable'
+            return max(size - length, 0), size - 1
+
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start >= size or start > end:
+            return 'unsatisfiable'
+        return start, end
+
+    def not_modified(self, mtime, etag):
+        """Check If-None-Match / If-Modified-Since against the file"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match:
+            return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if not if_modified_since:
+            return False
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since.timestamp()
+
+    def send_file_range(self, f, start, length):
+        """Write length bytes from offset start, zero-copy via sendfile when possible"""
+        offset = start
+        remaining = length
+        if hasattr(os, 'sendfile'):
+            try:
+                sock_fd = self.connection.fileno()
+                while remaining > 0:
+                    sent = os.sendfile(sock_fd, f.fileno(), offset, remaining)
+                    if sent == 0:
+                        return
+                    offset += sent
+                    remaining -= sent
+                return
+            except (BrokenPipeError, ConnectionResetError):
+                return
+            except OSError:
+                pass  # e.g. unsupported socket type: copy the rest instead
+
+        f.seek(offset)
+        while remaining > 0:
+            chunk = f.read(min(64 * 1024, remaining))
+            if not chunk:
+                break
+            self.wfile.write(chunk)
+            remaining -= len(chunk)
+
+
+class ThreadingServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
 if __name__ == '__main__':
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
-    
+
     Handler = MyHTTPRequestHandler
-    
-    with socketserver.TCPServer(("", PORT), Handler) as httpd:
+
+    with ThreadingServer(("", PORT), Handler) as httpd:
         print("\n" + "="*60)
         print("📚 Standalone Course Viewer Server")
         print("="*60)
@@ -32,7 +249,7 @@ if __name__ == '__main__':
         print("\nOpen in browser: http://localhost:8080/index.html")
         print("\nPress Ctrl+C to stop")
         print("="*60 + "\n")
-        
+
         try:
             httpd.serve_forever()
         except KeyboardInterrupt:
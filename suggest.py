@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Typeahead suggestions for CourseSpider
+Keeps course titles, authors, subcategories and tags in a compact in-memory
+index: one sorted array of keys (an entry number plus the offset of a word
+inside its text), searched by binary search, with the best completions by
+popularity picked block by block. The index is rebuilt in the background
+whenever the catalog generation (the change log seq) moves.
+"""
+
+import heapq
+import json
+import re
+import sqlite3
+import sys
+import threading
+import time
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+KINDS = ('title', 'author', 'subcategory', 'tag')
+
+# Words of a text a completion may start at, so "react" finds "Learn React Native"
+MAX_WORDS = 4
+
+# Characters of each key compared while searching; longer queries are cut to this
+KEY_CHARS = 32
+
+# Keys per block; each block keeps its best weight so ranking skips weak blocks
+BLOCK = 64
+
+# Most completions returned per query
+MAX_LIMIT = 20
+
+# Prefixes this short match a large share of the keys; their answers are
+# cached per index instead of ranked on every keystroke
+CACHED_PREFIX = 2
+
+# Seconds between checks of the catalog generation
+REFRESH_INTERVAL = 5.0
+
+WORD_START = re.compile(r'\b\w')
+
+# (kind, text, weight, course id or 0)
+Entry = Tuple[str, str, float, int]
+
+
+def load_entries(conn: sqlite3.Connection) -> Iterator[Entry]:
+    """Suggestion entries for every course title and every distinct author, subcategory and tag"""
+    groups = {}
+    for row in conn.execute('SELECT id, title, author_name, subcategory, tags, popularity FROM courses'):
+        popularity = row['popularity'] or 0.0
+        yield 'title', row['title'], popularity, row['id']
+
+        try:
+            tags = json.loads(row['tags']) if row['tags'] else []
+        except ValueError:
+            tags = []
+        for kind, text in [('author', row['author_name']), ('subcategory', row['subcategory'])] + \
+                [('tag', tag) for tag in tags]:
+            if text:
+                # A group ranks as its most popular course
+                key = (kind, text)
+                groups[key] = max(groups.get(key, 0.0), popularity)
+
+    for (kind, text), weight in groups.items():
+        yield kind, text, weight, 0
+
+
+class SuggestIndex:
+    """Sorted, array-backed prefix index over suggestion entries"""
+
+    def __init__(self, entries: Iterator[Entry]):
+        self.texts: List[str] = []
+        self.kinds = bytearray()
+        self.weights = array('d')
+        self.course_ids = array('q')
+        key_entries = array('I')
+        key_offsets = array('H')
+
+        for kind, text, weight, course_id in entries:
+            if not text:
+                continue
+            entry = len(self.texts)
+            # Authors, subcategories and tags repeat across courses
+            self.texts.append(sys.intern(text) if kind != 'title' else text)
+            self.kinds.append(KINDS.index(kind))
+            self.weights.append(weight)
+            self.course_ids.append(course_id)
+            for match in list(WORD_START.finditer(text))[:MAX_WORDS]:
+                if match.start() < 65536:
+                    key_entries.append(entry)
+                    key_offsets.append(match.start())
+
+        self.key_entries = key_entries
+        self.key_offsets = key_offsets
+        order = sorted(range(len(key_entries)), key=self.key)
+        self.key_entries = array('I', (key_entries[i] for i in order))
+        self.key_offsets = array('H', (key_offsets[i] for i in order))
+
+        self.cache: Dict[str, List[Dict]] = {}
+        self.block_max = array('d', (
+            max(self.weights[entry] for entry in self.key_entries[start:start + BLOCK])
+            for start in range(0, len(self.key_entries), BLOCK)
+        ))
+
+    def __len__(self):
+        return len(self.key_entries)
+
+    def key(self, i: int) -> str:
+        """Search key i: the case-folded text from its word on"""
+        offset = self.key_offsets[i]
+        return self.texts[self.key_entries[i]][offset:offset + KEY_CHARS].casefold()
+
+    def bisect(self, prefix: str, after: bool) -> int:
+        """First key starting with prefix, or (after=True) the first key past them"""
+        lo, hi = 0, len(self.key_entries)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            head = self.key(mid)[:len(prefix)]
+            if head < prefix or (after and head == prefix):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def complete(self, query: str, limit: int = 10) -> List[Dict]:
+        """The most popular distinct completions of query"""
+        prefix = query.strip().casefold()[:KEY_CHARS]
+        limit = min(limit, MAX_LIMIT)
+        if not prefix:
+            return []
+        if len(prefix) > CACHED_PREFIX:
+            return self.rank(prefix, limit)
+
+        results = self.cache.get(prefix)
+        if results is None:
+            results = self.cache[prefix] = self.rank(prefix, MAX_LIMIT)
+        return results[:limit]
+
+    def rank(self, prefix: str, limit: int) -> List[Dict]:
+        """The best `limit` distinct entries with a key starting with prefix"""
+        lo = self.bisect(prefix, after=False)
+        hi = self.bisect(prefix, after=True)
+        if lo >= hi:
+            return []
+
+        # Open blocks from the best down while one could still beat the best
+        # candidate found so far
+        blocks = [(-self.block_max[block], block) for block in range(lo // BLOCK, (hi - 1) // BLOCK + 1)]
+        heapq.heapify(blocks)
+        candidates = []
+        results = []
+        seen = set()
+        while len(results) < limit:
+            while blocks and (not candidates or blocks[0][0] <= candidates[0][0]):
+                _, block = heapq.heappop(blocks)
+                for i in range(max(block * BLOCK, lo), min((block + 1) * BLOCK, hi)):
+                    heapq.heappush(candidates, (-self.weights[self.key_entries[i]], i))
+            if not candidates:
+                break
+
+            _, i = heapq.heappop(candidates)
+            entry = self.key_entries[i]
+            text = self.texts[entry]
+            identity = (self.kinds[entry], text.casefold())
+            if identity in seen:
+                continue  # Same text reached through another of its words
+            seen.add(identity)
+
+            suggestion = {'text': text, 'type': KINDS[self.kinds[entry]]}
+            if self.course_ids[entry]:
+                suggestion['course_id'] = self.course_ids[entry]
+            results.append(suggestion)
+        return results
+
+
+class Suggester:
+    """Serves completions from the current index, rebuilding it when the catalog changes"""
+
+    def __init__(self, db):
+        self.db = db
+        self.index: Optional[SuggestIndex] = None
+        self.generation = None
+        self.checked_at = 0.0
+        self.build_seconds = 0.0
+        self.lock = threading.Lock()
+        self.rebuilding = False
+
+    def reset(self):
+        """Forget the index (e.g. after the database connection was reopened)"""
+        with self.lock:
+            self.index = None
+            self.generation = None
+
+    def suggest(self, query: str, limit: int = 10) -> List[Dict]:
+        self.refresh()
+        return self.index.complete(query, limit)
+
+    def refresh(self):
+        """Build the index on first use; later, rebuild in the background when stale"""
+        if self.index is not None and time.monotonic() - self.checked_at < REFRESH_INTERVAL:
+            return
+
+        with self.lock:
+            if self.index is not None and (self.rebuilding or time.monotonic() - self.checked_at < REFRESH_INTERVAL):
+                return
+            self.checked_at = time.monotonic()
+            generation = self.db.get_change_seq()
+            if generation == self.generation:
+                return
+
+            if self.index is None:
+                self.build(generation)
+            else:
+                # Keep answering from the current index meanwhile
+                self.rebuilding = True
+                threading.Thread(target=self.rebuild, args=(generation,), daemon=True).start()
+
+    def rebuild(self, generation):
+        try:
+            self.build(generation)
+        finally:
+            self.rebuilding = False
+
+    def build(self, generation):
+        started = time.perf_counter()
+        conn = self.db.open_read_connection()
+        try:
+            index = SuggestIndex(load_entries(conn))
+        finally:
+            conn.close()
+        self.index = index
+        self.generation = generation
+        self.build_seconds = time.perf_counter() - started
+
+    def gauges(self):
+        """Index size and freshness for /api/metrics"""
+        index = self.index
+        yield 'courtspider_suggest_keys', {}, len(index) if index else 0
+        yield 'courtspider_suggest_generation', {}, self.generation or 0
+        yield 'courtspider_suggest_build_seconds', {}, self.build_seconds
@@ -0,0 +1,32 @@
+"""Malformed query parameters are client errors"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv('COURSESPIDER_DB', str(tmp_path / 'courses.db'))
+    import api_server
+    monkeypatch.setattr(api_server.db, 'db_path', str(tmp_path / 'courses.db'))
+    api_server.init_db(read_only=False)
+    yield api_server.app.test_client()
+    api_server.db.close()
+
+
+def test_unsupported_sort_is_a_bad_request(client):
+    response = client.get('/api/courses?sort=title;DROP')
+    assert response.status_code == 400
+    assert 'Unsupported sort' in response.get_json()['error']
+
+    assert client.get('/api/courses?sort=popularity').status_code == 200
+    assert client.post('/api/search', json={'sort': 'nope'}).status_code == 400
+
+
+def test_malformed_numbers_are_bad_requests(client):
+    assert client.get('/api/courses?limit=ten').status_code == 400
+    assert client.get('/api/courses?offset=').status_code == 400
@@ -0,0 +1,101 @@
+"""Request coalescing: SingleFlight and the @coalesced view decorator"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def api_server(tmp_path, monkeypatch):
+    monkeypatch.setenv('COURSESPIDER_DB', str(tmp_path / 'courses.db'))
+    import api_server
+    monkeypatch.setattr(api_server.db, 'db_path', str(tmp_path / 'courses.db'))
+    api_server.init_db(read_only=False)
+    yield api_server
+    api_server.db.close()
+
+
+def run_concurrently(flight, key, fn, callers):
+    """Start callers threads on flight.do(key, fn); return their outcomes once fn was joined"""
+    outcomes = [None] * callers
+
+    def call(i):
+        try:
+            outcomes[i] = ('result', flight.do(key, fn))
+        except Exception as e:
+            outcomes[i] = ('error', e)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return outcomes
+
+
+def blocking(result=None, error=None, flight=None, followers=0):
+    """fn that holds the leader until the expected followers are waiting"""
+    calls = []
+
+    def fn():
+        calls.append(1)
+        deadline = time.monotonic() + 5
+        while flight.followers < followers and time.monotonic() < deadline:
+            time.sleep(0.001)
+        if error is not None:
+            raise error
+        return result
+    return fn, calls
+
+
+def test_waiters_share_the_leaders_result(api_server):
+    flight = api_server.SingleFlight()
+    fn, calls = blocking(result={'page': 1}, flight=flight, followers=3)
+
+    outcomes = run_concurrently(flight, 'key', fn, 4)
+
+    assert len(calls) == 1
+    assert outcomes == [('result', {'page': 1})] * 4
+    assert (flight.leaders, flight.followers) == (1, 3)
+    assert not flight.calls
+
+
+def test_waiters_get_the_leaders_error(api_server):
+    flight = api_server.SingleFlight()
+    error = RuntimeError('database is locked')
+    fn, calls = blocking(error=error, flight=flight, followers=2)
+
+    outcomes = run_concurrently(flight, 'key', fn, 3)
+
+    assert len(calls) == 1
+    assert outcomes == [('error', error)] * 3
+    # A failed call is not cached: the next caller computes again
+    assert flight.do('key', lambda: 'retried') == 'retried'
+
+
+def test_different_keys_do_not_wait_for_each_other(api_server):
+    flight = api_server.SingleFlight()
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('b', lambda: 2) == 2
+    assert (flight.leaders, flight.followers) == (2, 0)
+
+
+def test_empty_argument_is_part_of_the_key(api_server, monkeypatch):
+    keys = []
+    do = api_server.single_flight.do
+
+    def recording(key, fn):
+        keys.append(key)
+        return do(key, fn)
+
+    monkeypatch.setattr(api_server.single_flight, 'do', recording)
+    client = api_server.app.test_client()
+
+    assert client.get('/api/courses').status_code == 200
+    assert client.get('/api/courses?limit=').status_code != 200
+    assert keys[0] != keys[1]
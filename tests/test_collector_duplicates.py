@@ -0,0 +1,97 @@
+"""Near-duplicate playlists within one concurrent batch and against stored courses"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from collector import EnhancedCourseCollector
+from database import DatabaseManager
+from fake_youtube import playlist_snippet, video_resource
+from generate_benchmark_data import generate
+
+
+def fake_api(playlists, barrier=None):
+    """api.call answering from a {playlist id: video ids} map"""
+    def call(resource, **params):
+        if resource == 'playlists':
+            return {'items': [{'id': params['id'], 'snippet': playlist_snippet(params['id'])}]}
+        if resource == 'playlistItems':
+            if barrier:
+                barrier.wait()  # Every playlist of the batch is in flight at once
+            return {'items': [{'contentDetails': {'videoId': vid}} for vid in playlists[params['playlistId']]]}
+        if resource == 'videos':
+            return {'items': [video_resource(vid) for vid in params['id'].split(',')]}
+        if resource == 'channels':
+            return {'items': [{'statistics': {'subscriberCount': '10'}}]}
+        raise AssertionError(resource)
+    return call
+
+
+def search_results(playlists):
+    return [{'id': {'playlistId': playlist_id}, 'snippet': {'title': playlist_id}} for playlist_id in playlists]
+
+
+@pytest.fixture
+def collector(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr('collector.DUPLICATE_POLICY', 'merge')
+    return EnhancedCourseCollector(['fake-key'])
+
+
+def test_mirrors_in_one_batch_are_collected_once(collector, monkeypatch):
+    videos = [f'mirror{i:05d}' for i in range(12)]
+    playlists = {'PLoriginal': videos, 'PLreupload': videos[:11], 'PLother': [f'other{i:05d}' for i in range(8)]}
+    assert collector.api.max_concurrency >= len(playlists)
+    monkeypatch.setattr(collector.api, 'call', fake_api(playlists, threading.Barrier(len(playlists), timeout=5)))
+
+    courses = collector.process_playlists(search_results(playlists), 'Programming', limit=3)
+
+    collected = sorted(course['youtube_id'] for course in courses)
+    assert len(collected) == 2 and 'PLother' in collected
+    assert collector.duplicates_skipped == 1
+
+
+def test_mirror_of_earlier_batch_is_skipped_before_fetching(collector, monkeypatch):
+    videos = [f'mirror{i:05d}' for i in range(12)]
+    playlists = {'PLoriginal': videos, 'PLreupload': videos}
+    monkeypatch.setattr(collector.api, 'call', fake_api(playlists))
+
+    assert len(collector.process_playlists(search_results(['PLoriginal']), 'Programming', limit=1)) == 1
+    fetched = collector.videos_fetched
+    assert collector.process_playlists(search_results(['PLreupload']), 'Programming', limit=1) == []
+    assert collector.duplicates_skipped == 1
+    assert collector.videos_fetched == fetched
+
+
+def test_workers_read_through_their_own_connections(tmp_path, monkeypatch):
+    generate(10, str(tmp_path / 'courses.jsonl'), seed=4)
+    db = DatabaseManager(str(tmp_path / 'courses.db'))
+    db.initialize()
+    db.import_from_jsonl(str(tmp_path / 'courses.jsonl'))
+    course_id = db.conn.execute('SELECT MIN(id) FROM courses').fetchone()[0]
+    stored = [row[0] for row in db.conn.execute(
+        'SELECT video_id FROM course_videos WHERE course_id = ? ORDER BY idx', (course_id,))]
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr('collector.DUPLICATE_POLICY', 'merge')
+    collector = EnhancedCourseCollector(['fake-key'], db)
+    playlists = {'PLmirror': stored, 'PLnew': [f'new{i:05d}' for i in range(8)]}
+    monkeypatch.setattr(collector.api, 'call', fake_api(playlists, threading.Barrier(2, timeout=5)))
+
+    # The shared connection is left to the importing thread
+    def shared(*args, **kwargs):
+        raise AssertionError('worker read through the shared connection')
+    for name in ('find_near_duplicates', 'get_videos', 'is_known_playlist', 'get_channel'):
+        monkeypatch.setattr(db, name, shared)
+
+    courses = collector.process_playlists(search_results(playlists), 'Programming', limit=2)
+
+    assert [course['youtube_id'] for course in courses] == ['PLnew']
+    assert tuple(db.conn.execute('SELECT course_id, merged FROM playlist_duplicates WHERE youtube_id = ?',
+                                 ('PLmirror',)).fetchone()) == (course_id, 1)
+    assert collector.readers == []
+    db.close()
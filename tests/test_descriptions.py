@@ -0,0 +1,76 @@
+"""Description dictionary training on fresh and upgraded databases"""
+
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DESCRIPTION_TRAINING_MIN, DatabaseManager
+from generate_benchmark_data import generate
+
+
+def import_catalog(db_path, data_path):
+    db = DatabaseManager(str(db_path))
+    db.initialize()
+    db.import_from_jsonl(str(data_path))
+    return db
+
+
+def stored_descriptions(db):
+    return db.conn.execute('''
+        SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0), COUNT(DISTINCT dict_id) FROM video_descriptions
+    ''').fetchone()
+
+
+def trained_dicts(db):
+    return db.conn.execute('SELECT id FROM description_dicts WHERE LENGTH(data) > 0').fetchall()
+
+
+def test_upgraded_empty_database_trains_dictionary(tmp_path):
+    data_path = tmp_path / 'courses.jsonl'
+    generate(120, str(data_path), seed=7)
+
+    # A database from before descriptions moved out of videos, with no videos yet
+    baseline = tmp_path / 'baseline.db'
+    conn = sqlite3.connect(baseline)
+    conn.execute('''
+        CREATE TABLE videos (
+            video_id TEXT PRIMARY KEY, title TEXT NOT NULL, description TEXT, duration_min INTEGER DEFAULT 0,
+            thumbnail TEXT, published_at TEXT, view_count INTEGER DEFAULT 0, like_count INTEGER DEFAULT 0,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.close()
+
+    db = DatabaseManager(str(baseline))
+    db.initialize()
+    assert not trained_dicts(db)
+    db.import_from_jsonl(str(data_path))
+
+    count, stored, dicts = stored_descriptions(db)
+    assert count >= DESCRIPTION_TRAINING_MIN
+    assert len(trained_dicts(db)) == 1
+    assert dicts == 1
+    db.close()
+
+    fresh = import_catalog(tmp_path / 'fresh.db', data_path)
+    assert stored <= stored_descriptions(fresh)[1] * 1.1
+    fresh.close()
+
+
+def test_empty_dictionary_is_replaced(tmp_path):
+    data_path = tmp_path / 'courses.jsonl'
+    generate(120, str(data_path), seed=7)
+
+    # Older releases left an empty dictionary behind when migrating an empty database
+    db = DatabaseManager(str(tmp_path / 'courses.db'))
+    db.initialize()
+    db.conn.execute("INSERT INTO description_dicts (id, data) VALUES (1, x'')")
+    db.conn.commit()
+    db.import_from_jsonl(str(data_path))
+
+    assert [row[0] for row in trained_dicts(db)] == [row[0] for row in db.conn.execute(
+        'SELECT DISTINCT dict_id FROM video_descriptions')]
+    assert db.conn.execute('SELECT COUNT(*) FROM description_dicts').fetchone()[0] == 1
+    db.close()
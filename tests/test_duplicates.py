@@ -0,0 +1,82 @@
+"""Near-duplicate playlist detection by exact Jaccard overlap of video sets"""
+
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager
+from generate_benchmark_data import generate
+
+
+@pytest.fixture
+def db(tmp_path):
+    generate(200, str(tmp_path / 'courses.jsonl'), seed=5, compilation_rate=0.2)
+    db = DatabaseManager(str(tmp_path / 'courses.db'))
+    db.initialize()
+    db.import_from_jsonl(str(tmp_path / 'courses.jsonl'))
+    yield db
+    db.close()
+
+
+def video_sets(db):
+    sets = {}
+    for course_id, video_id in db.conn.execute('SELECT course_id, video_id FROM course_videos'):
+        sets.setdefault(course_id, set()).add(video_id)
+    return sets
+
+
+def brute_force(sets, videos, threshold):
+    """Every stored course at or above threshold, the slow way"""
+    query = set(videos)
+    overlaps = {course_id: len(query & stored) / len(query | stored) for course_id, stored in sets.items()}
+    return {course_id: round(overlap, 4) for course_id, overlap in overlaps.items() if overlap >= threshold}
+
+
+def perturbed(rng, videos):
+    """A re-upload or mirror: some videos dropped, some new ones added"""
+    videos = sorted(videos)
+    kept = rng.sample(videos, max(1, len(videos) - rng.randint(0, max(1, len(videos) // 4))))
+    return kept + [f'new-{rng.random()}' for _ in range(rng.randint(0, 3))]
+
+
+def test_matches_brute_force(db):
+    sets = video_sets(db)
+    rng = random.Random(1)
+    for course_id in sorted(sets)[:80]:
+        videos = perturbed(rng, sets[course_id])
+        for threshold in (0.5, 0.8, 1.0):
+            found = {match['course_id']: match['overlap'] for match in db.find_near_duplicates(videos, threshold)}
+            assert found == brute_force(sets, videos, threshold)
+
+
+def test_exact_copy_and_ordering(db):
+    sets = video_sets(db)
+    course_id = max(sets, key=lambda i: len(sets[i]))
+    videos = sorted(sets[course_id])
+
+    # Repeated videos in a playlist count once
+    matches = db.find_near_duplicates(videos + videos[:3], 0.5)
+    assert matches[0]['course_id'] == course_id
+    assert matches[0]['overlap'] == 1.0
+    assert [match['overlap'] for match in matches] == sorted((match['overlap'] for match in matches), reverse=True)
+
+    youtube_id = db.conn.execute('SELECT youtube_id FROM courses WHERE id = ?', (course_id,)).fetchone()[0]
+    assert matches[0]['youtube_id'] == youtube_id
+
+
+def test_threshold_boundary(db):
+    sets = video_sets(db)
+    course_id = max(sets, key=lambda i: len(sets[i]))
+    videos = sorted(sets[course_id])
+    # Dropping one of n videos leaves Jaccard (n - 1) / n
+    query = videos[1:]
+    overlap = len(query) / len(videos)
+
+    assert course_id in {match['course_id'] for match in db.find_near_duplicates(query, overlap)}
+    assert course_id not in {match['course_id'] for match in db.find_near_duplicates(query, overlap + 1e-9)}
+    assert db.find_near_duplicates([]) == []
+    assert db.find_near_duplicates(['never-stored']) == []
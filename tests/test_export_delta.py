@@ -0,0 +1,129 @@
+"""Delta catalog exports: applying base plus chain, and the prefix search index"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager
+from export_to_js import course_to_export, export_delta
+from generate_benchmark_data import generate
+from tokens import tokenize
+
+
+def split_catalog(tmp_path, n, first):
+    """Generate n courses; return JSONL paths of the first ones and the rest"""
+    generate(n, str(tmp_path / 'all.jsonl'), seed=3)
+    lines = (tmp_path / 'all.jsonl').read_text(encoding='utf-8').splitlines(keepends=True)
+    (tmp_path / 'first.jsonl').write_text(''.join(lines[:first]), encoding='utf-8')
+    (tmp_path / 'rest.jsonl').write_text(''.join(lines[first:]), encoding='utf-8')
+    return str(tmp_path / 'first.jsonl'), str(tmp_path / 'rest.jsonl')
+
+
+def apply_chain(output):
+    """Rebuild the catalog from deltas.json the way app.js does"""
+    chain = json.loads((output / 'deltas.json').read_text(encoding='utf-8'))
+    base = json.loads((output / chain['base']['file']).read_text(encoding='utf-8'))
+    courses = {course['id']: course for course in base['courses']}
+    for entry in chain['deltas']:
+        delta = json.loads((output / entry['file']).read_text(encoding='utf-8'))
+        for course in delta['added'] + delta['changed']:
+            courses[course['id']] = course
+        for course_id in delta['deleted']:
+            courses.pop(course_id, None)
+    return chain, courses
+
+
+def current_catalog(db):
+    return {course['id']: course_to_export(course) for course in db.iter_courses(include_lessons=True)}
+
+
+def export(db, output, **options):
+    db.close()
+    export_delta(db.db_path, str(output), **options)
+    db.initialize()
+
+
+def test_chain_reproduces_the_catalog(tmp_path):
+    first, rest = split_catalog(tmp_path, 60, 40)
+    output = tmp_path / 'deltas'
+    db = DatabaseManager(str(tmp_path / 'courses.db'))
+    db.initialize()
+    db.import_from_jsonl(first)
+    export(db, output)
+
+    # Added, changed and deleted courses in one delta
+    db.import_from_jsonl(rest)
+    ids = [row[0] for row in db.conn.execute('SELECT id FROM courses ORDER BY id')]
+    db.conn.execute("UPDATE courses SET title = 'Renamed course' WHERE id = ?", (ids[0],))
+    db.conn.execute('DELETE FROM courses WHERE id = ?', (ids[1],))
+    db.conn.commit()
+    export(db, output)
+
+    # A course added and deleted between two exports never shows up
+    db.conn.execute('DELETE FROM courses WHERE id = ?', (ids[-1],))
+    db.conn.execute("UPDATE courses SET title = 'Renamed again' WHERE id = ?", (ids[0],))
+    db.conn.commit()
+    export(db, output)
+
+    chain, courses = apply_chain(output)
+    assert len(chain['deltas']) == 2
+    assert courses == current_catalog(db)
+    assert courses[ids[0]]['title'] == 'Renamed again'
+    assert ids[1] not in courses and ids[-1] not in courses
+
+    # Files that fell out of the chain are removed
+    files = {chain['base']['file'], chain['search_index']} | {entry['file'] for entry in chain['deltas']}
+    assert {path.name for path in output.glob('*.json')} == files | {'deltas.json'}
+    db.close()
+
+
+def test_chain_is_compacted(tmp_path):
+    first, _ = split_catalog(tmp_path, 30, 30)
+    output = tmp_path / 'deltas'
+    db = DatabaseManager(str(tmp_path / 'courses.db'))
+    db.initialize()
+    db.import_from_jsonl(first)
+    export(db, output, max_chain=2)
+
+    ids = [row[0] for row in db.conn.execute('SELECT id FROM courses ORDER BY id')]
+    for i in range(3):
+        db.conn.execute('UPDATE courses SET title = ? WHERE id = ?', (f'Edit {i}', ids[i]))
+        db.conn.commit()
+        export(db, output, max_chain=2)
+
+    chain, courses = apply_chain(output)
+    assert len(chain['deltas']) == 0
+    assert chain['base']['seq'] == chain['seq'] == db.get_change_seq()
+    assert courses == current_catalog(db)
+    db.close()
+
+
+def test_search_index_finds_every_prefix(tmp_path):
+    first, _ = split_catalog(tmp_path, 40, 40)
+    output = tmp_path / 'deltas'
+    db = DatabaseManager(str(tmp_path / 'courses.db'))
+    db.initialize()
+    db.import_from_jsonl(first)
+    export(db, output)
+
+    chain = json.loads((output / 'deltas.json').read_text(encoding='utf-8'))
+    index = json.loads((output / chain['search_index']).read_text(encoding='utf-8'))
+    assert index['terms'] == sorted(index['terms'], key=lambda term: term.encode('utf-16-be'))
+
+    postings = {}
+    for term, gaps in zip(index['terms'], index['postings']):
+        position = 0
+        for gap in gaps:
+            position += gap
+            postings.setdefault(term, set()).add(index['ids'][position])
+
+    for course in db.iter_courses():
+        words = tokenize(course['title']) + tokenize(course['author_name']) + tokenize(course['subcategory'])
+        words += tokenize(' '.join(course['tags']))
+        for word in words:
+            prefix = word[:3]
+            matches = set().union(*(ids for term, ids in postings.items() if term.startswith(prefix)))
+            assert course['id'] in matches
+    db.close()
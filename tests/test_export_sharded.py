@@ -0,0 +1,48 @@
+"""Sharded catalog exports keep the previous generation's files"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager
+from export_to_js import export_sharded
+from generate_benchmark_data import generate
+
+
+def referenced(output):
+    manifest = json.loads((output / 'manifest.json').read_text(encoding='utf-8'))
+    return set(manifest['shards']) | {manifest['search_index']}
+
+
+def on_disk(output):
+    files = {f'shards/{path.name}' for path in (output / 'shards').glob('*.json')}
+    return files | {path.name for path in output.glob('search.*.json')}
+
+
+def test_previous_manifest_stays_readable(tmp_path):
+    generate(120, str(tmp_path / 'courses.jsonl'), seed=9)
+    db_path = str(tmp_path / 'courses.db')
+    output = tmp_path / 'catalog'
+    db = DatabaseManager(db_path)
+    db.initialize()
+    db.import_from_jsonl(str(tmp_path / 'courses.jsonl'))
+    first_id = db.conn.execute('SELECT MIN(id) FROM courses').fetchone()[0]
+    db.close()
+
+    generations = []
+    for title in (None, 'First rename', 'Second rename'):
+        if title:
+            db.initialize()
+            db.conn.execute('UPDATE courses SET title = ?, description = ? WHERE id = ?', (title, title, first_id))
+            db.conn.commit()
+            db.close()
+        export_sharded(db_path, str(output), bucket_size=50)
+        generations.append(referenced(output))
+
+    first, previous, current = generations
+    assert previous != current and first != previous
+    # Both manifests a visitor may hold resolve; older files are gone
+    assert previous | current == on_disk(output)
+    assert not (first - previous - current) & on_disk(output)
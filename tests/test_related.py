@@ -0,0 +1,93 @@
+"""Incremental related-course updates against full rebuilds"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+np = pytest.importorskip('numpy')
+
+import build_related
+from build_related import CourseTerms, CourseVectors, update_related
+from database import DatabaseManager
+from generate_benchmark_data import generate
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    # Each test starts without token counts cached by an earlier one
+    monkeypatch.setattr(build_related, 'terms_cache', CourseTerms())
+    generate(300, str(tmp_path / 'courses.jsonl'), seed=11)
+    db = DatabaseManager(str(tmp_path / 'courses.db'))
+    db.initialize()
+    db.import_from_jsonl(str(tmp_path / 'courses.jsonl'))
+    yield db
+    db.close()
+
+
+def related_lists(db):
+    lists = {}
+    for course_id, related_id, score in db.conn.execute(
+            'SELECT course_id, related_id, score FROM related_courses ORDER BY course_id, rank'):
+        lists.setdefault(course_id, []).append((related_id, score))
+    return lists
+
+
+def edit_catalog(db):
+    """Retitle some courses and delete others; return (changed, deleted) ids"""
+    ids = [row[0] for row in db.conn.execute('SELECT id FROM courses ORDER BY id')]
+    changed, deleted = ids[:300:15], ids[7:300:60]
+    for course_id in changed:
+        db.conn.execute("UPDATE courses SET title = title || ' kubernetes terraform' WHERE id = ?", (course_id,))
+    for course_id in deleted:
+        db.conn.execute('DELETE FROM courses WHERE id = ?', (course_id,))
+    db.conn.commit()
+    return changed, deleted
+
+
+def test_cached_terms_match_a_fresh_tokenization(db):
+    update_related(db)
+    edit_catalog(db)
+    update_related(db)
+
+    fresh = CourseTerms()
+    fresh.refresh(db, db.get_change_seq())
+    cached, rebuilt = CourseVectors(build_related.terms_cache), CourseVectors(fresh)
+
+    assert cached.ids.tolist() == rebuilt.ids.tolist()
+    for row in range(len(cached.ids)):
+        assert cached.neighbours(row, 10) == rebuilt.neighbours(row, 10)
+
+
+def test_incremental_update_matches_full_rebuild(db):
+    update_related(db)
+    changed, deleted = edit_catalog(db)
+    assert update_related(db) < len(related_lists(db))
+    incremental = related_lists(db)
+
+    update_related(db, full=True)
+    full = related_lists(db)
+
+    # Deleted courses are gone from every list
+    assert not set(deleted) & set(incremental)
+    assert not set(deleted) & {related_id for neighbours in incremental.values() for related_id, _ in neighbours}
+
+    # Rewritten lists are exactly what a full rebuild computes
+    present = [course_id for course_id in changed if course_id not in deleted]
+    for course_id in present:
+        assert incremental[course_id] == full[course_id]
+
+    # Untouched lists only drift with the term weights: nearly all keep their members
+    assert set(incremental) == set(full)
+    kept = sum(len({related_id for related_id, _ in incremental[course_id]}
+                   & {related_id for related_id, _ in full[course_id]}) for course_id in full)
+    assert kept >= 0.95 * sum(len(neighbours) for neighbours in full.values())
+
+
+def test_no_changes_rewrites_nothing(db):
+    update_related(db)
+    before = related_lists(db)
+    assert update_related(db) == 0
+    assert related_lists(db) == before
@@ -0,0 +1,140 @@
+"""Range, conditional and precompressed responses from the standalone server"""
+
+import functools
+import gzip
+import http.client
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serve import MyHTTPRequestHandler, ThreadingServer
+
+
+@pytest.fixture
+def server(tmp_path):
+    handler = functools.partial(MyHTTPRequestHandler, directory=str(tmp_path))
+    httpd = ThreadingServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield tmp_path, httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def request(port, path, method='GET', **headers):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+    conn.request(method, path, headers=headers)
+    response = conn.getresponse()
+    body = response.read()
+    conn.close()
+    return response, body
+
+
+def write(root, name, data):
+    path = root / name
+    path.write_bytes(data)
+    return path
+
+
+def add_gzip(path):
+    variant = path.with_name(path.name + '.gz')
+    variant.write_bytes(gzip.compress(path.read_bytes()))
+    mtime = path.stat().st_mtime
+    os.utime(variant, (mtime, mtime))
+
+
+def test_range_requests(server):
+    root, port = server
+    write(root, 'data.bin', bytes(range(100)))
+
+    response, body = request(port, '/data.bin', Range='bytes=10-19')
+    assert response.status == 206
+    assert response.getheader('Content-Range') == 'bytes 10-19/100'
+    assert body == bytes(range(10, 20))
+
+    response, body = request(port, '/data.bin', Range='bytes=-5')
+    assert response.status == 206
+    assert body == bytes(range(95, 100))
+
+    response, body = request(port, '/data.bin', Range='bytes=90-')
+    assert body == bytes(range(90, 100))
+
+    response, _ = request(port, '/data.bin', Range='bytes=100-')
+    assert response.status == 416
+    assert response.getheader('Content-Range') == 'bytes */100'
+
+
+def test_suffix_range_on_empty_file(server):
+    root, port = server
+    write(root, 'empty.bin', b'')
+
+    response, body = request(port, '/empty.bin', Range='bytes=-5')
+    assert response.status == 416
+    assert response.getheader('Content-Range') == 'bytes */0'
+    assert body == b''
+
+    response, body = request(port, '/empty.bin')
+    assert response.status == 200
+    assert response.getheader('Content-Length') == '0'
+
+
+def test_stale_if_range_sends_whole_file(server):
+    root, port = server
+    write(root, 'data.bin', bytes(range(100)))
+
+    response, body = request(port, '/data.bin', Range='bytes=0-9', **{'If-Range': '"stale"'})
+    assert response.status == 200
+    assert len(body) == 100
+
+
+def test_not_modified(server):
+    root, port = server
+    write(root, 'app.js', b'console.log(1);')
+
+    response, _ = request(port, '/app.js')
+    etag = response.getheader('ETag')
+    last_modified = response.getheader('Last-Modified')
+
+    response, body = request(port, '/app.js', **{'If-None-Match': etag})
+    assert response.status == 304
+    assert body == b''
+    response, _ = request(port, '/app.js', **{'If-Modified-Since': last_modified})
+    assert response.status == 304
+    response, _ = request(port, '/app.js', **{'If-None-Match': '"other"'})
+    assert response.status == 200
+
+
+def test_accept_encoding_selection(server):
+    root, port = server
+    data = b'SQLite format 3\x00' + b'\x00' * 4000
+    add_gzip(write(root, 'courses.db', data))
+
+    response, body = request(port, '/courses.db', **{'Accept-Encoding': 'br, gzip'})
+    assert response.getheader('Content-Encoding') == 'gzip'
+    assert response.getheader('Accept-Ranges') is None
+    assert gzip.decompress(body) == data
+
+    response, body = request(port, '/courses.db', **{'Accept-Encoding': 'gzip;q=0'})
+    assert response.getheader('Content-Encoding') is None
+    assert response.getheader('Accept-Ranges') == 'bytes'
+    assert body == data
+
+    # Byte offsets address the plain file
+    response, body = request(port, '/courses.db', Range='bytes=0-15', **{'Accept-Encoding': 'gzip'})
+    assert response.status == 206
+    assert response.getheader('Content-Encoding') is None
+    assert body == data[:16]
+
+
+def test_stale_variant_is_ignored(server):
+    root, port = server
+    path = write(root, 'app.js', b'old' * 100)
+    add_gzip(path)
+    os.utime(path.with_name('app.js.gz'), (1, 1))
+
+    response, body = request(port, '/app.js', **{'Accept-Encoding': 'gzip'})
+    assert response.getheader('Content-Encoding') is None
+    assert body == b'old' * 100
@@ -0,0 +1,87 @@
+"""Typeahead ranking: block pruning and deduplication against a brute-force scan"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from suggest import BLOCK, KEY_CHARS, MAX_LIMIT, MAX_WORDS, WORD_START, SuggestIndex
+
+WORDS = ['react', 'redux', 'rust', 'python', 'pandas', 'docker', 'django', 'data', 'deep', 'learning',
+         'native', 'node', 'java', 'javascript', 'go', 'golang', 'graph', 'api', 'advanced', 'azure']
+
+
+def make_entries(seed, n=3000):
+    rng = random.Random(seed)
+    weights = rng.sample(range(1, 100 * n), n)
+    entries = []
+    for i in range(n):
+        kind = rng.choice(['title', 'title', 'author', 'tag', 'subcategory'])
+        text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 6)))
+        if rng.random() < 0.2:
+            text = text.title()  # Same text in another case
+        entries.append((kind, text, weights[i] / 7, i + 1 if kind == 'title' else 0))
+    return entries
+
+
+def brute_force(entries, prefix, limit):
+    """Distinct matching texts by kind, best weight first"""
+    best = {}
+    for kind, text, weight, course_id in entries:
+        keys = [text[match.start():match.start() + KEY_CHARS].casefold()
+                for match in list(WORD_START.finditer(text))[:MAX_WORDS]]
+        if not any(key.startswith(prefix) for key in keys):
+            continue
+        identity = (kind, text.casefold())
+        if identity not in best or weight > best[identity][0]:
+            best[identity] = (weight, kind, text, course_id)
+
+    results = []
+    for weight, kind, text, course_id in sorted(best.values(), key=lambda match: -match[0])[:limit]:
+        suggestion = {'text': text, 'type': kind}
+        if course_id:
+            suggestion['course_id'] = course_id
+        results.append(suggestion)
+    return results
+
+
+def test_rank_matches_brute_force():
+    entries = make_entries(seed=1)
+    index = SuggestIndex(iter(entries))
+    assert len(index) > 10 * BLOCK
+
+    prefixes = {word[:length] for word in WORDS for length in range(1, len(word) + 1)}
+    prefixes |= {'react n', 'deep learning', 'go ', 'zzz', 'j'}
+    for prefix in sorted(prefixes):
+        expected = brute_force(entries, prefix, MAX_LIMIT)
+        for limit in (1, 5, MAX_LIMIT):
+            assert index.rank(prefix, limit) == expected[:limit], (prefix, limit)
+
+
+def test_complete_caches_short_prefixes_consistently():
+    entries = make_entries(seed=2)
+    index = SuggestIndex(iter(entries))
+
+    for query in ('d', 'da', 'dat', ' Da ', 'DJANGO'):
+        prefix = query.strip().casefold()
+        assert index.complete(query, 7) == brute_force(entries, prefix, 7)
+        # A smaller limit after a cached larger answer is its head
+        assert index.complete(query, 3) == brute_force(entries, prefix, 3)
+    assert index.complete('   ') == []
+
+
+def test_text_reached_through_several_words_is_listed_once():
+    entries = [
+        ('title', 'React and React Native', 5.0, 1),
+        ('title', 'react and react native', 4.0, 2),
+        ('tag', 'React', 3.0, 0),
+        ('title', 'Native Apps', 1.0, 3),
+    ]
+    index = SuggestIndex(iter(entries))
+
+    assert index.complete('react') == [
+        {'text': 'React and React Native', 'type': 'title', 'course_id': 1},
+        {'text': 'React', 'type': 'tag'},
+    ]
+    assert [s['text'] for s in index.complete('nat')] == ['React and React Native', 'Native Apps']
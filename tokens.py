@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+"""
+Search tokens shared by the exporters and the related-courses index
+"""
+
+import re
+
+# Word characters minus underscore, matching /[\p{L}\p{N}]+/u in app.js
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+
+
+def tokenize(text):
+    """Lowercased search tokens, split the same way as in the browser"""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Production server for CourseSpider API
+Runs the Flask app under gunicorn's pre-fork server: a pool of worker
+processes with read-only database connections, plus one writer process
+that owns collection jobs and deletes
+"""
+
+import argparse
+import multiprocessing
+import os
+
+from gunicorn.app.base import BaseApplication
+from werkzeug.serving import make_server
+
+import api_server
+from database import DatabaseManager
+
+
+def run_writer(host: str, port: int):
+    """Serve write endpoints (collection jobs, deletes) from a single process"""
+    api_server.init_db(read_only=False)
+    server = make_server(host, port, api_server.app, threaded=True)
+    server.serve_forever()
+
+
+def post_fork(server, worker):
+    """Give each worker its own read-only connection after forking"""
+    api_server.init_db(read_only=True)
+
+
+class ProductionServer(BaseApplication):
+    def __init__(self, app, options: dict):
+        self.application = app
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the CourseSpider API in production mode')
+    parser.add_argument('--workers', type=int,
+                        default=int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count())),
+                        help='number of read-only worker processes (default: CPU count)')
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('WEB_THREADS', 4)),
+                        help='threads per worker (default: 4); identical concurrent requests '
+                             'on one worker share a single computation')
+    parser.add_argument('--bind', default=f"0.0.0.0:{os.environ.get('PORT', 5000)}",
+                        help='address the workers listen on (default: 0.0.0.0:$PORT or 5000)')
+    parser.add_argument('--writer-port', type=int, default=int(os.environ.get('WRITER_PORT', 5001)),
+                        help='loopback port of the writer process (default: 5001)')
+    parser.add_argument('--timeout', type=int, default=120,
+                        help='worker timeout in seconds; streaming exports need headroom')
+    args = parser.parse_args()
+
+    # Create/migrate the schema once, before any process opens it read-only
+    setup = DatabaseManager(api_server.db.db_path)
+    setup.initialize()
+    setup.close()
+
+    writer = multiprocessing.Process(target=run_writer, args=('127.0.0.1', args.writer_port), daemon=True)
+    writer.start()
+
+    # Workers inherit these when gunicorn forks them
+    os.environ['COURSESPIDER_READ_ONLY'] = '1'
+    os.environ['COURSESPIDER_WRITER_URL'] = f'http://127.0.0.1:{args.writer_port}'
+    api_server.WRITER_URL = os.environ['COURSESPIDER_WRITER_URL']
+
+    print('=' * 60)
+    print('🚀 CourseSpider API Server (production)')
+    print('=' * 60)
+    print(f'📡 Listening on: {args.bind}')
+    print(f'👷 Read workers: {args.workers} x {args.threads} threads')
+    print(f'✍️  Writer process: 127.0.0.1:{args.writer_port} (pid {writer.pid})')
+    print('=' * 60)
+
+    options = {
+        'bind': args.bind,
+        'workers': args.workers,
+        'worker_class': 'gthread',
+        'threads': args.threads,
+        'timeout': args.timeout,
+        'preload_app': True,
+        'post_fork': post_fork,
+        'on_exit': lambda server: writer.terminate(),
+    }
+    ProductionServer(api_server.app, options).run()
+
+
+if __name__ == '__main__':
+    main()
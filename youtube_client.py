@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+YouTube Data API access for the collector
+Spreads calls over a pool of API keys, always using the key with the most
+daily quota left, and skips keys that ran out until their quota resets at
+midnight Pacific time. Concurrency adapts AIMD-style: every successful call
+raises the limit a little, every rate-limit error halves it and pauses all
+callers with exponential backoff. Quota and rate-limit errors are counted
+apart from other failures.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+
+# Quota units per call; every list call other than search costs 1
+QUOTA_COSTS = {'search': 100}
+
+# Default daily quota of a YouTube Data API key
+DAILY_QUOTA = int(os.environ.get('YOUTUBE_DAILY_QUOTA', 10000))
+
+# Concurrent API calls: the controller starts low and grows towards the maximum
+MAX_CONCURRENCY = int(os.environ.get('YOUTUBE_MAX_CONCURRENCY', 8))
+INITIAL_CONCURRENCY = 2
+
+# Quota used per key is kept here so restarts do not forget what was spent today
+QUOTA_STATE = os.environ.get('YOUTUBE_QUOTA_STATE', 'data/youtube_quota.json')
+SAVE_EVERY = 50
+
+QUOTA_REASONS = {'quotaExceeded', 'dailyLimitExceeded'}
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+
+# Retries of one call after rate limits and server errors
+MAX_ATTEMPTS = 6
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+try:
+    from zoneinfo import ZoneInfo
+    QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')
+except Exception:
+    QUOTA_TIMEZONE = timezone(timedelta(hours=-8))
+
+
+class QuotaExhausted(Exception):
+    """Every key has used up its daily quota"""
+
+
+def load_api_keys() -> List[str]:
+    """Keys from YOUTUBE_API_KEYS (comma-separated), or the single YOUTUBE_API_KEY"""
+    keys = [key.strip() for key in os.environ.get('YOUTUBE_API_KEYS', '').split(',') if key.strip()]
+    if not keys and os.environ.get('YOUTUBE_API_KEY'):
+        keys = [os.environ['YOUTUBE_API_KEY'].strip()]
+    return list(dict.fromkeys(keys))
+
+
+def next_quota_reset(now: Optional[float] = None) -> float:
+    """Epoch seconds of the next midnight Pacific time, when daily quotas reset"""
+    local = datetime.fromtimestamp(now if now is not None else time.time(), QUOTA_TIMEZONE)
+    midnight = (local + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight.timestamp()
+
+
+def error_reason(error: HttpError) -> str:
+    """The reason code of an API error, e.g. quotaExceeded"""
+    try:
+        details = json.loads(error.content.decode('utf-8'))['error']
+        return details.get('errors', [{}])[0].get('reason') or details.get('status', '')
+    except (ValueError, KeyError, IndexError, AttributeError):
+        return ''
+
+
+def mask(key: str) -> str:
+    """A key shortened for logs and status output"""
+    return f'{key[:6]}…{key[-4:]}' if len(key) > 12 else '…'
+
+
+class KeyPool:
+    """API keys with their quota used today"""
+
+    def __init__(self, keys: List[str], daily_quota: int = DAILY_QUOTA, state_path: Optional[str] = QUOTA_STATE):
+        if not keys:
+            raise ValueError('No YouTube API keys configured (set YOUTUBE_API_KEYS or YOUTUBE_API_KEY)')
+        self.daily_quota = daily_quota
+        self.state_path = state_path
+        self.lock = threading.Lock()
+        # Workers save concurrently; one writer at a time owns the temporary file
+        self.save_lock = threading.Lock()
+        reset_at = next_quota_reset()
+        self.keys = {key: {'used': 0, 'reset_at': reset_at, 'cool_until': 0.0} for key in keys}
+        self.load()
+
+    def load(self):
+        """Restore today's usage from the state file"""
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for key, state in self.keys.items():
+            previous = saved.get(key[-8:])
+            if previous and previous.get('reset_at', 0) > now:
+                state['used'] = previous.get('used', 0)
+                state['reset_at'] = previous['reset_at']
+
+    def save(self):
+        """Write today's usage to the state file (keys are stored by their last characters only)"""
+        if not self.state_path:
+            return
+        with self.lock:
+            data = {key[-8:]: {'used': state['used'], 'reset_at': state['reset_at']}
+                    for key, state in self.keys.items()}
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        with self.save_lock:
+            tmp = f'{self.state_path}.{os.getpid()}.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp, self.state_path)
+
+    def choose(self, cost: int) -> str:
+        """The key with the most quota left that can afford cost; raise QuotaExhausted if none"""
+        now = time.time()
+        with self.lock:
+            for state in self.keys.values():
+                if now >= state['reset_at']:
+                    state['used'] = 0
+                    state['reset_at'] = next_quota_reset(now)
+
+            candidates = [key for key, state in self.keys.items() if self.daily_quota - state['used'] >= cost]
+            if not candidates:
+                reset_at = datetime.fromtimestamp(min(state['reset_at'] for state in self.keys.values()))
+                raise QuotaExhausted(f'All {len(self.keys)} API keys are out of quota until {reset_at:%Y-%m-%d %H:%M}')
+            # Keys cooling down after a rate limit come last
+            return min(candidates, key=lambda key: (self.keys[key]['cool_until'] > now, self.keys[key]['used']))
+
+    def charge(self, key: str, units: int):
+        with self.lock:
+            self.keys[key]['used'] += units
+
+    def exhaust(self, key: str):
+        """Take a key out of rotation until its quota resets"""
+        with self.lock:
+            self.keys[key]['used'] = self.daily_quota
+
+    def cool(self, key: str, seconds: float):
+        with self.lock:
+            self.keys[key]['cool_until'] = max(self.keys[key]['cool_until'], time.time() + seconds)
+
+    def cool_until(self, key: str) -> float:
+        with self.lock:
+            return self.keys[key]['cool_until']
+
+    def remaining(self) -> Dict[str, int]:
+        with self.lock:
+            return {mask(key): max(self.daily_quota - state['used'], 0) for key, state in self.keys.items()}
+
+
+class AIMDController:
+    """Concurrency limit with additive increase and multiplicative decrease"""
+
+    def __init__(self, initial: int = INITIAL_CONCURRENCY, maximum: int = MAX_CONCURRENCY, minimum: int = 1):
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.limit = float(min(max(initial, minimum), self.maximum))
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """Wait for a free slot and for any backoff pause to end"""
+        with self.condition:
+            while True:
+                pause = self.paused_until - time.monotonic()
+                if pause <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                self.condition.wait(timeout=pause if pause > 0 else None)
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def succeeded(self):
+        """About one more slot per limit's worth of successful calls"""
+        with self.condition:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+    def throttled(self, backoff: float):
+        """Halve the limit and hold every caller off for backoff seconds"""
+        with self.condition:
+            self.limit = max(self.minimum, self.limit / 2)
+            self.paused_until = max(self.paused_until, time.monotonic() + backoff)
+
+
+class YouTubeAPI:
+    """YouTube Data API v3 list calls over a key pool with adaptive concurrency"""
+
+    def __init__(self, keys: List[str], daily_quota: int = DAILY_QUOTA, max_concurrency: int = MAX_CONCURRENCY,
+                 state_path: Optional[str] = QUOTA_STATE):
+        self.pool = KeyPool(keys, daily_quota, state_path)
+        self.controller = AIMDController(maximum=max_concurrency)
+        # YOUTUBE_API_ENDPOINT points the client at another server (e.g. fake_youtube.py)
+        endpoint = os.environ.get('YOUTUBE_API_ENDPOINT')
+        self.client_options = {'api_endpoint': endpoint} if endpoint else None
+        # googleapiclient clients are not thread-safe: one per thread and key
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.counts = {'calls': 0, 'units': 0, 'retries': 0, 'quota_errors': 0, 'rate_limit_errors': 0,
+                       'server_errors': 0, 'other_errors': 0}
+
+    @property
+    def max_concurrency(self) -> int:
+        return self.controller.maximum
+
+    def client(self, key: str):
+        clients = getattr(self.local, 'clients', None)
+        if clients is None:
+            clients = self.local.clients = {}
+        if key not in clients:
+            clients[key] = build('youtube', 'v3', developerKey=key, client_options=self.client_options)
+        return clients[key]
+
+    def count(self, name: str, amount: int = 1) -> int:
+        with self.lock:
+            self.counts[name] += amount
+            return self.counts[name]
+
+    def call(self, resource: str, **params) -> Dict:
+        """Run <resource>().list(**params), retrying rate limits and moving off exhausted keys"""
+        cost = QUOTA_COSTS.get(resource, 1)
+        attempt = 0
+        while True:
+            key = self.pool.choose(cost)
+            wait = self.pool.cool_until(key) - time.time()
+            if wait > 0:
+                time.sleep(wait)
+
+            self.controller.acquire()
+            try:
+                response = getattr(self.client(key), resource)().list(**params).execute()
+            except HttpError as e:
+                reason = error_reason(e)
+                status = e.resp.status
+                backoff = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+                retry = attempt + 1 < MAX_ATTEMPTS
+                if reason in QUOTA_REASONS:
+                    # Another key may still have quota; choose() raises once none has
+                    self.count('quota_errors')
+                    self.pool.exhaust(key)
+                    self.pool.save()
+                    print(f"  ⚠ API key {mask(key)} is out of quota, switching keys")
+                    continue
+                if reason in RATE_LIMIT_REASONS or status == 429:
+                    self.count('rate_limit_errors')
+                    self.pool.cool(key, backoff)
+                    self.controller.throttled(backoff)
+                elif status >= 500:
+                    self.count('server_errors')
+                    if retry:
+                        time.sleep(backoff)
+                else:
+                    self.count('other_errors')
+                    retry = False
+                if retry:
+                    attempt += 1
+                    self.count('retries')
+                    continue
+                # Failed requests still cost a unit
+                self.pool.charge(key, 1)
+                raise
+            finally:
+                self.controller.release()
+
+            self.pool.charge(key, cost)
+            self.controller.succeeded()
+            calls = self.count('calls')
+            self.count('units', cost)
+            if calls % SAVE_EVERY == 0:
+                self.pool.save()
+            return response
+
+    def stats(self) -> Dict:
+        """Call and error counters, the concurrency limit and quota left per key"""
+        with self.lock:
+            counts = dict(self.counts)
+        return {**counts, 'concurrency_limit': round(self.controller.limit, 2),
+                'quota_remaining': self.pool.remaining()}